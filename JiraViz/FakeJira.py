@@ -0,0 +1,242 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##################################################
+# __python__: 3.9.x
+# __Author__: AJF
+# __Purpose__: Local stand-in of the Jira REST search API for end-to-end VizProject benchmarks
+##################################################
+
+import os, re, sys, time, json, gzip
+import random
+import argparse
+import logging
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from VizBench import JiraPayloadGenerator, TEAM
+
+#* 驱动process_search时VizProject的参数: 带changelog的全部分析插件, 不限速
+VIZ_ARGV = [ 'VizProject.py', '-e', '--active-check', '--verify-check', '--di-count', '--testcase-check',
+             '--label-check', 'SH-Support-2023', '--date-range', '2022-11', '2023-02', '--profile' ]
+
+class FakeJira(object):
+    """Seeded synthetic issues behind /rest/api/2/search, with latency, page limit, truncation and 429 injection"""
+    def __init__(self, generator, total=10000, latency=0.05, per_issue=0.0, max_results=1000, truncate=0, throttle=0.0, retry_after=1):
+        self.generator = generator
+        self.total = total                    # JQL总issue数, 除key in (...)外所有JQL返回相同的数据
+        self.latency = latency                # 每个请求的固定延时(秒)
+        self.per_issue = per_issue            # 每个返回issue的额外延时(秒)
+        self.max_results = max_results        # 服务器端单页上限(jira.search.views.default.max)
+        self.truncate = truncate              # search结果中每个issue最多返回的changelog/comments数, 0=不截断
+        self.throttle = throttle              # 返回429的概率
+        self.retry_after = retry_after        # 429的Retry-After(秒)
+        self.random = random.Random(generator.seed)
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def param(params, name, default) -> int:
+        return int((params.get(name) or [ default ])[0])               # parse_qs的值均为list, ex: { 'startAt': [ '0' ] }
+
+    def number(self, key) -> int:
+        return int(key.rsplit('-', 1)[1]) - 10000                      # ex: TV-10005 -> 5
+
+    def project(self, d, fields, changelog) -> dict:
+        """Keep the requested FIELDS of issue D and truncate its changelog/comments like the real search does"""
+        if '*all' not in fields:
+            d['fields'] = { k: v for k, v in d['fields'].items() if k in fields }
+        if not changelog:
+            d.pop('changelog', None)
+        if self.truncate:
+            if changelog:
+                d['changelog']['histories'] = d['changelog']['histories'][:self.truncate]
+                d['changelog']['maxResults'] = len(d['changelog']['histories'])
+            if 'comment' in d['fields']:
+                d['fields']['comment']['comments'] = d['fields']['comment']['comments'][:self.truncate]
+                d['fields']['comment']['maxResults'] = len(d['fields']['comment']['comments'])
+        return d
+
+    def numbers(self, jql) -> list:
+        """Return the issue numbers matched by JQL: key in (...) selects the existing keys, any other JQL without key matches all issues"""
+        match = re.fullmatch(r'\s*key\s+in\s*\(([^()]*)\)\s*', jql or '', re.IGNORECASE)
+        if match:
+            keys = [ key.strip().strip('"\'') for key in match.group(1).split(',') if key.strip() ]
+            numbers = sorted({ self.number(key) for key in keys if re.fullmatch(r'[A-Z]+-\d+', key) })
+            #* 与Jira相同: 按key搜索时不存在的key不返回(validateQuery=false)
+            return [ n for n in numbers if 0 <= n < self.total and self.generator.issue(n)['key'] in keys ]
+        if re.search(r'\b(key|issuekey)\b', jql or '', re.IGNORECASE):
+            raise ValueError('Unsupported JQL: {}, only a single "key in (...)" clause is supported'.format(jql))
+        return range(self.total)
+
+    def search(self, params) -> dict:
+        numbers = self.numbers((params.get('jql') or [ '' ])[0])
+        start_at = self.param(params, 'startAt', 0)
+        max_results = min(self.param(params, 'maxResults', 50), self.max_results)
+        fields = set(','.join(params.get('fields') or [ '*all' ]).split(','))
+        changelog = 'changelog' in ','.join(params.get('expand') or [])
+        issues = [ self.project(self.generator.issue(n), fields, changelog) for n in numbers[start_at:start_at + max_results] ]
+        with self.lock:
+            self.stats['issues'] += len(issues)
+        return { 'expand': 'schema,names', 'startAt': start_at, 'maxResults': max_results, 'total': len(numbers), 'issues': issues }
+
+    def changelog(self, key, params) -> dict:
+        histories = self.generator.issue(self.number(key))['changelog']['histories']
+        start_at, max_results = self.param(params, 'startAt', 0), self.param(params, 'maxResults', 100)
+        return { 'startAt': start_at, 'maxResults': max_results, 'total': len(histories), 'isLast': start_at + max_results >= len(histories),
+                 'values': histories[start_at:start_at + max_results] }
+
+    def comments(self, key, params) -> dict:
+        comments = self.generator.issue(self.number(key))['fields']['comment']['comments']
+        start_at, max_results = self.param(params, 'startAt', 0), self.param(params, 'maxResults', 100)
+        return { 'startAt': start_at, 'maxResults': max_results, 'total': len(comments), 'comments': comments[start_at:start_at + max_results] }
+
+    def handle(self, path, params) -> tuple:
+        """Return (http status, headers, json object) of one request"""
+        with self.lock:
+            self.stats['requests'] += 1
+            throttled = self.random.random() < self.throttle
+            if throttled:
+                self.stats['throttled'] += 1
+        if throttled:
+            return 429, { 'Retry-After': str(self.retry_after) }, { 'errorMessages': [ 'Rate limit exceeded' ] }
+
+        parts = urlparse(path).path.rstrip('/').split('/')[4:]         # /rest/api/2/search -> [ 'search' ]
+        if parts == [ 'serverInfo' ]:
+            return 200, {}, { 'baseUrl': 'http://localhost', 'version': '8.20.0', 'versionNumbers': [ 8, 20, 0 ], 'deploymentType': 'Server', 'serverTitle': 'FakeJira' }
+        if parts == [ 'field' ]:
+            return 200, {}, []
+        if parts == [ 'search' ]:
+            try:
+                result = self.search(params)
+            except ValueError as err:
+                return 400, {}, { 'errorMessages': [ str(err) ] }          # 不支持的JQL明确报错, 避免返回错误的数据
+            time.sleep(self.latency + self.per_issue * len(result['issues']))
+            return 200, {}, result
+        if len(parts) == 3 and parts[0] == 'issue' and parts[2] in ('changelog', 'comment'):
+            time.sleep(self.latency)
+            return 200, {}, self.changelog(parts[1], params) if parts[2] == 'changelog' else self.comments(parts[1], params)
+        return 404, {}, { 'errorMessages': [ 'Unknown path: {}'.format(path) ] }
+
+    def start(self, host='127.0.0.1', port=0) -> ThreadingHTTPServer:
+        """Serve in a daemon thread and return the server, port=0 picks a free port"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'                               # keep-alive, 与真实Jira一致
+
+            def reply(self, params):
+                try:
+                    code, headers, result = fake.handle(self.path, params)
+                except Exception as err:
+                    code, headers, result = 500, {}, { 'errorMessages': [ repr(err) ] }
+                payload = json.dumps(result).encode('utf-8')
+                if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                    payload = gzip.compress(payload, compresslevel=1)
+                    headers = dict(headers, **{ 'Content-Encoding': 'gzip' })
+                self.send_response(code)
+                for name, value in dict(headers, **{ 'Content-Type': 'application/json;charset=UTF-8', 'Content-Length': str(len(payload)) }).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.reply(parse_qs(urlparse(self.path).query))
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                self.reply({ k: v if isinstance(v, list) else [ str(v) ] for k, v in body.items() })
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def percentile(values, q) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+def drive(viz, url, jobs, total, jql='project = FAKE ORDER BY created DESC') -> dict:
+    """Run VizProject process_search against URL with JOBS threads, return throughput of the parsed issues and page latency"""
+    viz.JOBS = jobs                                                     # JOBS在AmlJiraSystem初始化与分页获取时读取
+    Viz = viz.AmlJiraSystem('bench', '')
+    Viz.jira_server = url
+    Viz.show_progress = False
+    Viz.login_jira()
+    t0 = time.perf_counter()
+    Viz.process_search(jql)
+    seconds = time.perf_counter() - t0
+    latency = [ page['seconds'] for page in Viz.profiler.pages ]
+    parsed = Viz.jql_total                                              # 每个解析完成的分页累加的issue数, 不是服务器返回的total
+    if parsed != total:
+        logging.error('Jobs {}: parsed {} of {} issues, pages were lost'.format(jobs, parsed, total))
+    return { 'jobs': jobs, 'issues': parsed, 'seconds': seconds, 'rate': parsed / seconds if seconds else 0.0, 'pages': len(latency),
+             'p50': percentile(latency, 0.5), 'p99': percentile(latency, 0.99), 'throttled': Viz.scheduler.counters['throttled'] }
+
+def main():
+    parser = argparse.ArgumentParser(description='********** Fake Jira server for VizProject end-to-end tests **********')
+    parser.add_argument('--port', type=int, default=8080, help='(可选参数)监听端口, 仅单独运行服务器时使用, 默认: 8080')
+    parser.add_argument('--issues', type=int, default=10000, metavar='N', help='(可选参数)JQL返回的issue总数, 默认: 10000')
+    parser.add_argument('--seed', type=int, default=0, help='(可选参数)随机种子, 相同种子生成相同数据, 默认: 0')
+    parser.add_argument('--latency', type=float, default=0.05, metavar='SECONDS', help='(可选参数)每个请求的固定延时(秒), 默认: 0.05')
+    parser.add_argument('--per-issue', type=float, default=0.0, metavar='SECONDS', help='(可选参数)每个返回issue的额外延时(秒), 默认: 0')
+    parser.add_argument('--max-results', type=int, default=1000, metavar='N', help='(可选参数)服务器端单页issue数上限, 默认: 1000')
+    parser.add_argument('--truncate', type=int, default=0, metavar='N', help='(可选参数)search结果中每个issue最多返回的changelog/comments数, 0=不截断, 默认: 0')
+    parser.add_argument('--throttle', type=float, default=0.0, metavar='P', help='(可选参数)请求返回429的概率, ex: 0.05, 默认: 0')
+    parser.add_argument('--retry-after', type=int, default=1, metavar='SECONDS', help='(可选参数)429的Retry-After(秒), 默认: 1')
+    parser.add_argument('--bench', nargs='+', type=int, metavar='JOBS', help='(可选参数)不单独运行服务器, 按各并发数(--jobs)驱动process_search并统计issues/s与分页延时p50/p99, ex: 1 4 8')
+    parser.add_argument('--rate', type=float, default=0, metavar='R', help='(可选参数)--bench时VizProject的--rate, 默认: 0(不限速)')
+    parser.add_argument('--save', metavar='FILE', help='(可选参数)--bench结果保存到json文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    fake = FakeJira(JiraPayloadGenerator(seed=args.seed), total=args.issues, latency=args.latency, per_issue=args.per_issue,
+                    max_results=args.max_results, truncate=args.truncate, throttle=args.throttle, retry_after=args.retry_after)
+
+    if not args.bench:
+        server = fake.start(port=args.port)
+        print('Fake Jira on http://127.0.0.1:{}, ex: python VizProject.py --server http://127.0.0.1:{} --project-id X32A0-T972, Ctrl+C to quit'.format(args.port, args.port))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    argv, sys.argv = sys.argv, VIZ_ARGV + [ '--rate', str(args.rate) ] + ([ '--hydrate' ] if args.truncate else [])
+    import VizProject
+    sys.argv = argv
+    VizProject.curr_time = time.strftime('%Y%m%d_%H%M%S', time.localtime(time.time()))
+    VizProject.roster = VizProject.Roster({ 'QA': [ '.'.join(part.capitalize() for part in x.split('.')) for x in TEAM ] })     # ex: jianfan.ai -> Jianfan.Ai
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = fake.start()
+    url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    results = [ drive(VizProject, url, jobs, args.issues) for jobs in args.bench ]
+    server.shutdown()
+
+    from rich.console import Console
+    from rich.table import Table
+    table = Table(title='VizProject end-to-end (issues={}, latency={}s, max results={}, truncate={}, throttle={})'.format(
+        args.issues, args.latency, args.max_results, args.truncate, args.throttle))
+    for column in ('Jobs', 'Issues', 'Pages', 'Seconds', 'Issues/s', 'Speedup', 'Page p50', 'Page p99', 'Throttled'):
+        table.add_column(column, justify='right')
+    for result in results:
+        table.add_row(str(result['jobs']), str(result['issues']), str(result['pages']), '{:.2f}'.format(result['seconds']), '{:.0f}'.format(result['rate']),
+                      'x{:.1f}'.format(result['rate'] / results[0]['rate'] if results[0]['rate'] else 1), '{:.3f}s'.format(result['p50']),
+                      '{:.3f}s'.format(result['p99']), str(result['throttled']))
+    Console().print(table)
+    logging.warning('Server: {}'.format(dict(fake.stats)))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        logging.warning('Saved to: {}'.format(os.path.abspath(args.save)))
+
+if __name__ == '__main__':
+    main()
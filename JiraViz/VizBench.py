@@ -0,0 +1,284 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##################################################
+# __python__: 3.9.x
+# __Author__: AJF
+# __Purpose__: Benchmark VizProject parsing/aggregation/export with synthetic Jira data
+##################################################
+
+import os, sys, time, json
+import random
+import tempfile
+import statistics
+import subprocess
+import argparse
+import logging
+import tracemalloc
+from datetime import datetime, timedelta
+
+#* 合成数据中的人员名单(Jira原始用户名为小写), 前6位属于QA名单(roster)
+TEAM = [ 'jianfan.ai', 'bo.ren', 'zanbo.huang', 'meiling.zhu', 'tracy.chen', 'jiajia.mu' ]
+OTHERS = [ 'some.rd', 'other.guy', 'linda.wu', 'kevin.li' ]
+LABELS = [ 'SH-Support-2023', 'Common_From_Project', 'must-fix-0113', 'pmlist-zql-20230103' ]
+
+#* VizProject在import时解析命令行参数, 基准测试启用全部分析插件与-o输出
+VIZ_ARGV = [ 'VizProject.py', '-e', '-o', '--active-check', '--verify-check', '--di-count', '--testcase-check',
+             '--label-check', 'SH-Support-2023', '--date-range', '2022-11', '2023-02' ]
+
+#* 启动耗时测试: 子进程中替换jira.JIRA的构造函数, login即为第一个Jira请求, 在此打印时间戳后立即退出
+STARTUP_PROBE = '''
+import os, sys, time, runpy
+import jira
+def first_request(*args, **kwargs):
+    print('FIRST_REQUEST', time.time(), flush=True)
+    os._exit(0)
+jira.JIRA.__init__ = first_request
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+'''
+STARTUP_CASES = { 'search': [ '--project-id', 'X32A0-T972' ],
+                  'analysis': [ '--project-id', 'X32A0-T972', '-e', '-o', '--active-check', '--verify-check', '--di-count', '--date-range', '2022-11', '2023-02' ],
+                  'columnar': [ '--project-id', 'X32A0-T972', '-o', '--columnar', '--di-count' ] }
+
+class JiraPayloadGenerator(object):
+    """Seeded generator of search_issues(json_result=True) pages, issue N is the same for the same seed"""
+    def __init__(self, seed=0, comments=5, histories=8, label_churn=0.25, start='2022-10-01', days=200):
+        self.seed = seed
+        self.comments = comments              # 每个issue平均comment数
+        self.histories = histories            # 每个issue平均changelog history数
+        self.label_churn = label_churn        # history中labels变更的比例
+        self.start = datetime.strptime(start, '%Y-%m-%d')
+        self.days = days
+        self.people = TEAM + OTHERS
+
+    @staticmethod
+    def timestamp(date) -> str:
+        return date.strftime('%Y-%m-%dT%H:%M:%S.000+0800')         # ex: 2023-02-13T11:50:52.000+0800
+
+    def history(self, r, n, created, labels) -> dict:
+        """Return one changelog history, LABELS is the issue's current label list and is updated in place"""
+        k = r.random()
+        if k < self.label_churn:
+            before = ' '.join(labels)
+            if labels and r.random() < 0.3:
+                labels.remove(r.choice(labels))                     # 删除label
+            else:
+                labels.append(r.choice(LABELS))                     # 添加label
+            items = [ { 'field': 'labels', 'fieldtype': 'jira', 'from': None, 'fromString': before, 'to': None, 'toString': ' '.join(labels) } ]
+        elif k < self.label_churn + 0.3:
+            items = [ { 'field': 'status', 'fieldtype': 'jira', 'from': '5', 'fromString': 'Resolved', 'to': '10001', 'toString': 'Verified' } ]
+        elif k < self.label_churn + 0.45:
+            finish_date = created + timedelta(days=r.randint(1, 30))
+            items = [ { 'field': 'Finish date (WBSGantt)', 'fieldtype': 'custom', 'from': None, 'fromString': None, 'to': finish_date.strftime('%Y-%m-%d'), 'toString': finish_date.strftime('%d/%b/%y') } ]
+        else:
+            items = [ { 'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'OPEN', 'to': '5', 'toString': 'Resolved' },
+                      { 'field': 'assignee', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': r.choice(self.people), 'toString': None } ]
+        author = r.choice(self.people)
+        return { 'id': str(n), 'author': { 'name': author, 'displayName': author }, 'created': self.timestamp(created), 'items': items }
+
+    def issue(self, n) -> dict:
+        """Return raw json of the N-th issue"""
+        r = random.Random(self.seed * 1000003 + n)
+        created = self.start + timedelta(minutes=r.randint(0, self.days * 24 * 60))
+        labels = r.sample(LABELS, r.randint(0, 2))
+        histories = [ self.history(r, h, created + timedelta(hours=12 * (h + 1)), labels) for h in range(r.randint(0, 2 * self.histories)) ]
+        comments = [ { 'id': str(c), 'author': { 'name': r.choice(self.people) }, 'body': 'Please check the log again, issue {} round {}'.format(n, c),
+                       'created': self.timestamp(created + timedelta(hours=c + 1)) } for c in range(r.randint(0, 2 * self.comments)) ]
+        return { 'id': str(n), 'key': '{}-{}'.format(r.choice([ 'TV', 'TV', 'TV', 'SWPL' ]), 10000 + n), 'fields': {
+                    'priority': { 'name': r.choice([ 'P0', 'P1', 'P1', 'P2', 'P3' ]) },
+                    'status': { 'name': r.choice([ 'OPEN', 'In Progress', 'Resolved', 'Verified', 'Closed' ]) },
+                    'comment': { 'comments': comments, 'maxResults': len(comments), 'total': len(comments), 'startAt': 0 },
+                    'labels': labels,
+                    'customfield_10109': r.choice([ None, { 'value': 'Blocker' }, { 'value': 'Critical' }, { 'value': 'Major' }, { 'value': 'Normal' } ]),       # severity
+                    'customfield_11604': r.choice([ None, 'TV-F3081F{:04d}'.format(r.randint(1, 200)), 'AddCase', 'add case', 'N/A' ]),                        # testcase id
+                    'customfield_10102': r.choice([ None, 'TV-1001', 'TV-1002', 'TV-1003' ]),                                                                  # epic
+                    'customfield_10107': [ { 'value': r.choice([ 'TV reference', 'TV customer' ]) } ],                                                         # product line
+                    'customfield_10407': [ { 'value': r.choice([ 'X32A0-T972', 'AM30A2-T950D4', 'AB30A8-T962X3Z' ]) } ],                                       # project id
+                    'components': [ { 'name': r.choice([ 'HDMI', 'Dolby Vision', 'Audio', 'Video', 'CEC' ]) } ],
+                    'assignee': { 'name': r.choice(self.people) },
+                    'customfield_10700': { 'name': r.choice(self.people) },                                                                                    # rd manager
+                    'created': self.timestamp(created),
+                    'updated': self.timestamp(created + timedelta(days=r.randint(0, 60))),
+                 },
+                 'changelog': { 'startAt': 0, 'maxResults': len(histories), 'total': len(histories), 'histories': histories } }
+
+    def page(self, start_at, max_results, total) -> dict:
+        """Return one search_issues page of TOTAL issues"""
+        return { 'expand': 'schema,names', 'startAt': start_at, 'maxResults': max_results, 'total': total,
+                 'issues': [ self.issue(n) for n in range(start_at, min(total, start_at + max_results)) ] }
+
+    def pages(self, total, page_size=1000):
+        for start_at in range(0, total, page_size):
+            yield self.page(start_at, page_size, total)
+
+class Bench(object):
+    """Time get_fields_data, the process_search Counter merges and write2file on synthetic pages"""
+    stages = ('get_fields_data', 'merge', 'write2file')
+
+    def __init__(self, viz, generator, page_size=1000):
+        self.viz = viz
+        self.generator = generator
+        self.page_size = page_size
+
+    def run(self, total, memory=False) -> dict:
+        """Return { stage: { 'seconds', 'rate', 'peak_mb' } } for TOTAL issues, peak_mb (largest single call) only if MEMORY"""
+        Viz = self.viz.AmlJiraSystem('bench', '')
+        Viz.compile_analyzers()
+        result = {}
+
+        def measure(stage, func, *args):
+            if memory:
+                tracemalloc.start()                 # 仅跟踪被测函数内的内存分配, 页面生成不计入
+            t0 = time.perf_counter()
+            value = func(*args)
+            seconds = time.perf_counter() - t0
+            stat = result.setdefault(stage, { 'seconds': 0.0, 'peak_mb': 0.0 })
+            stat['seconds'] += seconds
+            if memory:
+                stat['peak_mb'] = max(stat['peak_mb'], tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+                tracemalloc.stop()
+            return value
+
+        #* get_fields_data: 逐页解析, 页面生成的耗时不计入
+        page_results = []
+        for page in self.generator.pages(total, self.page_size):
+            page_results.append(measure('get_fields_data', Viz.get_fields_data, page['issues']))
+            del page
+
+        #* merge: 与process_search相同的分段合并方式
+        def merge():
+            fields, aggregate, offset = {}, self.viz.FieldsAggregate(), 0
+            for page_fields, *counters in page_results:
+                fields.update({ offset + k: v for k, v in page_fields.items() })
+                for name, counter in zip(self.viz.FieldsAggregate.counter_names, counters):
+                    aggregate.merge(name, counter)
+                offset += self.page_size
+            return fields
+        fields = measure('merge', merge)
+
+        #* write2file: 输出到临时目录
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                measure('write2file', self.viz.write2file, fields, 30)
+            finally:
+                os.chdir(cwd)
+
+        for stage, stat in result.items():
+            stat['rate'] = total / stat['seconds'] if stat['seconds'] else 0.0
+        result['write2file']['rows'] = len(fields)
+        return result
+
+def best_of(bench, size, repeat) -> dict:
+    """Return bench.run(SIZE) with the fastest of REPEAT runs per stage, single runs are too noisy to compare with a baseline"""
+    runs = [ bench.run(size) for _ in range(max(1, repeat)) ]
+    result = { stage: min((run[stage] for run in runs), key=lambda stat: stat['seconds']) for stage in Bench.stages }
+    result['write2file']['rows'] = runs[0]['write2file']['rows']
+    return result
+
+def startup(viz_file, argv, runs=5) -> list:
+    """Return the seconds from process start to the first Jira request of VizProject ARGV, one per run"""
+    seconds = []
+    with tempfile.TemporaryDirectory() as tmp:                      # 日志/输出文件不写入当前目录
+        for _ in range(runs):
+            t0 = time.time()
+            proc = subprocess.run([ sys.executable, '-c', STARTUP_PROBE, viz_file ] + argv, cwd=tmp, capture_output=True, text=True)
+            stamps = [ line.split()[1] for line in proc.stdout.splitlines() if line.startswith('FIRST_REQUEST') ]
+            if not stamps:
+                raise RuntimeError('No Jira request from {}: {}'.format(argv, proc.stderr[-500:]))
+            seconds.append(float(stamps[-1]) - t0)
+    return seconds
+
+def compare(results, baseline, tolerance) -> list:
+    """Return the regressions of RESULTS against BASELINE, rate lower or peak memory higher than TOLERANCE"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, stat in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base:
+                continue
+            if base.get('rate') and stat['rate'] < base['rate'] * (1 - tolerance):
+                regressions.append('{} @ {}: {:.0f} issues/s < baseline {:.0f}'.format(stage, size, stat['rate'], base['rate']))
+            if base.get('peak_mb') and stat.get('peak_mb') and stat['peak_mb'] > base['peak_mb'] * (1 + tolerance):
+                regressions.append('{} @ {}: {:.1f}MB > baseline {:.1f}MB'.format(stage, size, stat['peak_mb'], base['peak_mb']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='********** VizProject benchmark with synthetic Jira data **********')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[ 1000, 10000, 100000 ], metavar='N', help='(可选参数)测试的issue数量, 默认: 1000 10000 100000')
+    parser.add_argument('--seed', type=int, default=0, help='(可选参数)随机种子, 相同种子生成相同数据, 默认: 0')
+    parser.add_argument('--comments', type=int, default=5, help='(可选参数)每个issue平均comment数, 默认: 5')
+    parser.add_argument('--histories', type=int, default=8, help='(可选参数)每个issue平均changelog history数, 默认: 8')
+    parser.add_argument('--label-churn', type=float, default=0.25, help='(可选参数)history中labels变更的比例, 默认: 0.25')
+    parser.add_argument('--page-size', type=int, default=1000, help='(可选参数)每页issue数(与search_issues的maxResults一致), 默认: 1000')
+    parser.add_argument('--repeat', type=int, default=3, metavar='N', help='(可选参数)每个数量预热一次后重复测试N次, 每个阶段取最快的一次, 默认: 3')
+    parser.add_argument('--no-memory', action='store_true', help='(可选参数)跳过tracemalloc峰值内存测量(测量时需额外运行一遍), 默认: False')
+    parser.add_argument('--save', metavar='FILE', help='(可选参数)保存结果到json文件, 可作为之后的--baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='(可选参数)与基准结果对比, 超出--tolerance则返回非0')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='(可选参数)允许的性能下降比例, 默认: 0.2')
+    parser.add_argument('--startup', action='store_true', help='(可选参数)只测试VizProject从启动到第一个Jira请求的耗时, 超出--startup-budget则返回非0, 默认: False')
+    parser.add_argument('--startup-runs', type=int, default=5, metavar='N', help='(可选参数)每组参数的启动次数, 取中位数, 默认: 5')
+    parser.add_argument('--startup-budget', type=float, default=1.0, metavar='SECONDS', help='(可选参数)启动到第一个Jira请求的耗时上限(秒), 默认: 1.0')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from rich.console import Console
+    from rich.table import Table
+
+    if args.startup:
+        viz_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'VizProject.py')
+        table = Table(title='VizProject time to first request (runs={}, budget={:.2f}s)'.format(args.startup_runs, args.startup_budget))
+        for column in ('Case', 'Median', 'Max', 'Args'):
+            table.add_column(column, justify='left' if column in ('Case', 'Args') else 'right')
+        regressions = []
+        for case, argv in STARTUP_CASES.items():
+            seconds = startup(viz_file, argv, args.startup_runs)
+            median = statistics.median(seconds)
+            table.add_row(case, '{:.3f}s'.format(median), '{:.3f}s'.format(max(seconds)), ' '.join(argv))
+            if median > args.startup_budget:
+                regressions.append('{}: {:.3f}s > budget {:.2f}s'.format(case, median, args.startup_budget))
+        Console().print(table)
+        for regression in regressions:
+            logging.error('Regression: {}'.format(regression))
+        sys.exit(1 if regressions else 0)
+
+    argv, sys.argv = sys.argv, VIZ_ARGV
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import VizProject
+    sys.argv = argv
+    VizProject.curr_time = time.strftime('%Y%m%d_%H%M%S', time.localtime(time.time()))
+    VizProject.roster = VizProject.Roster({ 'QA': [ '.'.join(part.capitalize() for part in x.split('.')) for x in TEAM ] })     # ex: jianfan.ai -> Jianfan.Ai
+
+    generator = JiraPayloadGenerator(seed=args.seed, comments=args.comments, histories=args.histories, label_churn=args.label_churn)
+    bench = Bench(VizProject, generator, page_size=args.page_size)
+    results = {}
+    bench.run(min(args.sizes))                                      # 预热: import/编译分析插件/首次分配内存等不计入结果
+    for size in args.sizes:
+        results[str(size)] = best_of(bench, size, args.repeat)
+        if not args.no_memory:
+            for stage, stat in bench.run(size, memory=True).items():
+                results[str(size)][stage]['peak_mb'] = stat['peak_mb']
+
+    table = Table(title='VizProject Benchmark (seed={}, comments={}, histories={}, label churn={}, best of {})'.format(args.seed, args.comments, args.histories, args.label_churn, args.repeat))
+    for column in ('Issues', 'Stage', 'Seconds', 'Issues/s', 'Peak MB'):
+        table.add_column(column, justify='left' if column == 'Stage' else 'right')
+    for size, stages in results.items():
+        for stage in Bench.stages:
+            stat = stages[stage]
+            table.add_row(size, stage, '{:.2f}'.format(stat['seconds']), '{:.0f}'.format(stat['rate']), '{:.1f}'.format(stat['peak_mb']) if not args.no_memory else '-')
+    VizProject.console.print(table)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        logging.warning('Saved to: {}'.format(os.path.abspath(args.save)))
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            logging.error('Regression: {}'.format(regression))
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
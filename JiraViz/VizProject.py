@@ -6,21 +6,27 @@
 # __Purpose__: Manage projects through Jira data visualization
 ##################################################
 
-import os, sys, time, subprocess, xlwt
+import os, sys, time
+import re, csv, json, gzip, zlib, hashlib, sqlite3, threading
 import calendar
 import requests
 import logging
 import argparse
-import numpy as np
-from jira import JIRA
-from datetime import datetime
+try:
+    import resource                      # 峰值内存(ru_maxrss), Windows下没有该模块
+except ImportError:
+    resource = None
+from jira import JIRA, JIRAError
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from time import sleep
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from contextlib import contextmanager
 from rich.progress import track
 from rich.console import Console
 from rich.logging import RichHandler
-from rich.panel import Panel
+from xml.sax.saxutils import escape
 # import pysnooper
 requests.packages.urllib3.disable_warnings()
 
@@ -42,11 +48,37 @@ parser.add_argument('--testcase-check', action='store_true', help='(可选参数
 parser.add_argument('--active-check', action='store_true', help='(可选参数)搜索统计Jira数据中所有人员comment活跃度占比, 默认: False')
 parser.add_argument('--label-check', type=str, nargs='+', help='(可选参数)搜索统计Jira数据中添加labels人员的占比, ex: Common_From_Project, SH-Support-2023')
 parser.add_argument('--verify-check', action='store_true', help='(可选参数)搜索统计Jira数据中verified人员的占比')
-parser.add_argument('--epic-check', action='store_true', help='(可选参数)搜索统计Jira所属的epic信息')
+parser.add_argument('--epic-check', action='store_true', help='(可选参数)搜索统计Jira所属的epic信息, 按epic汇总issue数/未解决数/Severity分布/DI, epic名称与状态通过少量key in (...)批量搜索获取, 配合-o保存为Epic_Result_YYYYMMDD_HHMMSS.xlsx')
 parser.add_argument('--di-count', action='store_true', help='(可选参数)搜索统计Severity并计算整体DI值')
 parser.add_argument('--raw-command', nargs=1, metavar='JQL', help='(可选参数)通过JQL语句来搜索Jira数据, ex: "Project ID" = AM30A2-T950D4 AND status in (OPEN, Reopened)"')
 parser.add_argument('-e', '--expand', action='store_true', help='(可选参数)搜索范围加入changelog的历史操作数据, 默认: False')
 parser.add_argument('-o', '--output', action='store_true', help='(可选参数)保存数据到本地excel表格, 表格默认命名: Output_Result_YYYYMMDD_HHMMSS.xlsx, 默认: False')
+parser.add_argument('--jobs', type=int, default=1, metavar='N', help='(可选参数)并发获取Jira分页数据的线程数, ex: 8, 默认: 1')
+parser.add_argument('--cache', nargs='?', const='VizProject_cache.db', metavar='DB', help='(可选参数)使用本地SQLite缓存Jira数据, 仅增量同步有更新的issues, 默认文件: VizProject_cache.db')
+parser.add_argument('--refresh', action='store_true', help='(可选参数)忽略本地缓存, 重新完整下载JQL数据并写入缓存, 默认: False')
+parser.add_argument('--stream', action='store_true', help='(可选参数)逐个issue流式分析并立即释放原始json数据, 内存占用与JQL数据量无关, 默认: False')
+parser.add_argument('--columnar', action='store_true', help='(可选参数)issue数据按列存储(NumPy), DI/TestCase/Cost/Excel基于列数据向量化计算, 默认: False')
+parser.add_argument('--hydrate', action='store_true', help='(可选参数)补全search结果中被截断的changelog与comments(按--jobs并发请求), 默认: False')
+parser.add_argument('--record', metavar='DIR', help='(可选参数)录制所有search_issues原始分页数据到DIR目录(gzip压缩的JSONL), 全部分页完成后才保存, 中途停止或出错时不覆盖之前的录制, ex: snapshot_0301')
+parser.add_argument('--replay', metavar='DIR', help='(可选参数)基于--record录制的分页数据进行分析与导出, 无需登录Jira, ex: snapshot_0301')
+parser.add_argument('--batch', nargs='?', const='', metavar='FILE', help='(可选参数)批量模式: FILE为{"名称": "JQL"}格式的json文件, 不带FILE时按--project-id逐个生成JQL, 并发搜索且重复issue只解析一次')
+parser.add_argument('--output-format', choices=['xlsx', 'csv', 'tsv'], default='xlsx', help='(可选参数)-o输出文件格式, xlsx为逐行写入磁盘的流式表格, 不受行数限制, 默认: xlsx')
+parser.add_argument('--chart', nargs='+', choices=['svg', 'png', 'json'], metavar='FORMAT', help='(可选参数)同时保存统计图表到本地文件, 可选: svg png json, 文件默认命名: Chart_类别_YYYYMMDD_HHMMSS.svg')
+parser.add_argument('--profile', action='store_true', help='(可选参数)记录各阶段及每个search分页的耗时/接收字节数/issue数/峰值内存, 结束时打印汇总并保存为Profile_Report_YYYYMMDD_HHMMSS.json, 默认: False')
+parser.add_argument('--procs', type=int, default=1, metavar='N', help='(可选参数)多进程解析分页数据的进程数, 适用于-e带changelog的大量数据, 结果与单进程一致, ex: 4, 默认: 1')
+parser.add_argument('--page-size', type=int, default=1000, metavar='N', help='(可选参数)search单页的最大issue数, 实际大小受服务器限制并根据响应耗时与数据量自动调整, 默认: 1000')
+parser.add_argument('--rate', type=float, default=0, metavar='R', help='(可选参数)所有Jira请求共用的最大请求速率(次/秒), 遇到429(或带Retry-After的503)时自动降速并遵循Retry-After, 0=不限速, 默认: 0')
+parser.add_argument('--trend', choices=['week', 'month'], help='(可选参数)趋势模式: 一次获取--duration时间范围内的数据, 按周/月统计Created/Resolved/Open Backlog/DI, 配合-o保存为Trend_Result_YYYYMMDD_HHMMSS.xlsx, ex: month')
+parser.add_argument('--serve', nargs='?', const='127.0.0.1:8765', metavar='HOST:PORT', help='(可选参数)守护模式: 保持登录的Jira session/分析插件/结果缓存, 通过本地HTTP接口返回JQL的json统计结果, 默认地址: 127.0.0.1:8765')
+parser.add_argument('--ttl', type=int, default=300, metavar='SECONDS', help='(可选参数)守护模式下相同JQL结果的缓存时间(秒), 0=不缓存, 默认: 300')
+parser.add_argument('--logo', action='store_true', help='(可选参数)启动时显示logo并停留1s, 默认: False')
+parser.add_argument('--server', default='https://jira.amlogic.com', metavar='URL', help='(可选参数)Jira服务器地址, 可指向FakeJira.py等本地测试服务器, 默认: https://jira.amlogic.com')
+parser.add_argument('--index', nargs='?', const='VizProject_index.db', metavar='DB', help='(可选参数)将获取的issue summary/description/comments按issue key增量写入本地全文索引(SQLite FTS5), 默认文件: VizProject_index.db')
+parser.add_argument('--grep', nargs='+', metavar='TEXT', help='(可选参数)在--index本地全文索引中搜索, 按相关度排序, 每个TEXT按短语匹配(多个TEXT需同时匹配), 无需登录Jira, ex: "HDCP timeout" HDCP-timeout')
+parser.add_argument('--transitions', action='store_true', help='(可选参数)将changelog的每个item展开为事件表(NumPy), 统计status流转次数/各状态停留时间/Created到Resolved与Verified的耗时/Reopened次数, 自动加载changelog, 默认: False')
+parser.add_argument('--links', nargs='?', type=int, const=1, metavar='DEPTH', help='(可选参数)根据issuelinks建立关联图, 按key in (...)批量搜索扩展DEPTH层未获取的关联issue, 统计连通分量/clone家族/最长blocks链, 默认DEPTH: 1')
+parser.add_argument('--roster', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'VizRoster.json'), metavar='FILE', help='(可选参数)QA人员名单配置文件(json), 按SZ/BJ/SH等site分组, 支持aliases别名, 默认: VizRoster.json')
+parser.add_argument('--grep-raw', action='store_true', help='(可选参数)--grep的TEXT按FTS5语法解析(短语"..."、AND/OR/NOT、前缀*), 默认: False')
 parser.add_argument('--verbose', action='store_true', help='(可选参数)加上该参数会打印更多调试信息, 默认: False')
 args = parser.parse_args()
 
@@ -74,8 +106,43 @@ ACTIVE_CHECK = args.active_check         # [19]获取active_check     -> bool
 VERBOSE_FLAG = args.verbose              # [20]获取verbose_flag     -> bool   (ex: True | False)
 EXPAND_FLAG = args.expand                # [21]获取expand_flag      -> bool   (ex: True | False) 
 OUTPUT_FLAG = args.output                # [22]获取output_flag      -> bool   (ex: True | False)
+JOBS = max(1, args.jobs)                 # [23]获取并发线程数         -> int    (ex: 1 | 8)
+CACHE_DB = args.cache                    # [24]获取本地缓存文件       -> string (ex: VizProject_cache.db)
+REFRESH_FLAG = args.refresh              # [25]获取refresh_flag     -> bool   (ex: True | False)
+STREAM_FLAG = args.stream                # [26]获取stream_flag      -> bool   (ex: True | False)
+COLUMNAR_FLAG = args.columnar            # [27]获取columnar_flag    -> bool   (ex: True | False)
+HYDRATE_FLAG = args.hydrate              # [28]获取hydrate_flag     -> bool   (ex: True | False)
+RECORD_DIR = args.record                 # [29]获取录制目录           -> string (ex: snapshot_0301)
+REPLAY_DIR = args.replay                 # [30]获取回放目录           -> string (ex: snapshot_0301)
+BATCH_FILE = args.batch                  # [31]获取批量JQL文件        -> string (ex: weekly_queries.json | '')
+OUTPUT_FORMAT = args.output_format       # [32]获取输出文件格式        -> string (ex: xlsx | csv | tsv)
+CHART_FORMATS = args.chart               # [33]获取图表保存格式        -> list   (ex: ['svg', 'json'])
+PROFILE_FLAG = args.profile              # [34]获取profile_flag     -> bool   (ex: True | False)
+PROCS = max(1, args.procs)               # [35]获取解析进程数         -> int    (ex: 1 | 4)
+PAGE_SIZE = max(1, args.page_size)       # [36]获取最大分页大小        -> int    (ex: 1000)
+RATE = max(0, args.rate)                 # [37]获取最大请求速率        -> float  (ex: 20 | 0)
+TREND = args.trend                       # [38]获取趋势统计周期        -> string (ex: week | month)
+SERVE_ADDR = args.serve                  # [39]获取守护模式监听地址     -> string (ex: 127.0.0.1:8765)
+SERVE_TTL = max(0, args.ttl)             # [40]获取结果缓存时间        -> int    (ex: 300)
+LOGO_FLAG = args.logo                    # [41]获取logo_flag        -> bool   (ex: True | False)
+SERVER_URL = args.server                 # [42]获取Jira服务器地址      -> string (ex: https://jira.amlogic.com)
+INDEX_DB = args.index                    # [43]获取全文索引文件        -> string (ex: VizProject_index.db)
+GREP_TEXT = args.grep                    # [44]获取全文搜索内容        -> list   (ex: ['HDCP timeout'])
+TRANSITIONS = args.transitions           # [45]获取changelog流转统计开关 -> bool (ex: True | False)
+LINK_DEPTH = args.links                  # [46]获取关联图扩展层数      -> int    (ex: 2)
+ROSTER_FILE = args.roster                # [47]获取QA人员名单文件      -> string (ex: VizRoster.json)
+GREP_RAW = args.grep_raw                 # [48]获取FTS5语法搜索开关    -> bool   (ex: True | False)
 ################################################################################################
 
+#* 按需导入: 只在对应参数开启时才加载, 缩短cron/CI中小查询的启动时间(xlsxwriter/rich图表在使用处导入)
+if COLUMNAR_FLAG or TREND or TRANSITIONS:
+    import numpy as np
+if BATCH_FILE is not None:
+    import asyncio
+if SERVE_ADDR:
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+
 # @pysnooper.snoop()
 def args_init() -> dict:
     """parser args value and print from stdin"""
@@ -103,11 +170,48 @@ def args_init() -> dict:
                     'Verbose': VERBOSE_FLAG,           #[20]
                     'Expand': EXPAND_FLAG,             #[21]
                     'Output': OUTPUT_FLAG,             #[22]
+                    'Jobs': JOBS,                      #[23]
+                    'Cache': CACHE_DB,                 #[24]
+                    'Refresh': REFRESH_FLAG,           #[25]
+                    'Stream': STREAM_FLAG,             #[26]
+                    'Columnar': COLUMNAR_FLAG,         #[27]
+                    'Hydrate': HYDRATE_FLAG,           #[28]
+                    'Record': RECORD_DIR,              #[29]
+                    'Replay': REPLAY_DIR,              #[30]
+                    'Batch': BATCH_FILE,               #[31]
+                    'Output Format': OUTPUT_FORMAT,    #[32]
+                    'Chart': CHART_FORMATS,            #[33]
+                    'Profile': PROFILE_FLAG,           #[34]
+                    'Procs': PROCS,                    #[35]
+                    'Page Size': PAGE_SIZE,            #[36]
+                    'Rate': RATE,                      #[37]
+                    'Trend': TREND,                    #[38]
+                    'Serve': SERVE_ADDR,               #[39]
+                    'TTL': SERVE_TTL,                  #[40]
+                    'Logo': LOGO_FLAG,                 #[41]
+                    'Server': SERVER_URL,              #[42]
+                    'Index': INDEX_DB,                 #[43]
+                    'Grep': GREP_TEXT,                 #[44]
+                    'Transitions': TRANSITIONS,        #[45]
+                    'Links': LINK_DEPTH,               #[46]
+                    'Roster': ROSTER_FILE,             #[47]
+                    'Grep Raw': GREP_RAW,              #[48]
                 }
 
     with _wrapper(50):
         for index, (arg, value) in enumerate(ARGS_DICT.items(), 1):
             logging.debug('[{}] {} = {}'.format(str(index).zfill(2), arg.ljust(14, ' '), value))
+
+    #* 批量模式需要逐个JQL搜索key及按key获取issues, 录制的分页数据无法支持
+    if BATCH_FILE is not None and REPLAY_DIR:
+        logging.error('--batch can not be used with --replay, pls check!')
+        sys.exit(-1)
+    #* 守护模式的每个请求都需要实时搜索Jira, 录制的分页数据中没有Jira session
+    if SERVE_ADDR and REPLAY_DIR:
+        logging.error('--serve can not be used with --replay, pls check!')
+        sys.exit(-1)
+    if BATCH_FILE is not None and any([ EPIC_CHECK, LINK_DEPTH is not None, TRANSITIONS, OUTPUT_FLAG ]):
+        logging.warning('--epic-check/--links/--transitions and the -o excel output are skipped in batch mode, -o only saves Batch_Result_YYYYMMDD_HHMMSS.json')
     return ARGS_DICT
 
 @contextmanager
@@ -117,8 +221,8 @@ def _wrapper(num):
     yield
     logging.debug('=' * num)
 
-def creat_local_file(filename):
-    excel_file = '{}_{}.xlsx'.format(filename, curr_time)
+def creat_local_file(filename, ext='xlsx'):
+    excel_file = '{}_{}.{}'.format(filename, curr_time, ext)
     return excel_file
 
 def logging_init() -> None:
@@ -152,14 +256,25 @@ class AmlJiraSystem(object):
         super().__init__()
         self.username = username
         self.password = password
-        self.jira_server = 'https://jira.amlogic.com'
+        self.jira_server = SERVER_URL
         self.di_rules = { 'Blocker': 10, 'Critical': 3, 'Major':1, 'Normal': 0.1 }
+        self.analyzers = None                   # 已编译的分析插件, 见compile_analyzers()
+        self.profiler = StageProfiler(PROFILE_FLAG)
+        self.transport = TransportStats()
+        self.scheduler = RequestScheduler(RATE, JOBS)    # 所有Jira请求共用: 令牌桶限速, 并发上限, 429(或带Retry-After的503)退避
+        self.sizer = PageSizer(PAGE_SIZE)
+        self.show_progress = True               # 是否显示解析进度条及projection估算, 多进程解析的子进程/守护模式中关闭
+        self.names = {}                         # nameUpper缓存: 原始名字 -> 格式化后的名字
+        self.timezone = None                    # Jira账号的时区, JQL中的时间按该时区解释, 见account_timezone()
         self.args_list = {}
 
     def login_jira(self) -> str:
         """Use username and password to login and return filter string"""
         try:
-            self.myjira = JIRA(self.jira_server, basic_auth=(self.username, self.password), options={'Verify': False, 'delay-reload': 5, 'headers': {'Cache-Control': 'max-age','Content-Type': 'application/json'}}, timeout=300, max_retries=10)
+            self.myjira = JIRA(self.jira_server, basic_auth=(self.username, self.password), options={'Verify': False, 'delay-reload': 5, 'headers': {'Cache-Control': 'max-age','Content-Type': 'application/json'}}, timeout=300, max_retries=0)     # 429(或带Retry-After的503)由ThrottledAdapter统一退避重试, session不再重复重试
+            self.transport.install(self.myjira._session, self.scheduler)
+            if PROFILE_FLAG:
+                self.myjira._session.hooks['response'].append(self.profiler.on_response)    # 统计每个response的字节数与服务器响应时间
             return self.myjira
         except Exception as err:
             logging.error(err)
@@ -365,6 +480,14 @@ class AmlJiraSystem(object):
         return string
 
     def nameUpper(self, name):
+        '''将姓名首字母大写并按roster别名统一, 同一个原始名字只格式化一次'''
+        upper = self.names.get(name)
+        if upper is None:
+            upper = self._nameUpper(name)
+            upper = self.names[name] = roster.aliases.get(name) or roster.aliases.get(upper) or upper
+        return upper
+
+    def _nameUpper(self, name):
         '''将姓名首字母大写,及Software Version去掉'-'后面的部分'''
         if '-' in name:
             return name.split('-')[0]     # Android P-9.0 -> Android P
@@ -392,201 +515,813 @@ class AmlJiraSystem(object):
         return list(set(b).difference(set(a)))
 
     def calculate_severity(self, object):
+        '''按di_rules中各Severity的权重计算DI值, ex: { 'Blocker': 1, 'Major': 2 } -> 12'''
         total_di = 0
         for k, v in object.items():
-            if k == 'Blocker':
-                total_di += v * 10
-            if k == 'Critical':
-                total_di += v * 3
-            if k == 'Major':
-                total_di += v * 1
-            if k == 'Normal':
-                total_di += v * 0.1
+            if k in self.di_rules:
+                total_di += v * self.di_rules[k]
         return total_di
 
-    def get_customize_fields(self):
-        '''根据参数决定search_issues中fields的具体内容'''
-        object = ['priority']
-        custom_fields = object
-        if any([ACTIVE_CHECK, VERIFY_CHECK]):
-            custom_fields = object.append('comment') 
-        if LABEL_CHECK:
-            custom_fields = object.append('labels')
-        if DI_COUNT:
-            custom_fields = object.append('customfield_10109')
-        if TESTCASE_CHECK:
-            custom_fields = object.append('customfield_11604')
+    def classify_testcase(self, testcase) -> str:
+        '''返回testcase所属的计数器名称: 有效TestCase ID, Add TestCase, None TestCase, Other TestCase'''
+        if testcase and 'TV-' in testcase:
+            return 'testcase_count'
+        elif testcase and ('case' in testcase or 'Case' in testcase):
+            return 'addcase_count'
+        elif not testcase:
+            return 'nonecase_count'
+        return 'othercase_count'
+
+    def compile_analyzers(self) -> list:
+        '''编译本次运行启用的分析插件, 日期范围/人员名单等常量只计算一次'''
+        self.now_date = datetime.strptime('{}-{}-{}'.format(datetime.now().year, datetime.now().month, datetime.now().day), '%Y-%m-%d')  # ex: now_date = 2023-02-05
+        self.analyzers = [ analyzer for analyzer in (cls(self) for cls in ANALYZERS) if analyzer.compile() ]
+        self.issue_hooks = [ x.on_issue for x in self.analyzers if type(x).on_issue is not Analyzer.on_issue ]
+        self.history_hooks = [ x.on_history for x in self.analyzers if type(x).on_history is not Analyzer.on_history ]
+        logging.debug('Analyzers: {}'.format([ type(x).__name__ for x in self.analyzers ]))
+        return self.analyzers
+
+    def get_customize_fields(self) -> list:
+        '''根据参数决定search_issues中fields的具体内容: 由启用的分析插件及输出参数推导出最小的fields集合'''
+        if self.analyzers is None:
+            self.compile_analyzers()
+        custom_fields = [ 'priority' ]                                  # 基础字段, keep_field()等均会用到
+        for analyzer in self.analyzers:
+            custom_fields += analyzer.fields
         if EPIC_CHECK:
-            custom_fields = object.append('customfield_10102') 
+            custom_fields += EpicRollup.fields                          # epic, 及按epic汇总的open/severity
         if OUTPUT_FLAG:
-            custom_fields = [ 'customfield_10107', 'customfield_10407', 'issue_id', 'component', 'status', 'priority', 'assignee', 'customfield_10700', 'created', 'updated', 'finish_date', 'cost' ]
-        return custom_fields
+            custom_fields += [ 'customfield_10107', 'customfield_10407', 'components', 'status', 'assignee', 'customfield_10700', 'created', 'updated' ]
+        if INDEX_DB:
+            custom_fields += [ 'summary', 'description', 'reporter', 'comment', 'created', 'updated' ]    # 全文索引的内容, updated用于增量更新
+        if TRANSITIONS:
+            custom_fields += ChangelogTable.fields                      # created为初始状态的起点
+        if LINK_DEPTH is not None:
+            custom_fields += LinkGraph.fields
+        return list(dict.fromkeys(custom_fields))                       # 去重并保持顺序
+
+    def get_customize_expand(self):
+        '''根据参数决定search_issues中expand的具体内容: 仅当"-e"且有分析插件需要changelog时才加载'''
+        if self.analyzers is None:
+            self.compile_analyzers()
+        if TRANSITIONS or EXPAND_FLAG and any(analyzer.expand == 'changelog' for analyzer in self.analyzers):
+            return 'changelog'
+        return None
+
+    def log_projection(self, jql):
+        """Log the planned fields/expand, and with --profile/--verbose the payload saved against fields=*all, measured on one sample issue"""
+        fields, expand = self.get_customize_fields(), self.get_customize_expand()
+        logging.info('=> Projection: fields={}, expand={}'.format(fields, expand))
+        if not (PROFILE_FLAG or VERBOSE_FLAG):
+            return                              # 估算需要额外的2个search请求, 仅在分析性能时进行
+        full_results, _ = self.search_page(jql, 0, 1, record=False, fields=[ '*all' ], expand='changelog' if EXPAND_FLAG else None)
+        projected_results, _ = self.search_page(jql, 0, 1, record=False, fields=fields, expand=expand)
+        if not full_results or not full_results.get('issues'):
+            return
+        full_bytes = len(json.dumps(full_results['issues']))
+        projected_bytes = len(json.dumps(projected_results['issues']))
+        total = full_results.get('total', 0)
+        logging.info('>>> Projection: sample issue {} -> {} bytes ({:.0%} saved), estimated {:.1f}MB saved for {} issues'.format(
+            full_bytes, projected_bytes, 1 - projected_bytes / full_bytes, (full_bytes - projected_bytes) * total / 1024 / 1024, total))
+
+    def search_page(self, jql, start_at, max_results, record=True, **search_kwargs) -> tuple:
+        """Return one json page of search_issues from START_AT and its cost time, the page is profiled if RECORD"""
+        search_kwargs.setdefault('expand', self.get_customize_expand())     # 如参数带上"-e", 则返回的json数据中会包含['changelog']该部分的数据
+        search_kwargs.setdefault('fields', self.get_customize_fields())
+        received = self.profiler.received()
+        _start = time.time()
+        jql_results = self.myjira.search_issues(jql_str=jql, 
+                                                startAt=start_at,
+                                                maxResults=max_results,           # -1等价于maxResults=5000 
+                                                json_result=True,                 # 返回的数据格式为json
+                                                                                                   # 'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields'
+                                                **search_kwargs,
+                                                )
+                                                # fields=[
+                                                        # 'summary',
+                                                        # 'issuetype',
+                                                        # 'components', 
+                                                        # 'customfield_10407',      # project id
+                                                        # 'customfield_10107',      # product, ex: TV reference
+                                                        # 'status', 
+                                                        # 'priority', 
+                                                        # 'customfield_10109',      # severity
+                                                        # 'customfield_10300',      # sw version
+                                                        # 'customfield_10108',      # hw version
+                                                        # 'customfield_11703',      # compare status
+                                                        # 'customfield_11705',      # common issue, ex: confirmed yes or no
+                                                        # 'resolution',
+                                                        # 'fixVersions',
+                                                        # 'assignee', 
+                                                        # 'customfield_10700',      # rd manager
+                                                        # 'reporter', 
+                                                        # 'description', 
+                                                        # 'attachments', 
+                                                        # 'comment', 
+                                                        # 'duedate',
+                                                        # 'created',
+                                                        # 'updated',
+                                                        # 'labels',
+                                                        # 'issuelinks',
+                                                        # 'customfield_12200',      # report channel and role, ex: self-test and QA
+                                                        # 'customfield_11604'       # test case
+                                                        # ])
+        cost = time.time() - _start
+        if record:
+            self.profiler.page(start_at, cost, received, len((jql_results or {}).get('issues') or []))
+        return jql_results, cost
+
+    def search_range(self, jql, start_at, size, **search_kwargs) -> tuple:
+        """Return (page, cost, decoded bytes) of SIZE issues from START_AT, split the range in half on timeout"""
+        received = self.transport.received()
+        try:
+            jql_results, cost = self.search_page(jql, start_at, size, **search_kwargs)
+        except (requests.exceptions.Timeout, JIRAError) as err:
+            if isinstance(err, JIRAError) and err.status_code not in (502, 503, 504):
+                raise
+            if size <= PageSizer.min_size:
+                raise
+            #* 单页数据过大导致超时, 拆成两半分别获取, 合并后仍为连续的一页, 后续分页也相应减小
+            half = size // 2
+            self.sizer.timeout(half)
+            logging.warning('Search page startAt={} maxResults={} timeout ({}), retry as 2 x {}'.format(start_at, size, type(err).__name__, half))
+            first, first_cost, first_bytes = self.search_range(jql, start_at, half, **search_kwargs)
+            if not first or len(first.get('issues') or []) < half:
+                return first, first_cost, first_bytes
+            second, second_cost, second_bytes = self.search_range(jql, start_at + half, size - half, **search_kwargs)
+            first['issues'] = first['issues'] + ((second or {}).get('issues') or [])
+            first['maxResults'] = size
+            return first, first_cost + second_cost, first_bytes + second_bytes
+        return jql_results, cost, self.transport.received() - received
+
+    def _fetch_pages(self, jql, max_results, **search_kwargs):
+        """Yield json pages of JQL in startAt order, fetch pages concurrently when JOBS > 1, page size adapts to latency and size"""
+
+        #* 第一页: 获取total以及服务器实际允许的maxResults(服务器可能会限制单页的最大数量)
+        self.sizer = PageSizer(max_results)
+        first_page, cost, size = self.search_range(jql, 0, self.sizer.size, **search_kwargs)
+        self.page_count += 1
+        self.page_cost += cost
+        if not first_page or not first_page.get('issues'):
+            return
+        self.sizer.limit(first_page.get('maxResults') or max_results)
+        self.sizer.observe(len(first_page['issues']), cost, size)
+        yield first_page
+        total = first_page.get('total', 0)
+        next_start = len(first_page['issues'])
+
+        if JOBS <= 1:
+            #* 顺序模式: 逐页获取, 直到返回的issues为空
+            while True:
+                jql_results, cost, size = self.search_range(jql, next_start, self.sizer.size, **search_kwargs)
+                self.page_count += 1
+                self.page_cost += cost
+                if not jql_results or not jql_results.get('issues'):
+                    break
+                self.sizer.observe(len(jql_results['issues']), cost, size)
+                yield jql_results
+                next_start += len(jql_results['issues'])
+        else:
+            #* 并发模式: 根据total计算剩余的startAt, 通过固定大小的线程池共用同一个session获取
+            #* 同时在途的请求数限制为JOBS, 并按startAt顺序yield, 保证与顺序模式的统计结果一致
+            #* 每次提交时使用当前的分页大小, 各分页的范围仍然连续
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=JOBS) as executor:
+                def submit():
+                    nonlocal next_start
+                    size = self.sizer.size
+                    pending.append(executor.submit(self.search_range, jql, next_start, size, **search_kwargs))
+                    next_start += size
+                while next_start < total and len(pending) < JOBS:
+                    submit()
+                while pending:
+                    jql_results, cost, size = pending.popleft().result()
+                    self.page_count += 1
+                    self.page_cost += cost
+                    self.sizer.observe(len((jql_results or {}).get('issues') or []), cost, size)
+                    if next_start < total:
+                        submit()
+                    yield jql_results
+
+    def iter_search_pages(self, jql, max_results=1000, **search_kwargs):
+        """Yield json pages of JQL and report the fetch speedup against sequential requests"""
+
+        self.page_count = 0                     # 已获取的分页数
+        self.page_cost = 0                      # 所有分页请求耗时之和(等价于顺序请求的耗时)
+        fetch_wait = 0                          # 实际等待分页返回的耗时(不包含get_fields_data处理数据的耗时)
+
+        pages = self._fetch_pages(jql, max_results, **search_kwargs)
+        while True:
+            _start = time.time()
+            jql_results = next(pages, None)
+            fetch_wait += time.time() - _start
+            if jql_results is None:
+                break
+            if HYDRATE_FLAG:
+                self.hydrate_issues(jql_results.get('issues') or [])
+            yield jql_results
+
+        logging.info('>>> Fetch {} pages with {} jobs: {:.1f}s, sequential estimate: {:.1f}s, speedup: x{:.1f}'.format(
+            self.page_count, JOBS, fetch_wait, self.page_cost, self.page_cost / fetch_wait if fetch_wait else 1))
+        logging.info('>>> Page size: {}, {}'.format(' -> '.join(str(x) for x in self.sizer.history), self.transport.summary()))
+        logging.info('>>> Scheduler: {}'.format(self.scheduler.summary()))
+
+    def fetch_histories(self, d) -> int:
+        """Replace the truncated changelog of issue D with all histories, return the request count"""
+        histories, start_at, requests_count = [], 0, 0
+        try:
+            #* 分页接口: /rest/api/2/issue/{key}/changelog
+            while True:
+                page = self.myjira._get_json('issue/{}/changelog'.format(d['key']), params={'startAt': start_at, 'maxResults': 100})
+                requests_count += 1
+                values = page.get('values') or []
+                histories += values
+                start_at += len(values)
+                if page.get('isLast', True) or not values or start_at >= page.get('total', 0):
+                    break
+        except JIRAError as err:
+            #* 旧版本Jira Server没有分页接口, 退回到单个issue的expand=changelog
+            logging.debug('{} changelog endpoint error: {}, fallback to issue expand'.format(d['key'], err.status_code))
+            histories = self.myjira._get_json('issue/{}'.format(d['key']), params={'fields': 'none', 'expand': 'changelog'})['changelog']['histories']
+            requests_count += 1
+        d['changelog'] = {'startAt': 0, 'maxResults': len(histories), 'total': len(histories), 'histories': histories}
+        return requests_count
+
+    def fetch_comments(self, d) -> int:
+        """Replace the truncated comments of issue D with all comments, return the request count"""
+        comments, start_at, requests_count = [], 0, 0
+        #* 分页接口: /rest/api/2/issue/{key}/comment
+        while True:
+            page = self.myjira._get_json('issue/{}/comment'.format(d['key']), params={'startAt': start_at, 'maxResults': 100})
+            requests_count += 1
+            values = page.get('comments') or []
+            comments += values
+            start_at += len(values)
+            if not values or start_at >= page.get('total', 0):
+                break
+        d['fields']['comment'] = {'startAt': 0, 'maxResults': len(comments), 'total': len(comments), 'comments': comments}
+        return requests_count
+
+    def hydrate_issues(self, jql_issues) -> int:
+        """Fetch the truncated changelog and comments of JQL_ISSUES in place, return the hydrated count"""
+
+        #* 仅挑选changelog或comments总数大于实际返回数量的issues
+        tasks = []
+        for d in jql_issues:
+            changelog = d.get('changelog')
+            if (EXPAND_FLAG or TRANSITIONS) and changelog and changelog.get('total', 0) > len(changelog.get('histories') or []):
+                tasks.append((self.fetch_histories, d))
+            comment = d['fields'].get('comment')
+            if (ACTIVE_CHECK or INDEX_DB) and comment and comment.get('total', 0) > len(comment.get('comments') or []):
+                tasks.append((self.fetch_comments, d))
+        if not tasks:
+            return 0
+
+        _start = time.time()
+        with ThreadPoolExecutor(max_workers=JOBS) as executor:
+            requests_count = sum(executor.map(lambda task: task[0](task[1]), tasks))
+        logging.info('>>> Hydrate {} truncated changelog/comments of {} issues: {} requests, {:.1f}s'.format(
+            len(tasks), len(jql_issues), requests_count, time.time() - _start))
+        return len(tasks)
+
+    def account_timezone(self):
+        """Return the time zone of the Jira account, JQL dates are read in it; the local time zone if the profile can not be read"""
+        if self.timezone is None:
+            try:
+                from zoneinfo import ZoneInfo
+                self.timezone = ZoneInfo(self.myjira.myself()['timeZone'])      # ex: 'Asia/Shanghai'
+            except (JIRAError, requests.exceptions.RequestException, ImportError, AttributeError, KeyError, ValueError) as err:
+                logging.debug('Jira account time zone unknown ({!r}), use the local time zone'.format(err))
+                self.timezone = datetime.now().astimezone().tzinfo
+        return self.timezone
+
+    def incremental_jql(self, jql, last_sync):
+        """Return JQL limited to issues updated since LAST_SYNC, ex: '2023-02-13T11:50:52.889+0800'"""
+        _match = re.search(r'\bORDER\s+BY\b.*$', jql, re.IGNORECASE | re.DOTALL)           # 保留原有的排序规则
+        _where, _order = (jql[:_match.start()], _match.group(0)) if _match else (jql, '')
+        #* JQL时间按Jira账号的时区解释且精度为分钟: 同步点换算到账号时区, 并提前IssueCache.sync_margin避免遗漏, ex: 2023/02/13 11:45
+        _since = IssueCache.parse_time(last_sync) - IssueCache.sync_margin
+        _since = 'updated >= "{}"'.format(_since.astimezone(self.account_timezone()).strftime('%Y/%m/%d %H:%M'))
+        _where = '({}) AND {}'.format(_where.strip(), _since) if _where.strip() else _since
+        return '{} {}'.format(_where, _order).strip()
+
+    def sync_cache(self, jql, max_results=1000):
+        """Sync JQL into local IssueCache incrementally and yield json pages from the local copy"""
+
+        cache = IssueCache(CACHE_DB)
+        fields = self.get_customize_fields()
+        if isinstance(fields, list):
+            fields = sorted(set(fields) | {'created', 'updated'})           # 增量同步依赖created/updated字段
+        expand = self.get_customize_expand()
+        query_id = cache.query_id(jql, fields, expand)
+
+        if REFRESH_FLAG:
+            cache.drop(query_id)
+        last_sync = cache.last_sync(query_id)
+
+        if last_sync:
+            #* 增量同步: 只获取updated >= last_sync的issues, 并剔除已不再满足JQL条件的issues
+            delta_jql = self.incremental_jql(jql, last_sync)
+            logging.info(f'=> Cache: {CACHE_DB}, last sync: {last_sync}, delta JQL: {delta_jql}')
+            updated = 0
+            for jql_results in self.iter_search_pages(delta_jql, max_results, fields=fields, expand=expand):
+                updated += cache.merge(query_id, jql_results['issues'])
+            live_keys = []                      # 按JQL的排序, 本地输出与实时搜索的顺序一致
+            for jql_results in self.iter_search_pages(jql, max_results, fields=['key'], expand=None):
+                live_keys.extend(d['key'] for d in jql_results['issues'])
+            removed = cache.prune(query_id, set(live_keys))
+            logging.info('>>> Cache: {} issues updated, {} issues removed'.format(updated, removed))
+        else:
+            logging.info(f'=> Cache: {CACHE_DB}, full sync')
+            live_keys = []
+            for jql_results in self.iter_search_pages(jql, max_results, fields=fields, expand=expand):
+                cache.merge(query_id, jql_results['issues'])
+                live_keys.extend(d['key'] for d in jql_results['issues'])
+        cache.order(query_id, live_keys)
+        cache.save(query_id, jql, fields, expand)
+
+        #* get_fields_data基于本地缓存数据进行分析
+        yield from cache.iter_pages(query_id, max_results)
+        cache.close()
+
+    def record_pages(self, pages, jql, record_dir):
+        """Write every json page to RECORD_DIR as gzip JSONL while yielding it, the recording is saved only if all pages were consumed"""
+        os.makedirs(record_dir, exist_ok=True)
+        pages_file = os.path.join(record_dir, 'pages.jsonl.gz')
+        count, issues, finished = 0, 0, False
+
+        def save():
+            os.replace(pages_file + '.tmp', pages_file)
+            with open(os.path.join(record_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'jql': jql, 'fields': self.get_customize_fields(), 'expand': self.get_customize_expand(), 'time': curr_time,
+                           'pages': count, 'issues': issues}, f, indent=4)
+            logging.info('>>> Recorded {} pages to: {}'.format(count, os.path.abspath(record_dir)))
+
+        #* 先写入临时文件, 全部分页完成后再替换并写入meta.json; 中途停止或出错时保留之前完整的录制, 不会留下不完整的数据
+        try:
+            with gzip.open(pages_file + '.tmp', 'wt', encoding='utf-8') as f:
+                for jql_results in pages:
+                    f.write(json.dumps(jql_results) + '\n')        # 每行一个完整的search_issues分页
+                    count += 1
+                    issues += len(jql_results.get('issues') or [])
+                    finished = not jql_results.get('issues')        # process_search在空分页处停止, 此时已是完整的结果
+                    yield jql_results
+        except BaseException as err:
+            if isinstance(err, GeneratorExit) and finished:
+                save()
+                return
+            os.remove(pages_file + '.tmp')
+            logging.warning('Recording stopped after {} pages, nothing saved to: {}'.format(count, os.path.abspath(record_dir)))
+            raise
+        save()
+
+    def index_pages(self, pages, index_db):
+        """Update the TextIndex in INDEX_DB with every json page while yielding it"""
+        text_index = TextIndex(index_db)
+        _start, total, changed, truncated = time.time(), 0, 0, 0
+        for jql_results in pages:
+            issues = jql_results.get('issues') or []
+            total += len(issues)
+            changed += text_index.update(issues)
+            truncated += sum(1 for d in issues if TextIndex.truncated(d))
+            yield jql_results
+        if truncated:
+            logging.warning('>>> Index: comments of {} issues are truncated by search, add --hydrate to index all comments'.format(truncated))
+        logging.info('>>> Index: {}, {} of {} issues re-indexed, {:.1f}s, total: {} issues, {} documents'.format(
+            os.path.abspath(index_db), changed, total, time.time() - _start, *text_index.size()))
+        text_index.close()
+
+    def grep(self, texts, index_db, raw=False, limit=30) -> list:
+        """Print the issues in INDEX_DB matching every phrase of TEXTS (or TEXTS as FTS5 syntax if RAW), ranked by bm25"""
+        from rich.table import Table
+        from rich.text import Text
+        if not os.path.exists(index_db):
+            logging.error('Index file not found: {}, pls create it by --index first!'.format(index_db))
+            sys.exit(-1)
+        text_index = TextIndex(index_db)
+        text = ' '.join(texts) if raw else TextIndex.phrases(texts)
+        _start = time.time()
+        try:
+            rows = text_index.search(text, limit)
+        except sqlite3.OperationalError as err:
+            logging.error('Illegal grep text: {}, Error: {}'.format(text, err))       # ex: --grep-raw时的FTS5语法错误
+            sys.exit(-1)
+        issues, docs = text_index.size()
+        table = Table(title='Grep: {} ({} matches in {} issues / {} documents, {:.3f}s)'.format(text, len(rows), issues, docs, time.time() - _start))
+        for column in ('Rank', 'Issue', 'Kind', 'Author', 'Created', 'Snippet'):
+            table.add_column(column, justify='right' if column == 'Rank' else 'left')
+        for rank, (key, kind, author, created, snippet, _) in enumerate(rows, 1):
+            table.add_row(str(rank), key, kind, str(author), (created or '')[:10], Text(' '.join(snippet.split())))
+        console.print(table)
+        text_index.close()
+        return rows
+
+    def replay_pages(self, replay_dir):
+        """Yield json pages recorded by --record lazily, only one page is decoded at a time"""
+        with open(os.path.join(replay_dir, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        logging.info('=> Replay: {}, recorded at {}, JQL: {}'.format(os.path.abspath(replay_dir), meta.get('time'), meta.get('jql')))
+        if self.get_customize_expand() and not meta.get('expand'):
+            logging.warning('Recorded pages have no changelog, pls record with "-e" for the changelog analyses')
+        count, issues = 0, 0
+        with gzip.open(os.path.join(replay_dir, 'pages.jsonl.gz'), 'rt', encoding='utf-8') as f:
+            for line in f:
+                jql_results = json.loads(line)
+                count += 1
+                issues += len(jql_results.get('issues') or [])
+                yield jql_results
+        #* 旧版本的录制没有pages/issues, 不做检查
+        if 'pages' in meta and (count, issues) != (meta['pages'], meta.get('issues')):
+            logging.error('Replay {} is incomplete: {} pages/{} issues, recorded {} pages/{} issues, pls record again!'.format(
+                os.path.abspath(replay_dir), count, issues, meta['pages'], meta.get('issues')))
+            sys.exit(-1)
 
     # @pysnooper.snoop()
+    def parse_pages(self, pages):
+        """Yield PAGES in order with page['partial'] = (output rows, counters) parsed by a pool of PROCS processes"""
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=PROCS, initializer=_init_parse_worker, initargs=(roster, )) as executor:
+            for jql_results in pages:
+                #* 同时在途的分页数限制为PROCS的2倍, 按顺序返回, 保证与单进程的统计结果一致
+                pending.append((jql_results, executor.submit(_parse_page, jql_results.get('issues') or [])))
+                if len(pending) > 2 * PROCS:
+                    jql_results, future = pending.popleft()
+                    jql_results['partial'] = future.result()
+                    yield jql_results
+            while pending:
+                jql_results, future = pending.popleft()
+                jql_results['partial'] = future.result()
+                yield jql_results
+
     def process_search(self, jql) -> list:
         """Return a generator object from an advance filter"""
         
         logging.info(f'=> JQL: {jql}')
 
-        start_at = 0                            # search起始值
-        max_results = 1000                      # search最大值
+        max_results = PAGE_SIZE                 # search最大值, 实际分页大小根据响应耗时与数据量自动调整
         
         self.segment = 0                        # JQL分段计数
         self.jql_total = 0                      # JQL总数
         self.fields = {}                        # JQL中fields总数
-        self.commentor_all_count = []           # JQL中所有comments人员        ex: [ 'Zanbo.Huang', 'Maoguo.Xie' ]
-        self.verified_all_count = Counter()     # JQL中所有verified人员        ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
-        self.verified_QA_count = Counter()      # JQL中所有QA verified人员     ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
-        self.support_label_count = Counter()    # JQL中所有打上特定Label的人员   ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
-        self.severity_count = Counter()
-        self.testcase_count = Counter()
-        self.addcase_count = Counter()
-        self.othercase_count = Counter()
-        self.nonecase_count = Counter()
-
-        while True:
-            jql_results = self.myjira.search_issues(jql_str=jql, 
-                                                    startAt=start_at,
-                                                    maxResults=max_results,           # -1等价于maxResults=5000 
-                                                    json_result=True,                 # 返回的数据格式为json
-                                                                                                       # 'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields'
-                                                    expand='changelog' if EXPAND_FLAG else None,       # 如参数带上"-e", 则返回的json数据中会包含['changelog']该部分的数据
-                                                    fields=self.get_customize_fields(),
-                                                    )
-                                                    # fields=[
-                                                            # 'summary',
-                                                            # 'issuetype',
-                                                            # 'components', 
-                                                            # 'customfield_10407',      # project id
-                                                            # 'customfield_10107',      # product, ex: TV reference
-                                                            # 'status', 
-                                                            # 'priority', 
-                                                            # 'customfield_10109',      # severity
-                                                            # 'customfield_10300',      # sw version
-                                                            # 'customfield_10108',      # hw version
-                                                            # 'customfield_11703',      # compare status
-                                                            # 'customfield_11705',      # common issue, ex: confirmed yes or no
-                                                            # 'resolution',
-                                                            # 'fixVersions',
-                                                            # 'assignee', 
-                                                            # 'customfield_10700',      # rd manager
-                                                            # 'reporter', 
-                                                            # 'description', 
-                                                            # 'attachments', 
-                                                            # 'comment', 
-                                                            # 'duedate',
-                                                            # 'created',
-                                                            # 'updated',
-                                                            # 'labels',
-                                                            # 'issuelinks',
-                                                            # 'customfield_12200',      # report channel and role, ex: self-test and QA
-                                                            # 'customfield_11604'       # test case
-                                                            # ])
+        self.aggregate = FieldsAggregate(stream=STREAM_FLAG or PROCS > 1)        # 多进程解析返回的均为Counter
+        self.commentor_all_count = self.aggregate.commentor_all_count    # JQL中所有comments人员        ex: [ 'Zanbo.Huang', 'Maoguo.Xie' ], stream模式: { 'Zanbo.Huang': 3 }
+        self.verified_all_count = self.aggregate.verified_all_count      # JQL中所有verified人员        ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
+        self.verified_QA_count = self.aggregate.verified_QA_count        # JQL中所有QA verified人员     ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
+        self.support_label_count = self.aggregate.support_label_count    # JQL中所有打上特定Label的人员   ex: { 'Zanbo.Huang': 3, 'Maoguo.Xie': 2 }
+        self.severity_count = self.aggregate.severity_count
+        self.testcase_count = self.aggregate.testcase_count
+        self.addcase_count = self.aggregate.addcase_count
+        self.othercase_count = self.aggregate.othercase_count
+        self.nonecase_count = self.aggregate.nonecase_count
+        self.totals = self.aggregate.totals                              # 所有计数器的累计总数, 汇总信息直接读取, 无需重新求和
+        self.table = IssueTable(self.nameUpper) if COLUMNAR_FLAG else None
+        self.events = ChangelogTable(self.nameUpper) if TRANSITIONS else None
+        self.epic_rollup = EpicRollup(self.di_rules) if EPIC_CHECK else None
+        self.link_graph = LinkGraph() if LINK_DEPTH is not None else None
+        self.compile_analyzers()
+
+        #* 分页数据来源: 录制文件 > 本地缓存 > Jira服务器
+        if not REPLAY_DIR and self.show_progress:
+            self.log_projection(jql)
+        if REPLAY_DIR:
+            pages = self.replay_pages(REPLAY_DIR)
+        elif CACHE_DB:
+            pages = self.sync_cache(jql, max_results)
+        else:
+            pages = self.iter_search_pages(jql, max_results)
+        if RECORD_DIR:
+            pages = self.record_pages(pages, jql, RECORD_DIR)
+        if INDEX_DB:
+            pages = self.index_pages(pages, INDEX_DB)
+        pages = self.profiler.timed(pages, 'fetch')
+        if PROCS > 1 and not COLUMNAR_FLAG:
+            pages = self.profiler.timed(self.parse_pages(pages), 'procs', nested='fetch')      # 只统计等待子进程解析的时间
+
+        #* stream模式下excel输出行在分析时直接写入文件, 不在内存中保留
+        writer = ResultWriter(output_format=OUTPUT_FORMAT) if STREAM_FLAG and OUTPUT_FLAG and not COLUMNAR_FLAG else None
+
+        for jql_results in pages:
             if not jql_results:
                 break
+            _parse_start = time.time()
             
             # 所需的目标Json数据内容
             jql_issues = jql_results.get('issues')
             
-            if jql_issues:
+            if not jql_issues:
+                # logging.warning('No issues were found')
+                break
 
+            page_count = len(jql_issues)
+            totals_before = self.totals.copy()
+            if self.events is not None:
+                self.events.extend(jql_issues)          # 在stream模式释放原始json之前展开changelog
+            if self.epic_rollup is not None:
+                self.epic_rollup.add(jql_issues)
+            if self.link_graph is not None:
+                self.link_graph.add(jql_issues)
+            severity_before = self.severity_count.copy()
+
+            if 'partial' in jql_results:
+                #* 多进程解析: 子进程返回的输出行与计数器直接合并
+                rows, counters = jql_results['partial']
+                for i, row in rows:
+                    if writer:
+                        writer.write(row)
+                    elif OUTPUT_FLAG:
+                        self.fields[self.jql_total + i] = [ row ]
+                for name in FieldsAggregate.counter_names:
+                    self.aggregate.merge(name, counters[name])
+            elif COLUMNAR_FLAG:
+                #* columnar模式: issue字段按列存储, DI/TestCase/Cost/Excel数据均基于列数据向量化计算
+                page_start = self.table.size
+                self.table.extend(jql_issues)
+                if any([ACTIVE_CHECK, VERIFY_CHECK, LABEL_CHECK]):
+                    #* comments与changelog相关的统计仍需逐个issue遍历, 仅合并这部分计数
+                    page_aggregate = FieldsAggregate(stream=STREAM_FLAG)
+                    for _ in self.iter_fields(jql_issues, page_aggregate, release=STREAM_FLAG):
+                        pass
+                    for name in ('commentor_all_count', 'verified_all_count', 'verified_QA_count', 'support_label_count'):
+                        self.aggregate.merge(name, getattr(page_aggregate, name))
+                if DI_COUNT:
+                    self.aggregate.merge('severity_count', self.table.severity_count(self.di_rules, page_start))
+                if TESTCASE_CHECK:
+                    for name, counter in self.table.testcase_count(self.classify_testcase, page_start).items():
+                        self.aggregate.merge(name, counter)
+            elif STREAM_FLAG:
+                #* stream模式: 逐个issue直接累加到整体计数中, 原始json在分析后立即释放, excel输出行直接写入文件
+                for i, field in self.iter_fields(jql_issues, self.aggregate, release=True):
+                    if writer and self.keep_field(field):
+                        writer.write(field)
+                del jql_results, jql_issues
+            else:
                 _fields, _commentor_all_count, _verified_all_count, _verified_QA_count, _support_label_count, _severity_count, _testcase_count, _addcase_count, _othercase_count, _nonecase_count = self.get_fields_data(jql_issues)
-                self.segment += 1
-                logging.info('>>> [{}] - Total issues: {}'.format(self.segment, len(jql_issues)))
-                
-                # Comments活跃度
-                if ACTIVE_CHECK:
-                    logging.info('>>> [{}] - Total Comments histories: {}'.format(self.segment, len(_commentor_all_count)))
-                
-                # Verified记录
-                if VERIFY_CHECK:
-                    logging.info('>>> [{}] - Total Verified histories: {}'.format(self.segment, sum([x for x in dict(self.verified_all_count).values()])))
-                    logging.info('>>> [{}] - Total QA Verified Count: {}'.format(self.segment, sum([x for x in _verified_QA_count.values()])))
-                
-                # Label添加记录
-                if LABEL_CHECK:
-                    logging.info('>>> [{}] - Total Label Count: {}'.format(self.segment, sum([x for x in _support_label_count.values()])))
 
-                if DI_COUNT:
-                    logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, sum([x for x in _severity_count.values()])))
-                    logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, dict(_severity_count)))
-                    logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, self.calculate_severity(dict(_severity_count))))
+                # 整体数据合并(dict), index按JQL总数偏移, 避免不同分段之间相互覆盖
+                self.fields.update({ self.jql_total + k: v for k, v in _fields.items() })
+                # comments分段相加(list)
+                self.aggregate.merge('commentor_all_count', _commentor_all_count)
+                # verified人员分段相加(dict)
+                self.aggregate.merge('verified_all_count', _verified_all_count)
+                # QA verified人员分段相加(dict)
+                self.aggregate.merge('verified_QA_count', _verified_QA_count)
+                # SH-Support-2023 Label统计
+                self.aggregate.merge('support_label_count', _support_label_count)
+                # Severity分段相加(dict)
+                self.aggregate.merge('severity_count', _severity_count)
+                # 有效TestCase ID分段相加
+                self.aggregate.merge('testcase_count', _testcase_count)
+                # Add TestCase分段相加
+                self.aggregate.merge('addcase_count', _addcase_count)
+                # None TestCase分段相加
+                self.aggregate.merge('nonecase_count', _nonecase_count)
+                # Other TestCase分段相加
+                self.aggregate.merge('othercase_count', _othercase_count)
+
+            # 当前分段的计数(仅计算差值, 与累计数据量无关)
+            page_totals = self.totals - totals_before
+            page_severity = self.severity_count - severity_before
+
+            self.segment += 1
+            logging.info('>>> [{}] - Total issues: {}'.format(self.segment, page_count))
             
-            else:
-                # logging.warning('No issues were found')
-                break
+            # Comments活跃度
+            if ACTIVE_CHECK:
+                logging.info('>>> [{}] - Total Comments histories: {}'.format(self.segment, page_totals['commentor_all_count']))
             
-            # 搜索起始值按1000往上递增
-            start_at += max_results
+            # Verified记录
+            if VERIFY_CHECK:
+                logging.info('>>> [{}] - Total Verified histories: {}'.format(self.segment, page_totals['verified_all_count']))
+                logging.info('>>> [{}] - Total QA Verified Count: {}'.format(self.segment, page_totals['verified_QA_count']))
             
-            # 整体数据合并(dict)
-            self.fields.update(_fields)
-            # comments分段相加(list)
-            self.commentor_all_count += _commentor_all_count
-            # verified人员分段相加(dict)
-            self.verified_all_count += Counter(_verified_all_count)
-            # QA verified人员分段相加(dict)
-            self.verified_QA_count += Counter(_verified_QA_count)
-            # SH-Support-2023 Label统计
-            self.support_label_count += Counter(_support_label_count)
-            # Severity分段相加(dict)
-            self.severity_count += Counter(_severity_count)
-            # 有效TestCase ID分段相加
-            self.testcase_count += Counter(_testcase_count)
-            # Add TestCase分段相加
-            self.addcase_count += Counter(_addcase_count)
-            # None TestCase分段相加
-            self.nonecase_count += Counter(_nonecase_count)
-            # Other TestCase分段相加
-            self.othercase_count += Counter(_othercase_count)
+            # Label添加记录
+            if LABEL_CHECK:
+                logging.info('>>> [{}] - Total Label Count: {}'.format(self.segment, page_totals['support_label_count']))
+
+            if DI_COUNT:
+                logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, page_totals['severity_count']))
+                logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, dict(page_severity)))
+                logging.info('>>> [{}] - Total DI Count: {}'.format(self.segment, self.calculate_severity(dict(page_severity))))
+
             # JQL的总和计数(int)
-            self.jql_total += len(jql_issues)
+            self.jql_total += page_count
+            self.profiler.add('parse', time.time() - _parse_start, issues=page_count)
 
             with self._wrapper(50):
                 logging.info('[01]------------Total Issues: {}'.format(self.jql_total))
-                logging.info('[02]Total Comments Histories: {}'.format(len(self.commentor_all_count)))
-                logging.info('[03]Total Verified Histories: {}'.format(sum([x for x in dict(self.verified_all_count).values()])))
+                logging.info('[02]Total Comments Histories: {}'.format(self.totals['commentor_all_count']))
+                logging.info('[03]Total Verified Histories: {}'.format(self.totals['verified_all_count']))
                 logging.info('[04]--------------Date Range: {}'.format(DATERANGE))
-                logging.info('[05]-Total QA Verified Count: {}'.format(sum([x for x in dict(self.verified_QA_count).values()])))
+                logging.info('[05]-Total QA Verified Count: {}'.format(self.totals['verified_QA_count']))
                 logging.info('[06]------------Target Label: {}'.format(LABEL_CHECK))
-                logging.info('[07]-------Total Label Count: {}'.format(sum([x for x in dict(self.support_label_count).values()])))
+                logging.info('[07]-------Total Label Count: {}'.format(self.totals['support_label_count']))
                 logging.info('[08]-All Labels Distribution: {}'.format(self.support_label_count))
                 logging.info('[09]----------Total DI Value: {}'.format(self.calculate_severity(dict(self.severity_count))))
-                logging.info('[10]----Valid TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.testcase_count, sum(self.testcase_count.values()), sum(self.testcase_count.values()) / self.jql_total))
-                logging.info('[11]--AddCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.addcase_count, sum(self.addcase_count.values()), sum(self.addcase_count.values()) / self.jql_total))
-                logging.info('[12]-NoneCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.nonecase_count, sum(self.nonecase_count.values()), sum(self.nonecase_count.values()) / self.jql_total))
-                logging.info('[13]OtherCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.othercase_count, sum(self.othercase_count.values()), sum(self.othercase_count.values()) / self.jql_total))
+                logging.info('[10]----Valid TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.testcase_count, self.totals['testcase_count'], self.totals['testcase_count'] / self.jql_total))
+                logging.info('[11]--AddCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.addcase_count, self.totals['addcase_count'], self.totals['addcase_count'] / self.jql_total))
+                logging.info('[12]-NoneCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.nonecase_count, self.totals['nonecase_count'], self.totals['nonecase_count'] / self.jql_total))
+                logging.info('[13]OtherCase TestCase Count: {}, Total: {}, Ratio: {:.1%}'.format(self.othercase_count, self.totals['othercase_count'], self.totals['othercase_count'] / self.jql_total))
                 # logging.info('[10]----Valid TestCase Count: {}, Ratio: {:.1%}'.format(self.testcase_count, (self.testcase_count / self.jql_total)))
                 # logging.info('[11]--AddCase TestCase Count: {}, Ratio: {:.1%}'.format(self.addcase_count, (self.addcase_count / self.jql_total)))
 
+        if writer:
+            writer.close()
+        if COLUMNAR_FLAG and OUTPUT_FLAG:
+            self.fields = self.table.output_fields()
+
+    def load_batch_queries(self, batch_file, kwargs) -> dict:
+        """Return { name: JQL } from BATCH_FILE, or one JQL per --project-id if BATCH_FILE is empty"""
+        if batch_file:
+            with open(batch_file, encoding='utf-8') as f:
+                return json.load(f)                # ex: { "T972 open": "\"project id\" = X32A0-T972 AND status = OPEN" }
+        if not kwargs['Project ID']:
+            logging.error('Batch mode needs a json FILE or --project-id list, pls check!')
+            sys.exit(-1)
+        return { project_id: self.packaging_filter_from(dict(kwargs, **{'Project ID': [project_id]})) for project_id in kwargs['Project ID'] }
+
+    async def _gather_batch(self, queries, max_results):
+        """Search QUERIES concurrently, fetch and parse each distinct issue once, return ({ name: keys }, { key: events })"""
+        semaphore = asyncio.Semaphore(JOBS)      # 同时在途的请求数, 所有请求共用同一个JIRA session连接池
+
+        async def search(jql, start_at, **search_kwargs):
+            async with semaphore:
+                jql_results, _ = await asyncio.to_thread(self.search_page, jql, start_at, max_results, **search_kwargs)
+                return jql_results or {}
+
+        async def scan_keys(name, jql):
+            #* 仅获取key, 代价很小, 用于计算各个JQL之间的重复issue
+            first_page = await search(jql, 0, fields=['key'], expand=None)
+            step = first_page.get('maxResults') or max_results
+            pages = [ first_page ] + list(await asyncio.gather(*[ search(jql, start_at, fields=['key'], expand=None) for start_at in range(step, first_page.get('total', 0), step) ]))
+            logging.info('=> [{}] JQL: {}, Total issues: {}'.format(name, jql, first_page.get('total', 0)))
+            return name, [ d['key'] for page in pages for d in page.get('issues') or [] ], step
+
+        scans = await asyncio.gather(*[ scan_keys(name, jql) for name, jql in queries.items() ])
+        query_keys = { name: keys for name, keys, _ in scans }
+        unique_keys = list(dict.fromkeys(key for keys in query_keys.values() for key in keys))
+        chunk = min([ 200 ] + [ step for _, _, step in scans ])     # 单次key in (...)的数量, 不超过服务器允许的maxResults
+        logging.info('>>> Batch: {} queries, {} issues, {} distinct issues'.format(len(queries), sum(len(x) for x in query_keys.values()), len(unique_keys)))
+
+        #* 每个不重复的issue只获取一次, 完成一个分段就解析一个分段, 记录每个issue对各个计数器的贡献
+        issue_events = {}
+        recorder = EventRecorder()
+        pages = self.search_keys(unique_keys, chunk)
+        while True:
+            jql_results = await asyncio.to_thread(next, pages, None)
+            if jql_results is None:
+                break
+            jql_issues = jql_results.get('issues') or []
+            if HYDRATE_FLAG:
+                await asyncio.to_thread(self.hydrate_issues, jql_issues)
+            for _, field in self.iter_fields(jql_issues, recorder, release=True):
+                issue_events[field['issue_id']] = tuple(recorder.events)
+                recorder.events.clear()
+        if len(issue_events) < len(unique_keys):
+            logging.warning('{} of {} distinct issues were not returned by the key search (deleted or no permission), they are missing from "* All"'.format(
+                len(unique_keys) - len(issue_events), len(unique_keys)))
+        return query_keys, issue_events
+
+    def process_batch(self, queries, max_results=1000) -> dict:
+        """Run the named QUERIES concurrently and return { name: FieldsAggregate }"""
+
+        self.compile_analyzers()
+        query_keys, issue_events = asyncio.run(self._gather_batch(queries, max_results))
+
+        #* 每个JQL的计数 = 其包含的issues的计数之和, 所有JQL去重后的计数作为整体数据
+        self.batch_results = {}
+        for name, keys in list(query_keys.items()) + [ ('* All', list(issue_events)) ]:
+            aggregate = FieldsAggregate(stream=True)
+            for key in keys:
+                for counter_name, value in issue_events.get(key, ()):
+                    aggregate.add(counter_name, value)
+            aggregate.totals['issues'] = len(keys)
+            self.batch_results[name] = aggregate
+
+        #* 整体数据沿用单个JQL的属性, 便于后续图表输出
+        overall = self.batch_results['* All']
+        self.segment, self.jql_total, self.fields, self.aggregate, self.totals = 1, len(issue_events), {}, overall, overall.totals
+        for name in FieldsAggregate.counter_names:
+            setattr(self, name, getattr(overall, name))
+
+        from rich.table import Table
+        table = Table(title='Batch Result')
+        for column in ('Query', 'Issues', 'Comments', 'Verified', 'QA Verified', 'Label', 'DI', 'Valid TestCase'):
+            table.add_column(column, justify='left' if column == 'Query' else 'right')
+        for name, aggregate in self.batch_results.items():
+            table.add_row(name, str(aggregate.totals['issues']), str(aggregate.totals['commentor_all_count']), str(aggregate.totals['verified_all_count']),
+                          str(aggregate.totals['verified_QA_count']), str(aggregate.totals['support_label_count']),
+                          '{:.1f}'.format(self.calculate_severity(dict(aggregate.severity_count))), str(aggregate.totals['testcase_count']))
+        console.print(table)
+
+        if OUTPUT_FLAG:
+            batch_file = 'Batch_Result_{}.json'.format(curr_time)
+            with open(batch_file, 'w', encoding='utf-8') as f:
+                json.dump({ name: { 'totals': dict(aggregate.totals), 'di': self.calculate_severity(dict(aggregate.severity_count)),
+                                    'counters': { counter_name: dict(getattr(aggregate, counter_name)) for counter_name in aggregate.counter_names } }
+                            for name, aggregate in self.batch_results.items() }, f, indent=4, ensure_ascii=False)
+            logging.info('Saved to: {}'.format(os.path.join(os.getcwd(), batch_file)))
+        logging.info('>>> Scheduler: {}'.format(self.scheduler.summary()))
+        return self.batch_results
+
+    def trend_window(self, kwargs) -> tuple:
+        '''返回--duration的时间窗口[start, end), ex: [ '2022-11', '2023-02' ] -> (2022-11-01, 2023-03-01)'''
+        if not kwargs['Duration']:
+            logging.error('Trend mode needs --duration, ex: --trend month --duration 2022-11 2023-02')
+            sys.exit(-1)
+        _year_s, _month_s, _year_e, _month_e, _ = self.formatting_month(kwargs['Duration'])    # [ 2022, 11, 2023, 02, 28 ]
+        start = np.datetime64('{}-{:02d}'.format(_year_s, _month_s), 'M')
+        end = np.datetime64('{}-{:02d}'.format(_year_e, _month_e), 'M') + 1
+        return start.astype('datetime64[D]'), end.astype('datetime64[D]')
+
+    def trend_jql(self, kwargs, start, end) -> str:
+        '''趋势模式的JQL: 去掉Month/Duration的created限定, 改为窗口内存在过的issues(窗口结束前创建, 且未解决或在窗口内解决)'''
+        jql = RAW_COMMAND[0] if RAW_COMMAND else self.packaging_filter_from(dict(kwargs, Month=None, Duration=None))
+        _match = re.search(r'\bORDER\s+BY\b.*$', jql, re.IGNORECASE | re.DOTALL)           # 保留原有的排序规则
+        _where, _order = (jql[:_match.start()].strip(), _match.group(0)) if _match else (jql.strip(), '')
+        if not _where:
+            #! 没有任何过滤条件时, 时间窗口会扫描整个Jira实例
+            logging.error('Trend mode needs --raw-command or filter args, ex: --trend month --project-id X32A0-T972 --duration 2022-11 2023-02')
+            sys.exit(-1)
+        window = 'created < {} AND (resolved >= {} OR resolved is EMPTY)'.format(end, start)       # 窗口前创建且仍未解决的issues计入Open Backlog
+        return '({}) AND {} {}'.format(_where, window, _order).strip()
+
+    def process_trend(self, kwargs, unit) -> list:
+        """Fetch the --duration window once and return the created/resolved/open backlog/DI rows per UNIT (week | month)"""
+
+        start, end = self.trend_window(kwargs)
+        jql = self.trend_jql(kwargs, start, end)
+        logging.info(f'=> Trend JQL: {jql}')
+
+        #* 只需要created/resolutiondate/severity三个字段, 不加载changelog
+        trend_table = TrendTable(self.di_rules)
+        if REPLAY_DIR:
+            pages = self.replay_pages(REPLAY_DIR)
+        else:
+            pages = self.iter_search_pages(jql, PAGE_SIZE, fields=list(TrendTable.fields), expand=None)
+        for jql_results in self.profiler.timed(pages, 'fetch'):
+            trend_table.extend(jql_results.get('issues') or [])
+
+        buckets = trend_table.buckets(unit, start, end)
+        labels = trend_table.labels(unit, buckets['bucket'])
+        self.trend_rows = [ list(row) for row in zip(labels, *(buckets[name].tolist() for name in TrendTable.columns)) ]
+
+        from rich.table import Table
+        from rich.panel import Panel
+        table = Table(title='Trend Result: {} issues by {}, {} ~ {}'.format(trend_table.size, unit, start, end - 1))
+        for column in TrendTable.title:
+            table.add_column(column, justify='left' if column == 'Bucket' else 'right')
+        for row in self.trend_rows:
+            table.add_row(*('{:.1f}'.format(x) if isinstance(x, float) else str(x) for x in row))
+        console.print(table)
+
+        for category, name, precision in (('Open Backlog', 'backlog', 0), ('DI', 'di_open', 1)):
+            chart = BarChart('Trend {} by {} in {}'.format(category, unit, PROJECT_ID), [ (label, value, None) for label, value in zip(labels, buckets[name].tolist()) ], precision=precision)
+            console.print(Panel.fit(chart, width=1000))
+            self.save_chart(chart, 'Trend {}'.format(category))
+
+        if OUTPUT_FLAG:
+            write2table('Trend_Result', TrendTable.title, self.trend_rows)
+        return self.trend_rows
+
     # @pysnooper.snoop()
     def get_fields_data(self, jql_issues):
         """Return json object from jira.fields.TARGET"""
+        aggregate = FieldsAggregate()           # 当前分段所有issue的计数集合
+        fields = defaultdict(list)              # 所有issue的数据集合, 不会清零
+
+        for i, field in self.iter_fields(jql_issues, aggregate):
+            if self.keep_field(field):
+                fields[i].append(field)
+
+        return (fields, aggregate.commentor_all_count, aggregate.verified_all_count, aggregate.verified_QA_count, aggregate.support_label_count,
+                aggregate.severity_count, aggregate.testcase_count, aggregate.addcase_count, aggregate.othercase_count, aggregate.nonecase_count)
+
+    def keep_field(self, field) -> bool:
+        """Return True if FIELD should be kept for the excel output"""
+        if OUTPUT_FLAG:
+            return 'SWPL-' not in field['issue_id'] and field['priority'] not in ('P2', 'P3', 'P4') and bool(field['cost']) and field['cost'] > 0
+        return True
+
+    def iter_fields(self, jql_issues, aggregate, release=False):
+        """Yield (index, field) for each issue and count the analyses into AGGREGATE, drop raw json if RELEASE"""
         field = {}                              # 每个issue的数据集合, 每个循环会清零
         issuelink = []                          # 每个issue中issuelink的数据集合, 每个循环会清零
-        comments = defaultdict(list)            # 每个issue中comments的数据集合, 每个循环会清零
         histories = defaultdict(list)           # 每个issue中changelog中histories的数据集合, 每个循环会清零
-        commentor_all_count = []                # 所有issue中的comments作者, 不会清零
-        verified_all_count = defaultdict(int)   # 所有issue中的verified操作人员, 不会清零
-        verified_QA_count = defaultdict(int)    # 所有issue中目标时间范围内TV FAE-QA进行verified的操作人员, 不会清零
-        support_label_count = defaultdict(int)  # 所有issue中过滤目标label, ex: SH-Support-2023, Common
-        severity_count = defaultdict(int)
-        fields = defaultdict(list)              # 所有issue的数据集合, 不会清零
-
-        testcase_count = defaultdict(int)
-        addcase_count = defaultdict(int)
-        othercase_count = defaultdict(int)
-        nonecase_count = defaultdict(int)
+        if self.analyzers is None:
+            self.compile_analyzers()
+        issue_hooks, history_hooks = self.issue_hooks, self.history_hooks
 
         #* Sample: https://jira.amlogic.com/rest/api/2/issue/TV-64205?expand=changelog
-        for i, d in track(enumerate(jql_issues, 1), description='[green]Processing[/green]', total=len(jql_issues)):
+        for i, d in track(enumerate(jql_issues, 1), description='[green]Processing[/green]', total=len(jql_issues), disable=not self.show_progress):
+            if release:
+                jql_issues[i - 1] = None        # 释放原始json数据, 仅保留当前issue的引用
             field['issue_id'] = d['key']                                                                                                             # 01 issue id -> str
             field['priority'] = d['fields']['priority']['name']                                                                                      # 08 issue priority -> str
             
             if ACTIVE_CHECK:
                 field['comments'] = d['fields']['comment']['comments']                                                                                  # 22 comments -> list
             if LABEL_CHECK:
-                field['labels'] = d['fields']['labels']                                                                                                 # 25 labels -> list
+                field['labels'] = d['fields'].get('labels')                                                                                             # 25 labels -> list
             if EPIC_CHECK:
                 field['epic'] = d['fields'].get('customfield_10102')
             if DI_COUNT:
@@ -602,18 +1337,6 @@ class AmlJiraSystem(object):
                 field['updated'] = self.str2Time(d['fields']['updated'])
             if TESTCASE_CHECK:
                 field['testcase'] = d['fields']['customfield_11604'] if d['fields'].get('customfield_11604') else None                                # 28 test case -> str
-                if field['testcase'] and 'TV-' in field['testcase']:
-                    testcase_count['{}'.format(field['testcase'])] += 1
-                    # logging.debug('->>> {}'.format(testcase_count))
-                elif field['testcase'] and 'case' in field['testcase']:
-                    addcase_count['{}'.format(field['testcase'])] += 1
-                elif field['testcase'] and 'Case' in field['testcase']:
-                    addcase_count['{}'.format(field['testcase'])] += 1
-                    # logging.debug('-<<< {}'.format(addcase_count))
-                elif not field['testcase']:
-                    nonecase_count['{}'.format(field['testcase'])] += 1
-                else:
-                    othercase_count['{}'.format(field['testcase'])] += 1
 
             logging.debug('================== {} =================='.format(i))
             logging.debug('[01] ------------Issue ID: {}'.format(field['issue_id']))
@@ -656,78 +1379,37 @@ class AmlJiraSystem(object):
             # field['issuelinks_group'] = issuelink if issuelink else None
 
             
-            #* 对comments内容进行进一步处理
-            if ACTIVE_CHECK:
-                if field['comments']:
-                    for c, x in enumerate(field['comments'], 1):
-                        comments[c].append(str(self.str2Time(x['created'])))      # created时间
-                        comments[c].append(self.nameUpper(x['author']['name']))   # author对象
-                        comments[c].append(x['body'])                             # comment内容
-                        commentor_all_count.append(self.nameUpper(x['author']['name']))
-                field['_comments'] = comments if comments else None
-                # field['last_comment'] = list(field['_comments'].values())[-1] if field.get('comments') else ['None','None','None']  # 最后一条Comment的 [ 时间, 作者, 内容 ]
-            
-            if DI_COUNT:
-                if field['severity'] in self.di_rules.keys():
-                    logging.debug('Severity: {}'.format(field['severity']))
-                    severity_count['{}'.format(field['severity'])] += 1
-                    logging.debug(dict(severity_count))
+            #* issue级别的分析插件: comments, DI, TestCase ...
+            for on_issue in issue_hooks:
+                on_issue(d, field, aggregate)
 
             #* 通过"-e, --expand"参数来控制changelog的内容是否加载
             if EXPAND_FLAG:
                 # field['histories_count'] = d['changelog']['total']            # ex: 'total': 16
-                field['histories'] = d['changelog']['histories']                # ex: list数据类型
-                for h, x in enumerate(field['histories'], 1):                   # 遍历所有histories数据
-                    histories[h].append(str(self.str2Time(x['created'])))       # created时间    'created': '2023-02-13T11:50:52.889+0800'
-                    histories[h].append(self.nameUpper(x['author']['name']))    # author对象     'name': 'linguo.bu'
-                    histories[h].append(x['items'][0]['field'])                 # 类型           'field': 'Link'
-                    histories[h].append(x['items'][0]['fromString'])            # 原初始内容      'fromString': None
-                    histories[h].append(x['items'][0]['toString'])              # 变更后的内容     'toString': 'TV-73461'
-
-                    #* 判断verified操作, 并记录所有操作人员
-                    if VERIFY_CHECK:
-                        if x['items'][0]['field'] == 'status' and x['items'][0]['toString'] == 'Verified':
-                            logging.debug('date: {}, verified author: {}'.format(self.str2Time(x['created']), self.nameUpper(x['author']['name'])))
-                            verified_all_count['{}'.format(self.nameUpper(x['author']['name']))] += 1
-
-                    if VERIFY_CHECK and DATERANGE:
-                        #* 判断author对象是否为FAE QA, 并进行了Verified操作
-                        if x['items'][0]['field'] == 'status' and x['items'][0]['toString'] == 'Verified':
-                            if self.nameUpper(x['author']['name']) in tv_product_team:
-                                _duration_s, _duration_e = self.format_daterange(DATERANGE)     # ex: 2022-12-01, 2023-02-28
-                                if _duration_s <= self.str2Time(x['created']) <= _duration_e:
-                                    logging.debug('date: {}, verified QA author: {}'.format(self.str2Time(x['created']), self.nameUpper(x['author']['name'])))
-                                    verified_QA_count['{}'.format(self.nameUpper(x['author']['name']))] += 1
-
-                    #* 判断labels, 如: Common_From_Project, SH-Support-2023 ...
-                    if LABEL_CHECK and DATERANGE:
-                        _duration_s, _duration_e = self.format_daterange(DATERANGE)     # ex: 2022-12-01, 2023-02-28
-                        try:
-                            label_from = x['items'][0]['fromString'].split(' ')
-                            label_to = x['items'][0]['toString'].split(' ')
-                        except AttributeError:
-                            label_from, label_to = None, None
-                        if x['items'][0]['field'] == 'labels' and LABEL_CHECK[0] in self.get_diff(label_from, label_to):
-                            if self.nameUpper(x['author']['name']) in tv_product_team:
-                                if _duration_s <= self.str2Time(x['created']) <= _duration_e:
-                                    logging.debug('date: {}, add label author: {}'.format(self.str2Time(x['created']), self.nameUpper(x['author']['name'])))
-                                    support_label_count['{}'.format(self.nameUpper(x['author']['name']))] += 1
-                    
-                    #* 判断finish date是否已设置, 已设置则获取相应的日期时间
-                    if OUTPUT_FLAG:
-                        if x['items'][0]['field'] == 'Finish date (WBSGantt)':
-                            field['_finish_date'] = x['items'][0]['to']        # 2023-02-03
-                            try:
-                                field['finish_date'] = datetime.strptime(field['_finish_date'], '%Y-%m-%d')    # 2023-02-03 00:00:00
-                                logging.debug('finish data: {}'.format(str(field['finish_date']).split(' ')[0]))
-                            except Exception:
-                                continue
+                field['histories'] = (d.get('changelog') or {}).get('histories') or []     # ex: list数据类型
+                h = 0
+                for x in field['histories']:                                    # 遍历所有histories数据
+                    created = self.str2Time(x['created'])
+                    author = self.nameUpper(x['author']['name'])
+                    for item in x['items']:                                     # 同一次操作可能包含多个item, ex: status + resolution
+                        h += 1
+                        histories[h].append(str(created))                       # created时间    'created': '2023-02-13T11:50:52.889+0800'
+                        histories[h].append(author)                             # author对象     'name': 'linguo.bu'
+                        histories[h].append(item['field'])                      # 类型           'field': 'Link'
+                        histories[h].append(item['fromString'])                 # 原初始内容      'fromString': None
+                        histories[h].append(item['toString'])                   # 变更后的内容     'toString': 'TV-73461'
+
+                        #* changelog级别的分析插件: verified, QA verified, label, finish date ...
+                        if history_hooks:
+                            history = History(created, author, item['field'], item['fromString'], item['toString'], item['to'])
+                            for on_history in history_hooks:
+                                on_history(history, field, aggregate)
                 
                 #! 保留所有changelog信息到单独issue的field中
                 field['changelog'] = histories                                  # {1: ['2022-09-02 18:59:32', 'Jianfan.Ai', 'Link', None, 'This issue clones TV-58996'], }
 
             #* 如果该issue中已存在"Finish date (WBSGantt)"该参数时, 则开始计算相差时间
-            field['now_date'] = datetime.strptime('{}-{}-{}'.format(datetime.now().year, datetime.now().month, datetime.now().day), '%Y-%m-%d')  # ex: now_date = 2023-02-05
+            field['now_date'] = self.now_date                                                                                                    # ex: now_date = 2023-02-05
             if field.get('finish_date'):
                 field['cost'] = (field['now_date'] - field['finish_date']).days      # 计算(当前时间 - PMLIST计划解决时间)之间相差的天数
             else:
@@ -771,174 +1453,1633 @@ class AmlJiraSystem(object):
             # logging.debug('[32] ---------------Label: {}'.format(field['labels']))
             # logging.debug('[33] ---------Issue Links: {}'.format(field['issuelinks']))
             # logging.debug('[34] -------Issuelinks ID: {}'.format(field['issuelinks_group']))
-            # logging.debug('[35] ---------Verified QA: {}'.format(verified_QA_count))
+            # logging.debug('[35] ---------Verified QA: {}'.format(aggregate.verified_QA_count))
             # logging.debug('[36] ------------Due Date: {}'.format(field['duedate']))
             # logging.debug('[37] >>>>>>>>>Finish date: {}'.format(field['finish_date']))
             # logging.debug('[38] >>>>>>>>>>>Cost days: {}'.format(field['cost']))
             # logging.debug('[39] -----------Test Case: {}'.format(field['testcase']))
             
-            if OUTPUT_FLAG:
-                if 'SWPL-' not in field['issue_id'] and field['priority'] not in ('P2', 'P3', 'P4') and field['cost']:
-                    if field['cost'] > 0:
-                        fields[i].append(field)
-            else:
-                fields[i].append(field)
+            yield i, field
 
             #! 清零操作(非常关键, 可以避免数据重复导致的错误)
             field = dict()
             issuelink = list()
-            comments = defaultdict(list)
             histories = defaultdict(list) 
 
-        # 问题总数
-        # logging.info('>>> Total issues: {}'.format(len(jql_issues)))
-
-        # Comments活跃度检测参数
-        # if ACTIVE_CHECK:
-        #     logging.info('>>> Total Comments histories: {}'.format(len(commentor_all_count)))
-        #     logging.info('>>> Total Verified histories: {}'.format(len(verified_all_count)))
-        
-        # Changelog参数与目标日期范围参数
-        # if EXPAND_FLAG and DATERANGE:
-        #     logging.info('>>> Date range: {}, Total Verified QAs: {}'.format(DATERANGE, dict(verified_QA_count)))
-        
-        return fields, commentor_all_count, verified_all_count, verified_QA_count, support_label_count, severity_count, testcase_count, addcase_count, othercase_count, nonecase_count
 
 
     def show_chart(self, object, total, category, operate):
-        '''show termgraph chart in stdout from list/dict(object)'''
+        '''show bar chart in stdout from list/dict(object), and save it as CHART_FORMATS files'''
+        from rich.panel import Panel
         if object:
             if isinstance(object, list):
-                _authors = sorted(Counter(object).items(),key=lambda x:x[1],reverse=True)   # 按Value数值大小重新排序,返回字典
-            if isinstance(object, dict):
-                _authors = sorted(object.items(),key=lambda x:x[1],reverse=True)            # 按Value数值大小重新排序,返回字典
-            authors_array = np.array(_authors)
-            _authors_array = [ int(x) for x in authors_array[:,1] ]                         # 仅取array数组的第二个元素组成新的list
-            authors_total = sum(_authors_array)
-            author_ratio =  [ '{:.1%}'.format(x / authors_total) for x in _authors_array ]  # 计算出每个author所占总数的百分比
-            authors = np.insert(authors_array, 2, author_ratio, axis=1)                     # 往author_array数组中插入一列ratio数据
-            authors = authors[:36]    # 仅截止Top20的数据用于显示, 其余数据Skipped
-
-            #* 数据格式化
-            pattern_author = ''
-            for x in authors:      # authors为numpy.ndarray数据类型
-                if str(x[0]) in tv_product_team:
-                    pattern_author += (str('*{}({})'.format(x[0], x[2])) + ' ' + str(x[1]) + '\n')      # 格式化termgraph所识别的数据格式(TV FAE-QA人员名字前加上*号)
+                object = Counter(object)
+            _authors = sorted(object.items(), key=lambda x:x[1], reverse=True)                # 按Value数值大小重新排序
+            authors_total = sum(x[1] for x in _authors)
+            authors = [ (name, int(value), value / authors_total if authors_total else 0) for name, value in _authors[:36] ]    # 仅截止Top36的数据用于显示, 其余数据Skipped
+
+            #* 数据可视化输出(TV FAE-QA人员名字前加上*号)
+            chart = BarChart('By {}({}): {} people already {} in {}'.format(category, total, len(_authors), operate, PROJECT_ID), authors, highlight=roster)
+            console.print(Panel.fit(chart, width=1000))
+            self.save_chart(chart, category)
+        else:
+            logging.warning('There\'s no data to work with chart!')
+
+    def search_keys(self, keys, chunk_size=100, **search_kwargs):
+        """Yield the json pages of issue KEYS fetched by chunked 'key in (...)' searches in order, concurrently by JOBS"""
+        keys = sorted(keys)
+        chunks = [ 'key in ({})'.format(','.join(keys[n:n + chunk_size])) for n in range(0, len(keys), chunk_size) ]      # 控制JQL长度
+        if not chunks:
+            return
+        #* validate_query=False: 已删除或无权限的key不会使整个JQL报错
+        search_kwargs.setdefault('validate_query', False)
+
+        def search(jql):
+            jql_results = self.search_page(jql, 0, chunk_size, **search_kwargs)[0] or {}
+            issues = jql_results.setdefault('issues', [])
+            #* 服务器限制的maxResults(ex: expand=changelog时)可能小于chunk_size, 在分段内继续分页直到total
+            while issues and len(issues) < (jql_results.get('total') or 0):
+                page = self.search_page(jql, len(issues), chunk_size, **search_kwargs)[0] or {}
+                if not page.get('issues'):
+                    break
+                issues.extend(page['issues'])
+            return jql_results
+
+        with ThreadPoolExecutor(max_workers=min(JOBS, len(chunks))) as executor:
+            yield from executor.map(search, chunks)
+
+    def show_sites(self) -> list:
+        """Print the comments/verified/QA verified/label counts rolled up per roster site from the per-person counters"""
+        from rich.table import Table
+        metrics = [ (name, counts) for name, counts, enabled in (
+            ('Comments', self.commentor_all_count, ACTIVE_CHECK),
+            ('Verified', self.verified_all_count, VERIFY_CHECK),
+            ('QA Verified', self.verified_QA_count, VERIFY_CHECK and DATERANGE),
+            ('Label', self.support_label_count, LABEL_CHECK and DATERANGE)) if enabled ]
+        rollups = [ roster.rollup(counts) for _, counts in metrics ]
+        sites = list(roster.sites) + [ Roster.others ]
+
+        table = Table(title='By Site: {} people in {} sites ({})'.format(len(roster), len(roster.sites), ROSTER_FILE))
+        for column in [ 'Site', 'People' ] + [ name for name, _ in metrics ]:
+            table.add_column(column, justify='left' if column == 'Site' else 'right')
+        rows = []
+        for site in sites:
+            people = len(roster.sites[site]) if site in roster.sites else '-'
+            rows.append([ site, people ] + [ rollup[site] for rollup in rollups ])
+            table.add_row(*(str(x) for x in rows[-1]))
+        console.print(table)
+        return rows
+
+    def resolve_epics(self, rollup) -> dict:
+        """Fetch summary/status of all distinct epics in ROLLUP with a few chunked key searches"""
+        if REPLAY_DIR:
+            return rollup.epics                 # replay模式下无Jira连接, 仅按epic key汇总
+        _start = time.time()
+        for jql_results in self.search_keys(rollup.keys(), fields=list(EpicRollup.epic_fields), expand=None):
+            rollup.resolve(jql_results)
+        logging.info('>>> Epic rollup: {} of {} epics resolved in {} requests, {:.1f}s'.format(len(rollup.epics), sum(1 for x in rollup.issues if x), rollup.requests, time.time() - _start))
+        return rollup.epics
+
+    def show_epics(self, top=30):
+        """Print the per-epic issues/open/severity/DI table and the open DI chart, export with -o"""
+        from rich.table import Table
+        from rich.panel import Panel
+        rollup = self.epic_rollup
+        self.resolve_epics(rollup)
+        rows = rollup.rows()
+
+        table = Table(title='Epic Rollup: {} issues in {} epics'.format(self.jql_total, sum(1 for x in rollup.issues if x)))
+        for column in EpicRollup.title:
+            table.add_column(column, justify='left' if column in ('Epic', 'Summary', 'Status') else 'right')
+        for row in rows[:top]:
+            table.add_row(*('-' if x is None else '{:.1f}'.format(x) if isinstance(x, float) else str(x) for x in row))
+        console.print(table)
+
+        chart = BarChart('Open DI by Epic in {}'.format(PROJECT_ID), [ (row[0], row[-1], None) for row in rows[:36] if row[-1] ], precision=1)
+        if chart.rows:
+            console.print(Panel.fit(chart, width=1000))
+            self.save_chart(chart, 'Epic DI')
+        if OUTPUT_FLAG:
+            write2table('Epic_Result', EpicRollup.title, rows)
+        return rows
+
+    def expand_links(self, graph, depth) -> int:
+        """Fetch the issuelinks of unseen linked issues level by level up to DEPTH, return the request count"""
+        requests_count = 0
+        for level in range(1, depth + 1):
+            keys = graph.frontier()
+            if REPLAY_DIR or not keys:
+                break                           # replay模式下无Jira连接, 仅使用已获取的issues
+            _start, links = time.time(), 0
+            for jql_results in self.search_keys(keys, fields=list(LinkGraph.fields), expand=None):
+                links += graph.add((jql_results or {}).get('issues') or [])
+                requests_count += 1
+            graph.visited(keys)
+            logging.info('>>> Links depth {}: {} issues expanded, {} new links, {:.1f}s'.format(level, len(keys), links, time.time() - _start))
+        return requests_count
+
+    def show_links(self, top=10):
+        """Print the connected components, clone families and longest blocker chains of self.link_graph, export with -o"""
+        from rich.table import Table
+        graph = self.link_graph
+        requests_count = self.expand_links(graph, LINK_DEPTH)
+        _start = time.time()
+        components = graph.components()
+        families = [ x for x in graph.components(kinds=('clones', )) if len(x) > 1 ]
+        chains = graph.chains('blocks', top)
+
+        table = Table(title='Link Graph: {} issues, {} links, {} components, {} clone families ({} expand requests)'.format(
+            len(graph.keys), graph.size, len(components), len(families), requests_count))
+        for column in ('', 'Size', 'Issues'):
+            table.add_column(column, justify='right' if column == 'Size' else 'left')
+        for name, groups in (('Component', [ x for x in components if len(x) > 1 ]), ('Clone Family', families)):
+            for n, group in enumerate(groups[:top], 1):
+                keys = [ graph.keys[x] for x in group ]
+                table.add_row('{} {}'.format(name, n), str(len(keys)), ', '.join(keys[:8]) + (', ...' if len(keys) > 8 else ''))
+        for n, chain in enumerate(chains, 1):
+            table.add_row('Blocker Chain {}'.format(n), str(len(chain)), ' -> '.join(chain if len(chain) <= 8 else chain[:4] + [ '...' ] + chain[-3:]))
+        console.print(table)
+        logging.info('>>> Link graph: {:.3f}s'.format(time.time() - _start))
+
+        if OUTPUT_FLAG:
+            component_of, family_of = {}, {}
+            for n, group in enumerate(components, 1):
+                component_of.update((x, (n, len(group))) for x in group)
+            for group in families:
+                family_of.update((x, len(group)) for x in group)
+            rows = [ [ key, *component_of[x], family_of.get(x, 1), len(graph.adjacency[x]) ] for x, key in enumerate(graph.keys) ]
+            write2table('Link_Result', ('Issue', 'Component', 'Component Size', 'Clone Family Size', 'Links'), rows)
+        return components, families, chains
+
+    def show_transitions(self, field='status', top=20):
+        """Print status transition counts, dwell time per state, time to Resolved/Verified and reopen counts from self.events"""
+        from rich.table import Table
+        events = self.events
+        _start = time.time()
+        transitions, dwell = events.transitions(field), events.dwell(field)
+
+        table = Table(title='{} Transitions ({} events of {} issues)'.format(field.title(), sum(transitions.values()), len(events.keys)))
+        for column in ('From', 'To', 'Count'):
+            table.add_column(column, justify='right' if column == 'Count' else 'left')
+        for (from_string, to_string), n in transitions.most_common(top):
+            table.add_row(str(from_string), str(to_string), str(n))
+        console.print(table)
+
+        table = Table(title='Days in {} / Time to {}'.format(field.title(), field.title()))
+        for column in ('', 'Count', 'Mean', 'P50', 'P90', 'Max'):
+            table.add_column(column, justify='left' if not column else 'right')
+        rows = [ ('In {}'.format(state), stat) for state, stat in sorted(dwell.items(), key=lambda x: -x[1]['count']) ]
+        rows += [ ('Created -> {}'.format(state), events.time_to(state, field)) for state in ('Resolved', 'Verified', 'Closed') ]
+        for name, stat in rows:
+            table.add_row(name, str(stat['count']), *('{:.1f}'.format(stat[x]) if stat['count'] else '-' for x in ('mean', 'p50', 'p90', 'max')))
+        console.print(table)
+
+        reopened = events.entries('Reopened', field)
+        logging.info('>>> Reopened: {} issues, {} times, max {} times of one issue'.format(reopened['issues'], reopened['events'], reopened['max']))
+        logging.info('>>> Transitions: {} events, {:.3f}s'.format(events.size, time.time() - _start))
+
+    def save_chart(self, chart, category):
+        '''save CHART as CHART_FORMATS files, ex: Chart_Comments_YYYYMMDD_HHMMSS.svg'''
+        for chart_format in CHART_FORMATS or ():
+            chart_file = creat_local_file(filename='Chart_{}'.format(category.replace(' ', '_')), ext=chart_format)
+            if chart.save(chart_file, chart_format):
+                logging.info('Saved to: {}'.format(os.path.join(os.getcwd(), chart_file)))
+
+_parse_system = None                            # 多进程解析的子进程中使用的AmlJiraSystem
+
+def _init_parse_worker(shared_roster):
+    """Initializer of the --procs parse processes, compile the analyzers once per process"""
+    global roster, _parse_system
+    roster = shared_roster                      # spawn方式启动的子进程不会执行__main__, 需由父进程传入
+    _parse_system = AmlJiraSystem('', '')
+    _parse_system.show_progress = False
+    _parse_system.compile_analyzers()
+
+def _parse_page(jql_issues) -> tuple:
+    """Return ([ (index, output row) ], { counter name: Counter }) of one page, compact enough to send back to the parent"""
+    aggregate = FieldsAggregate(stream=True)
+    rows = []
+    for i, field in _parse_system.iter_fields(jql_issues, aggregate, release=True):
+        if OUTPUT_FLAG and _parse_system.keep_field(field):
+            rows.append((i, { key: field.get(key) for key in ResultWriter.keys }))
+    return rows, { name: getattr(aggregate, name) for name in FieldsAggregate.counter_names }
+
+class PageSizer(object):
+    """Adaptive maxResults of search pages from the observed latency and response size"""
+    min_size = 10
+    target_seconds = 30                 # 单页目标耗时, 远小于JIRA的300s timeout
+    target_bytes = 32 * 1024 * 1024     # 单页目标大小(解码后)
+
+    def __init__(self, size):
+        self.size = size
+        self.cap = size                 # 服务器允许的最大值, 由第一页返回的maxResults确定
+        self.history = [ size ]
+        self.lock = threading.Lock()    # observe在主线程, timeout在search_range的线程池中调用
+
+    def limit(self, cap):
+        with self.lock:
+            self.cap = min(self.cap, cap)
+            self.resize(min(self.size, self.cap))
+
+    def resize(self, size):
+        if size != self.size:
+            self.size = size
+            self.history.append(size)
+
+    def observe(self, count, seconds, size):
+        """Resize from one page of COUNT issues which took SECONDS and SIZE decoded bytes"""
+        if not count:
+            return
+        with self.lock:
+            ideal = self.cap
+            if seconds > 0:
+                ideal = min(ideal, self.target_seconds * count / seconds)
+            if size > 0:
+                ideal = min(ideal, self.target_bytes * count / size)
+            self.resize(int(max(self.min_size, min(ideal, self.size * 2))))     # 每次最多增大一倍, 减小不受限制
+
+    def timeout(self, size):
+        """A page larger than SIZE timed out, never grow past SIZE again"""
+        with self.lock:
+            self.cap = max(self.min_size, min(self.cap, size))
+            self.resize(min(self.size, self.cap))
+
+class TransportStats(object):
+    """Keep-alive/gzip settings of the jira session and the bytes on wire versus decoded"""
+    def __init__(self):
+        self.requests = 0
+        self.wire = 0
+        self.decoded = 0
+        self.local = threading.local()      # 当前线程已解码的字节数, 用于计算单页大小
+        self.lock = threading.Lock()
+
+    def install(self, session, scheduler):
+        #* 与requests的默认值相同, 显式设置仅为说明传输依赖gzip与keep-alive
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        session.headers['Connection'] = 'keep-alive'
+        #* 连接池大小不小于并发数, 避免多线程获取分页时连接被丢弃重建; 所有请求经由scheduler排队
+        for prefix in ('https://', 'http://'):
+            retries = session.get_adapter(prefix).max_retries
+            session.mount(prefix, ThrottledAdapter(scheduler, pool_connections=4, pool_maxsize=max(10, JOBS), max_retries=retries))
+        session.hooks['response'].append(self.on_response)
+
+    def on_response(self, response, *args, **kwargs):
+        """requests response hook, wire size from urllib3 (compressed), decoded size from content"""
+        decoded = len(response.content)
+        try:
+            wire = response.raw.tell() or decoded
+        except Exception:
+            wire = int(response.headers.get('Content-Length') or decoded)
+        self.local.decoded = getattr(self.local, 'decoded', 0) + decoded
+        with self.lock:
+            self.requests += 1
+            self.wire += wire
+            self.decoded += decoded
+
+    def received(self) -> int:
+        return getattr(self.local, 'decoded', 0)
+
+    def summary(self) -> str:
+        return '{} requests, {:.1f}MB on wire, {:.1f}MB decoded (x{:.1f})'.format(
+            self.requests, self.wire / 1024 / 1024, self.decoded / 1024 / 1024, self.decoded / self.wire if self.wire else 1)
+
+class RequestScheduler(object):
+    """Token bucket pacing and in-flight cap shared by every request of the jira session, backs off on 429 (or 503 with Retry-After) honoring Retry-After"""
+    max_retries = 6                     # 单个请求被限流后的最大重试次数
+    max_delay = 120                     # 单次退避的最长时间(s)
+
+    def __init__(self, rate, inflight):
+        self.max_rate = rate            # 0=不限速
+        self.rate = rate                # 当前速率, 被限流时减半, 成功后逐步恢复
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0          # 收到Retry-After后, 所有线程暂停到该时间
+        self.inflight = threading.BoundedSemaphore(max(1, inflight))
+        self.lock = threading.Lock()
+        self.counters = Counter()       # ex: { 'requests': 120, 'throttled': 2, 'retried': 2 }
+        self.waited = 0.0
+
+    def acquire(self):
+        """Block until a token and an in-flight slot are available"""
+        self.inflight.acquire()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.rate:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.blocked_until - now
+                if wait <= 0 and (not self.rate or self.tokens >= 1):
+                    self.tokens -= 1 if self.rate else 0
+                    self.counters['requests'] += 1
+                    return
+                if wait <= 0:
+                    wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+            sleep(wait)
+
+    def release(self):
+        self.inflight.release()
+
+    @staticmethod
+    def retry_after(response):
+        """Return the Retry-After seconds of RESPONSE, or None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return float(value)                                                         # ex: Retry-After: 30
+        except ValueError:
+            pass
+        try:
+            return parsedate_to_datetime(value).timestamp() - time.time()               # ex: Retry-After: Wed, 21 Oct 2015 07:28:00 GMT
+        except (TypeError, ValueError):
+            return None
+
+    def is_throttled(self, response) -> bool:
+        """429, or 503 with Retry-After, is rate limiting; a bare 503 is left to search_range which splits the oversized page"""
+        return response.status_code == 429 or (response.status_code == 503 and self.retry_after(response) is not None)
+
+    def throttled(self, response, attempt):
+        """Pause all requests after a throttled RESPONSE, for Retry-After or an exponential backoff, then retry"""
+        delay = self.retry_after(response)
+        if delay is None:
+            delay = 2 ** attempt
+        delay = min(max(delay, 0), self.max_delay)
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            if self.max_rate:
+                self.rate = max(self.max_rate / 16, self.rate / 2)
+                self.tokens = min(self.tokens, 0)
+            self.counters['throttled'] += 1
+            self.counters['retried'] += 1
+        logging.warning('Jira throttled ({}), retry in {:.1f}s, rate: {}'.format(response.status_code, delay, '{:.1f}/s'.format(self.rate) if self.max_rate else 'unlimited'))
+
+    def succeeded(self):
+        if self.max_rate and self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 50)    # 每次成功恢复2%的最大速率
+
+    def summary(self) -> str:
+        return '{} requests, {} throttled, {} retried, {:.1f}s paced, rate: {}'.format(
+            self.counters['requests'], self.counters['throttled'], self.counters['retried'], self.waited,
+            '{:.1f}/{:.0f} per second'.format(self.rate, self.max_rate) if self.max_rate else 'unlimited')
+
+class ThrottledAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter which sends every request through a RequestScheduler and retries throttled (429, 503 with Retry-After) requests itself"""
+    def __init__(self, scheduler, **kwargs):
+        self.scheduler = scheduler
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.scheduler.max_retries + 1):
+            self.scheduler.acquire()
+            try:
+                response = super().send(request, **kwargs)
+                if not kwargs.get('stream'):
+                    response.content                            # 在释放in-flight名额前读完body, 传输过程也计入并发上限
+            finally:
+                self.scheduler.release()
+            if not self.scheduler.is_throttled(response):
+                break
+            if attempt == self.scheduler.max_retries:
+                self.scheduler.counters['throttled'] += 1       # 重试次数用尽, 由jira抛出JIRAError
+                break
+            self.scheduler.throttled(response, attempt)
+            response.close()
+        if response.status_code < 400:
+            self.scheduler.succeeded()
+        return response
+
+class StageProfiler(object):
+    """Wall time, bytes received, issue counts and peak memory of each stage and each search page (--profile)"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}                    # 阶段名 -> { 'calls', 'seconds', 'issues', 'bytes', 'peak_mb' }
+        self.pages = []                     # 每个search分页的记录
+        self.bytes = 0                      # 所有response的字节数之和
+        self.local = threading.local()      # 每个线程各自的response字节数/服务器耗时, 并发获取时按线程区分分页
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def peak_mb() -> float:
+        """Return the peak RSS of this process so far"""
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024     # macOS单位为bytes, Linux为KB
+
+    def on_response(self, response, *args, **kwargs):
+        """requests response hook of the jira session"""
+        size = len(response.content)
+        self.local.bytes = getattr(self.local, 'bytes', 0) + size
+        self.local.server = getattr(self.local, 'server', 0) + response.elapsed.total_seconds()    # 发出请求到收到header的耗时
+        with self.lock:
+            self.bytes += size
+
+    def received(self) -> tuple:
+        """Return (bytes, server seconds) received by the current thread so far"""
+        return getattr(self.local, 'bytes', 0), getattr(self.local, 'server', 0)
+
+    def add(self, name, seconds, issues=0, received=0):
+        if not self.enabled:
+            return
+        stage = self.stages.setdefault(name, { 'calls': 0, 'seconds': 0.0, 'issues': 0, 'bytes': 0, 'peak_mb': 0.0 })
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        stage['issues'] += issues
+        stage['bytes'] += received
+        stage['peak_mb'] = max(stage['peak_mb'], self.peak_mb())
+
+    @contextmanager
+    def stage(self, name):
+        _start, received = time.time(), self.bytes
+        try:
+            yield
+        finally:
+            self.add(name, time.time() - _start, received=self.bytes - received)
+
+    def timed(self, iterable, name, nested=None):
+        """Yield from ITERABLE, the wait of each item is added to stage NAME, minus the wait already counted by the NESTED stage"""
+        iterator = iter(iterable)
+        nested_stage = lambda: self.stages.get(nested) or { 'seconds': 0.0, 'bytes': 0 }
+        while True:
+            _start, received = time.time(), self.bytes
+            nested_seconds, nested_bytes = nested_stage()['seconds'], nested_stage()['bytes']
+            item = next(iterator, None)
+            if item is None:
+                return
+            self.add(name, time.time() - _start - (nested_stage()['seconds'] - nested_seconds), issues=len(item.get('issues') or []),
+                     received=self.bytes - received - (nested_stage()['bytes'] - nested_bytes))
+            yield item
+
+    def page(self, start_at, seconds, received, issues):
+        """Record one search page, RECEIVED is the received() before the request"""
+        if not self.enabled:
+            return
+        size, server = (x - y for x, y in zip(self.received(), received))
+        self.pages.append({ 'start_at': start_at, 'seconds': round(seconds, 3), 'server_seconds': round(server, 3),
+                            'decode_seconds': round(max(seconds - server, 0), 3), 'bytes': size, 'issues': issues, 'peak_mb': round(self.peak_mb(), 1) })
+
+    def report(self, total_seconds):
+        """Print the stage table and save the json report"""
+        if not self.enabled:
+            return
+        self.stages['total'] = { 'calls': 1, 'seconds': total_seconds, 'issues': max([ x['issues'] for x in self.stages.values() ] + [ 0 ]),
+                                 'bytes': self.bytes, 'peak_mb': self.peak_mb() }
+        from rich.table import Table
+        table = Table(title='Profile')
+        for column in ('Stage', 'Calls', 'Seconds', '%', 'Issues', 'Issues/s', 'MB received', 'Peak RSS MB'):
+            table.add_column(column, justify='left' if column == 'Stage' else 'right')
+        for name, stage in self.stages.items():
+            table.add_row(name, str(stage['calls']), '{:.2f}'.format(stage['seconds']), '{:.0%}'.format(stage['seconds'] / total_seconds if total_seconds else 0),
+                          str(stage['issues'] or '-'), '{:.0f}'.format(stage['issues'] / stage['seconds']) if stage['issues'] and stage['seconds'] else '-',
+                          '{:.1f}'.format(stage['bytes'] / 1024 / 1024) if stage['bytes'] else '-', '{:.1f}'.format(stage['peak_mb']))
+        console.print(table)
+        if self.pages:
+            slowest = max(self.pages, key=lambda x: x['seconds'])
+            logging.info('>>> Profile: {} search pages, slowest startAt={} {:.2f}s (server {:.2f}s, decode/transfer {:.2f}s, {:.1f}MB)'.format(
+                len(self.pages), slowest['start_at'], slowest['seconds'], slowest['server_seconds'], slowest['decode_seconds'], slowest['bytes'] / 1024 / 1024))
+        profile_file = 'Profile_Report_{}.json'.format(curr_time)
+        with open(profile_file, 'w', encoding='utf-8') as f:
+            json.dump({ 'args': { k: v for k, v in ARGS_DICT.items() if v }, 'stages': self.stages, 'pages': self.pages }, f, indent=4, ensure_ascii=False, default=str)
+        logging.info('Saved to: {}'.format(os.path.join(os.getcwd(), profile_file)))
+
+class FieldsAggregate(object):
+    """Counters of AmlJiraSystem.iter_fields, keep running totals so summaries never re-sum"""
+    counter_names = ('commentor_all_count', 'verified_all_count', 'verified_QA_count', 'support_label_count', 'severity_count',
+                     'testcase_count', 'addcase_count', 'othercase_count', 'nonecase_count')
+
+
+    def __init__(self, stream=False):
+        self.commentor_all_count = Counter() if stream else []   # 所有issue中的comments作者, stream模式下只保留每个作者的计数
+        self.verified_all_count = Counter()     # 所有issue中的verified操作人员
+        self.verified_QA_count = Counter()      # 所有issue中目标时间范围内TV FAE-QA进行verified的操作人员
+        self.support_label_count = Counter()    # 所有issue中过滤目标label, ex: SH-Support-2023, Common
+        self.severity_count = Counter()
+        self.testcase_count = Counter()
+        self.addcase_count = Counter()
+        self.othercase_count = Counter()
+        self.nonecase_count = Counter()
+        self.totals = Counter()                 # 每个计数器的累计总数, ex: { 'verified_all_count': 12 }
+
+    def add(self, name, key):
+        """Count KEY once into counter NAME"""
+        counter = getattr(self, name)
+        if isinstance(counter, list):
+            counter.append(key)
+        else:
+            counter[key] += 1
+        self.totals[name] += 1
+
+    def merge(self, name, other):
+        """Merge a list/dict counter OTHER into counter NAME"""
+        counter = getattr(self, name)
+        if isinstance(counter, list):
+            counter += other
+            self.totals[name] += len(other)
+        else:
+            counter.update(other)
+            self.totals[name] += sum(other.values())
+
+History = namedtuple('History', 'created author field from_string to_string to')    # 单条changelog history, 所有分析插件共享同一份解析结果
+class Roster(object):
+    """QA roster loaded from a json file: hashed name -> site index, aliases of the Jira user names"""
+    others = 'Non-QA'                           # 不在名单中的人员
+
+    def __init__(self, sites=None, aliases=None):
+        self.sites = { site: list(names) for site, names in (sites or {}).items() }    # ex: { 'SZ': [ 'Jianfan.Ai' ], 'BJ': [ 'Meiling.Zhu' ] }
+        self.site_of = { name: site for site, names in self.sites.items() for name in names }
+        self.aliases = dict(aliases or {})      # Jira用户名或格式化后的名字 -> 名单中的名字, ex: { 'jianfan.ai.sz': 'Jianfan.Ai' }
+
+    @classmethod
+    def load(cls, roster_file) -> 'Roster':
+        """Return the Roster of ROSTER_FILE: { "sites": { site: [ name ] }, "aliases": { alias: name } }, an empty one if not found"""
+        try:
+            with open(roster_file, encoding='utf-8') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            logging.warning('Roster file not found: {}, QA metrics are disabled'.format(roster_file))
+            return cls()
+        return cls(config.get('sites'), config.get('aliases'))
+
+    def __contains__(self, name) -> bool:
+        return name in self.site_of
+
+    def __iter__(self):
+        return iter(self.site_of)
+
+    def __len__(self) -> int:
+        return len(self.site_of)
+
+    def site(self, name) -> str:
+        return self.site_of.get(name, self.others)
+
+    def rollup(self, counts) -> Counter:
+        """Return Counter({ site: count }) of the per-person COUNTS(Counter or list of names), sites in roster order"""
+        if isinstance(counts, list):
+            counts = Counter(counts)
+        result = Counter({ site: 0 for site in self.sites })
+        for name, n in counts.items():
+            result[self.site(name)] += n
+        return result
+
+roster = Roster()                               # QA人员名单, 在__main__中由--roster文件加载
+
+ANALYZERS = []                                  # get_fields_data的分析插件, 按注册顺序执行
+
+def register_analyzer(cls):
+    """Register an Analyzer subclass for AmlJiraSystem.compile_analyzers"""
+    ANALYZERS.append(cls)
+    return cls
+
+class Analyzer(object):
+    """Base of the get_fields_data plug-ins, compiled once per run and driven in a single pass over each issue"""
+    fields = ()                                 # 该插件需要的search_issues fields
+    expand = None                               # 该插件需要的search_issues expand, ex: 'changelog'
+
+    def __init__(self, system):
+        self.system = system
+
+    def compile(self) -> bool:
+        """Precompute the run constants, return False if the analyzer is disabled by the args"""
+        return False
+
+    def on_issue(self, d, field, aggregate):
+        """Called once per issue with the raw json D and the extracted FIELD"""
+
+    def on_history(self, history, field, aggregate):
+        """Called once per changelog HISTORY of the issue"""
+
+@register_analyzer
+class CommentAuthorAnalyzer(Analyzer):
+    """Comments活跃度: 统计所有comments作者"""
+    fields = ('comment', )
+
+    def compile(self):
+        return bool(ACTIVE_CHECK)
+
+    def on_issue(self, d, field, aggregate):
+        comments = defaultdict(list)
+        for c, x in enumerate(field['comments'] or (), 1):
+            author = self.system.nameUpper(x['author']['name'])
+            comments[c].append(str(self.system.str2Time(x['created'])))      # created时间
+            comments[c].append(author)                                      # author对象
+            comments[c].append(x['body'])                                   # comment内容
+            aggregate.add('commentor_all_count', author)
+        field['_comments'] = comments if comments else None
+        # field['last_comment'] = list(field['_comments'].values())[-1] if field.get('comments') else ['None','None','None']  # 最后一条Comment的 [ 时间, 作者, 内容 ]
+
+@register_analyzer
+class SeverityAnalyzer(Analyzer):
+    """DI: 统计di_rules中定义的Severity分布"""
+    fields = ('customfield_10109', )
+
+    def compile(self):
+        self.severities = frozenset(self.system.di_rules)
+        return bool(DI_COUNT)
+
+    def on_issue(self, d, field, aggregate):
+        if field['severity'] in self.severities:
+            logging.debug('Severity: {}'.format(field['severity']))
+            aggregate.add('severity_count', '{}'.format(field['severity']))
+
+@register_analyzer
+class TestcaseAnalyzer(Analyzer):
+    """TestCase: 按有效ID/AddCase/NoneCase/OtherCase分类统计"""
+    fields = ('customfield_11604', )
+
+    def compile(self):
+        return bool(TESTCASE_CHECK)
+
+    def on_issue(self, d, field, aggregate):
+        aggregate.add(self.system.classify_testcase(field['testcase']), '{}'.format(field['testcase']))
+
+@register_analyzer
+class VerifiedAnalyzer(Analyzer):
+    """判断verified操作, 并记录所有操作人员"""
+    expand = 'changelog'
+
+    def compile(self):
+        return bool(VERIFY_CHECK)
+
+    def on_history(self, history, field, aggregate):
+        if history.field == 'status' and history.to_string == 'Verified':
+            logging.debug('date: {}, verified author: {}'.format(history.created, history.author))
+            aggregate.add('verified_all_count', history.author)
+
+@register_analyzer
+class QAVerifiedAnalyzer(Analyzer):
+    """判断author对象是否为FAE QA, 并在目标时间范围内进行了Verified操作"""
+    expand = 'changelog'
+
+    def compile(self):
+        if not (VERIFY_CHECK and DATERANGE):
+            return False
+        self.duration_s, self.duration_e = self.system.format_daterange(DATERANGE)     # ex: 2022-12-01, 2023-02-28
+        self.roster = roster
+        return True
+
+    def on_history(self, history, field, aggregate):
+        if history.field == 'status' and history.to_string == 'Verified' and history.author in self.roster:
+            if self.duration_s <= history.created <= self.duration_e:
+                logging.debug('date: {}, verified QA author: {}'.format(history.created, history.author))
+                aggregate.add('verified_QA_count', history.author)
+
+@register_analyzer
+class LabelAddedAnalyzer(Analyzer):
+    """判断labels, 如: Common_From_Project, SH-Support-2023 ..."""
+    expand = 'changelog'
+
+    def compile(self):
+        if not (LABEL_CHECK and DATERANGE):
+            return False
+        self.label = LABEL_CHECK[0]
+        self.duration_s, self.duration_e = self.system.format_daterange(DATERANGE)     # ex: 2022-12-01, 2023-02-28
+        self.roster = roster
+        return True
+
+    def on_history(self, history, field, aggregate):
+        if history.field == 'labels' and history.author in self.roster and self.duration_s <= history.created <= self.duration_e:
+            if self.label in self.system.get_diff((history.from_string or '').split(' '), (history.to_string or '').split(' ')):
+                logging.debug('date: {}, add label author: {}'.format(history.created, history.author))
+                aggregate.add('support_label_count', history.author)
+
+@register_analyzer
+class FinishDateAnalyzer(Analyzer):
+    """判断finish date是否已设置, 已设置则获取相应的日期时间"""
+    expand = 'changelog'
+
+    def compile(self):
+        return bool(OUTPUT_FLAG)
+
+    def on_history(self, history, field, aggregate):
+        if history.field == 'Finish date (WBSGantt)':
+            field['_finish_date'] = history.to                                     # 2023-02-03
+            try:
+                field['finish_date'] = datetime.strptime(field['_finish_date'], '%Y-%m-%d')    # 2023-02-03 00:00:00
+                logging.debug('finish data: {}'.format(str(field['finish_date']).split(' ')[0]))
+            except Exception:
+                pass
+
+class EventRecorder(FieldsAggregate):
+    """FieldsAggregate which records the (counter, key) events instead of counting, used to replay one issue into many queries"""
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def add(self, name, key):
+        self.events.append((name, key))
+
+class IssueTable(object):
+    """Columnar store of issue fields, one NumPy array per field instead of one dict per issue"""
+    categorical = ('key_prefix', 'status', 'priority', 'severity', 'component', 'product', 'project_id', 'testcase', 'assignee', 'rd_manager')
+    datetimes = { 'created': 'datetime64[s]', 'updated': 'datetime64[s]', 'finish_date': 'datetime64[D]' }
+
+    def __init__(self, name_upper):
+        self.size = 0
+        self.categories = { name: [] for name in self.categorical }     # code -> 值, ex: { 'status': [ 'OPEN', 'Resolved' ] }
+        self.value_codes = { name: {} for name in self.categorical }    # 值 -> code
+        self.raw_codes = { name: {} for name in self.categorical }      # 原始值 -> code, 同一个原始值只格式化一次
+        self.normalize = { 'assignee': name_upper, 'rd_manager': name_upper }
+        self.chunks = defaultdict(list)                                 # 每个分段的列数据, ex: { 'status': [ array([0, 1]), ] }
+        self.columns = {}                                               # 合并后的列数据缓存
+
+    def encode(self, name, raw) -> int:
+        """Return the categorical code of RAW in column NAME"""
+        code = self.raw_codes[name].get(raw)
+        if code is None:
+            value = self.normalize[name](raw) if raw is not None and name in self.normalize else raw
+            value = sys.intern(value) if isinstance(value, str) else value
+            code = self.value_codes[name].get(value)
+            if code is None:
+                code = self.value_codes[name][value] = len(self.categories[name])
+                self.categories[name].append(value)
+            self.raw_codes[name][raw] = code
+        return code
+
+    def extend(self, jql_issues):
+        """Append one page of raw json issues as column chunks"""
+        encode = self.encode
+        rows = defaultdict(list)
+        for d in jql_issues:
+            f = d['fields']
+            prefix, _, number = d['key'].partition('-')                 # ex: TV-64205 -> TV, 64205
+            rows['key_prefix'].append(encode('key_prefix', prefix))
+            rows['key_number'].append(int(number))
+            rows['status'].append(encode('status', f['status']['name'] if f.get('status') else None))
+            rows['priority'].append(encode('priority', f['priority']['name'] if f.get('priority') else None))
+            rows['severity'].append(encode('severity', f['customfield_10109']['value'] if f.get('customfield_10109') else None))
+            rows['component'].append(encode('component', f['components'][0]['name'] if f.get('components') else None))
+            rows['product'].append(encode('product', f['customfield_10107'][0]['value'] if f.get('customfield_10107') else None))
+            rows['project_id'].append(encode('project_id', f['customfield_10407'][0]['value'] if f.get('customfield_10407') else None))
+            rows['testcase'].append(encode('testcase', f.get('customfield_11604') or None))
+            rows['assignee'].append(encode('assignee', f['assignee']['name'] if f.get('assignee') else None))
+            rows['rd_manager'].append(encode('rd_manager', f['customfield_10700']['name'] if f.get('customfield_10700') else None))
+            rows['created'].append(f['created'][:19] if f.get('created') else 'NaT')      # '2023-02-13T11:50:52.889+0800' -> '2023-02-13T11:50:52'
+            rows['updated'].append(f['updated'][:19] if f.get('updated') else 'NaT')
+
+            #* 最后一次有效设置的"Finish date (WBSGantt)", ex: 2023-02-03
+            finish_date = 'NaT'
+            for x in (d.get('changelog') or {}).get('histories', ()):
+                for item in x['items']:
+                    if item['field'] == 'Finish date (WBSGantt)':
+                        try:
+                            finish_date = datetime.strptime(item['to'], '%Y-%m-%d').strftime('%Y-%m-%d')
+                        except Exception:
+                            continue
+            rows['finish_date'].append(finish_date)
+
+        for name, values in rows.items():
+            if name in self.datetimes:
+                self.chunks[name].append(np.array(values, dtype=self.datetimes[name]))
+            elif name == 'key_number':
+                self.chunks[name].append(np.array(values, dtype=np.int64))
+            else:
+                self.chunks[name].append(np.array(values, dtype=np.int32))
+        self.size += len(jql_issues)
+        self.columns = {}
+
+    def column(self, name, start=0) -> 'np.ndarray':
+        """Return column NAME from row START"""
+        if name not in self.columns:
+            chunks = self.chunks[name]
+            self.columns[name] = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+            self.chunks[name] = [ self.columns[name] ]
+        return self.columns[name][start:]
+
+    def value_counts(self, name, start=0) -> dict:
+        """Return { value: count } of categorical column NAME from row START"""
+        counts = np.bincount(self.column(name, start), minlength=len(self.categories[name]))
+        return { self.categories[name][code]: int(counts[code]) for code in np.flatnonzero(counts) }
+
+    def severity_count(self, di_rules, start=0) -> Counter:
+        """Return severity distribution of rows from START, only the severities defined in DI_RULES"""
+        return Counter({ k: v for k, v in self.value_counts('severity', start).items() if k in di_rules })
+
+    def testcase_count(self, classify, start=0) -> dict:
+        """Return { counter name: Counter } of testcase distribution from START, classified by CLASSIFY"""
+        result = defaultdict(Counter)
+        for testcase, n in self.value_counts('testcase', start).items():
+            result[classify(testcase)]['{}'.format(testcase)] += n
+        return result
+
+    def cost(self) -> 'np.ndarray':
+        """Return (today - finish_date) in days, -1 if finish_date is not set"""
+        today = np.datetime64(datetime.now().strftime('%Y-%m-%d'), 'D')
+        finish_date = self.column('finish_date')
+        return np.where(np.isnat(finish_date), -1, (today - finish_date).astype(np.int64))
+
+    def output_mask(self) -> 'np.ndarray':
+        """Return rows for the excel output: not SWPL, priority not P2-P4 and cost > 0"""
+        skip_prefix = [ code for code, value in enumerate(self.categories['key_prefix']) if value == 'SWPL' ]
+        skip_priority = [ code for code, value in enumerate(self.categories['priority']) if value in ('P2', 'P3', 'P4') ]
+        return ~np.isin(self.column('key_prefix'), skip_prefix) & ~np.isin(self.column('priority'), skip_priority) & (self.cost() > 0)
+
+    def output_fields(self) -> dict:
+        """Return { index: [field] } of the output rows, same layout as AmlJiraSystem.fields"""
+        rows = np.flatnonzero(self.output_mask())
+        values = { name: [ self.categories[name][code] for code in self.column(name)[rows].tolist() ] for name in self.categorical }
+        values.update({ name: self.column(name)[rows].tolist() for name in self.datetimes })
+        values['key_number'] = self.column('key_number')[rows].tolist()
+        values['cost'] = self.cost()[rows].tolist()
+        values['issue_id'] = [ '{}-{}'.format(prefix, number) for prefix, number in zip(values['key_prefix'], values['key_number']) ]
+        return { n: [ { key: values[key][n - 1] for key in ('issue_id', 'product', 'project_id', 'component', 'status', 'priority', 'assignee', 'rd_manager', 'created', 'updated', 'finish_date', 'cost') } ]
+                 for n in range(1, len(rows) + 1) }
+
+class TrendTable(object):
+    """Created/resolved dates and DI weights of issues as NumPy columns, bucketed by week or month"""
+    fields = ('created', 'resolutiondate', 'customfield_10109')
+    dtypes = { 'created': 'datetime64[D]', 'resolved': 'datetime64[D]', 'weight': 'float64' }
+    columns = ('created', 'resolved', 'backlog', 'di_created', 'di_open')
+    title = ('Bucket', 'Created', 'Resolved', 'Open Backlog', 'DI (Created)', 'DI (Open)')
+
+    def __init__(self, di_rules):
+        self.di_rules = di_rules
+        self.size = 0
+        self.chunks = defaultdict(list)                                 # 每页的列数据, ex: { 'created': [ array(['2023-02-13']) ] }
+
+    def extend(self, jql_issues):
+        """Append one page of raw json issues as column chunks"""
+        created, resolved, weight = [], [], []
+        for d in jql_issues:
+            f = d['fields']
+            created.append(f['created'][:10] if f.get('created') else 'NaT')                  # '2023-02-13T11:50:52.889+0800' -> '2023-02-13'
+            resolved.append(f['resolutiondate'][:10] if f.get('resolutiondate') else 'NaT')
+            weight.append(self.di_rules.get(f['customfield_10109']['value'], 0) if f.get('customfield_10109') else 0)
+        for name, values in (('created', created), ('resolved', resolved), ('weight', weight)):
+            self.chunks[name].append(np.array(values, dtype=self.dtypes[name]))
+        self.size += len(jql_issues)
+
+    def column(self, name) -> 'np.ndarray':
+        return np.concatenate(self.chunks[name] or [ np.array([], dtype=self.dtypes[name]) ])
+
+    @staticmethod
+    def edges(unit, start, end) -> 'np.ndarray':
+        """Return the bucket edges of [START, END), weeks start on Monday and are clipped to the window"""
+        if unit == 'month':
+            return np.arange(start.astype('datetime64[M]'), end.astype('datetime64[M]') + 1).astype('datetime64[D]')
+        monday = start - (start.astype(np.int64) + 3) % 7              # 1970-01-01为周四
+        return np.unique(np.clip(np.arange(monday, end + 7, 7), start, end))
+
+    @staticmethod
+    def labels(unit, buckets) -> list:
+        """Return the label of each bucket start, ex: 2022-11 | 2022-10-31"""
+        if unit == 'month':
+            buckets = buckets.astype('datetime64[M]')
+        return [ str(x) for x in buckets ]
+
+    def buckets(self, unit, start, end) -> dict:
+        """Return { column: array } per bucket of [START, END), backlog and DI (Open) are counted at the end of each bucket"""
+        edges = self.edges(unit, start, end)
+        created, resolved, weight = self.column('created'), self.column('resolved'), self.column('weight')
+        valid = ~np.isnat(created)
+        created, resolved, weight = created[valid], resolved[valid], weight[valid]
+        done = ~np.isnat(resolved)
+
+        #* 排序后searchsorted得到每个边界之前的累计数量/累计DI, 相邻边界相减即为桶内的数量
+        by_created = np.argsort(created, kind='stable')
+        by_resolved = np.argsort(resolved[done], kind='stable')
+        created_before = np.searchsorted(created[by_created], edges)
+        resolved_before = np.searchsorted(resolved[done][by_resolved], edges)
+        created_di = np.concatenate(([ 0 ], np.cumsum(weight[by_created])))[created_before]
+        resolved_di = np.concatenate(([ 0 ], np.cumsum(weight[done][by_resolved])))[resolved_before]
+        return { 'bucket': edges[:-1],
+                 'created': np.diff(created_before),
+                 'resolved': np.diff(resolved_before),
+                 'backlog': (created_before - resolved_before)[1:],
+                 'di_created': np.round(np.diff(created_di), 1),
+                 'di_open': np.round(created_di - resolved_di, 1)[1:] }
+
+class EpicRollup(object):
+    """Per-epic issue/open/severity counts of a result set, the epics themselves are resolved in chunked key searches"""
+    fields = ('customfield_10102', 'resolutiondate', 'customfield_10109')
+    epic_fields = ('summary', 'status')
+    title = ('Epic', 'Summary', 'Status', 'Issues', 'Open', 'Blocker', 'Critical', 'Major', 'Normal', 'Open DI')
+
+    def __init__(self, di_rules):
+        self.di_rules = di_rules
+        self.issues = Counter()                 # epic -> issue数
+        self.open = Counter()                   # epic -> 未解决issue数
+        self.severity = defaultdict(Counter)    # epic -> 未解决issue的Severity分布
+        self.epics = {}                         # epic -> { 'summary': str, 'status': str }
+        self.requests = 0
+
+    def add(self, jql_issues):
+        """Count one page of raw json issues, issues without epic are counted as None"""
+        for d in jql_issues:
+            f = d['fields']
+            epic = f.get('customfield_10102')
+            self.issues[epic] += 1
+            if not f.get('resolutiondate'):
+                self.open[epic] += 1
+                if f.get('customfield_10109'):
+                    self.severity[epic][f['customfield_10109']['value']] += 1
+
+    def keys(self) -> list:
+        """Return the distinct epic keys"""
+        return [ epic for epic in self.issues if epic ]
+
+    def resolve(self, jql_results):
+        """Record summary/status of the epics in one search page"""
+        self.requests += 1
+        for d in (jql_results or {}).get('issues') or ():
+            f = d['fields']
+            self.epics[d['key']] = { 'summary': f.get('summary'), 'status': (f.get('status') or {}).get('name') }
+
+    def di(self, epic) -> float:
+        return sum(n * self.di_rules[severity] for severity, n in self.severity[epic].items() if severity in self.di_rules)
+
+    def rows(self) -> list:
+        """Return one row per epic in TITLE order, highest open DI first, issues without epic last"""
+        rows = []
+        for epic in sorted(self.issues, key=lambda epic: (epic is None, -self.di(epic), -self.open[epic], epic or '')):
+            info = self.epics.get(epic) or {}
+            rows.append([ epic or 'No Epic', info.get('summary'), info.get('status'), self.issues[epic], self.open[epic],
+                          *(self.severity[epic][severity] for severity in ('Blocker', 'Critical', 'Major', 'Normal')), round(self.di(epic), 1) ])
+        return rows
+
+class LinkGraph(object):
+    """Adjacency index of issuelinks, expanded level by level with key searches, every analysis is O(issues + links)"""
+    fields = ('issuelinks', )
+
+    def __init__(self):
+        self.nodes = {}                         # issue key -> node id
+        self.keys = []                          # node id -> issue key
+        self.fetched = set()                    # 已获取issuelinks的node id(包括搜索不到的key, 避免重复搜索)
+        self.link_ids = set()                   # 两端issue会返回同一个link, 按link id去重
+        self.edges = defaultdict(list)          # link类型 -> [ (outward node, inward node) ], ex: A blocks B -> (A, B)
+        self.adjacency = defaultdict(list)      # node id -> [ (neighbor, link类型) ], 无向
+
+    def node(self, key) -> int:
+        n = self.nodes.get(key)
+        if n is None:
+            n = self.nodes[key] = len(self.keys)
+            self.keys.append(key)
+        return n
+
+    @property
+    def size(self) -> int:
+        return sum(len(edges) for edges in self.edges.values())
+
+    def add(self, jql_issues) -> int:
+        """Add the issuelinks of one page of raw json issues, return the count of new links"""
+        links = 0
+        for d in jql_issues:
+            n = self.node(d['key'])
+            self.fetched.add(n)
+            for x in d['fields'].get('issuelinks') or ():
+                if x.get('id') in self.link_ids or not x.get('type'):
+                    continue
+                self.link_ids.add(x.get('id'))
+                kind = x['type']['outward']                             # ex: 'blocks', 'clones', 'relates to'
+                if x.get('outwardIssue'):
+                    edge = (n, self.node(x['outwardIssue']['key']))
+                elif x.get('inwardIssue'):
+                    edge = (self.node(x['inwardIssue']['key']), n)
                 else:
-                    pattern_author += (str('{}({})'.format(x[0], x[2])) + ' ' + str(x[1]) + '\n')       # 格式化termgraph所识别的数据格式
-
-            #* 数据可视化输出
-            for string in (pattern_author, ):
-                # termgraph_cmd = "echo '{}' | termgraph --format \{{\:.0f}} --title 'By Comments: {} people already commented in {}'".format(string.rstrip(), len(_authors), PROJECT_ID)    # 调用termgraph图形化数据 
-                termgraph_cmd = "echo '{}' | termgraph --format \{{\:.0f}} --title 'By {}({}): {} people already {} in {}'".format(string.rstrip(), category, total, len(_authors), operate, PROJECT_ID)    # 调用termgraph图形化数据 
-                try:
-                    result = subprocess.Popen(termgraph_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True).communicate()[0].decode()
-                    console.print(Panel.fit(result, width=1000))
-                except Exception:
-                    console.print('[red]Termgraph error![/red]\n')
+                    continue
+                self.edges[kind].append(edge)
+                self.adjacency[edge[0]].append((edge[1], kind))
+                self.adjacency[edge[1]].append((edge[0], kind))
+                links += 1
+        return links
+
+    def frontier(self) -> list:
+        """Return the keys of linked issues whose issuelinks are not fetched yet"""
+        return [ self.keys[n] for n in range(len(self.keys)) if n not in self.fetched ]
+
+    def visited(self, keys):
+        """Mark KEYS as fetched, so the issues not returned by the search are not searched again"""
+        self.fetched.update(self.nodes[key] for key in keys)
+
+    def components(self, kinds=None) -> list:
+        """Return the connected components as [ [node id] ], largest first, only through the KINDS links if given"""
+        seen, components = bytearray(len(self.keys)), []
+        for start in range(len(self.keys)):
+            if seen[start]:
+                continue
+            seen[start] = 1
+            component, queue = [ start ], deque([ start ])
+            while queue:
+                for neighbor, kind in self.adjacency[queue.popleft()]:
+                    if not seen[neighbor] and (kinds is None or kind in kinds):
+                        seen[neighbor] = 1
+                        component.append(neighbor)
+                        queue.append(neighbor)
+            components.append(component)
+        return sorted(components, key=len, reverse=True)
+
+    def chains(self, kind='blocks', top=5) -> list:
+        """Return the TOP longest KIND chains as [ [issue key] ], ex: A blocks B blocks C -> [ A, B, C ], issues in cycles are skipped"""
+        edges = self.edges.get(kind) or ()
+        successors, indegree = defaultdict(list), [ 0 ] * len(self.keys)
+        for a, b in edges:
+            successors[a].append(b)
+            indegree[b] += 1
+        #* 拓扑排序(Kahn)上的最长路径, 每个node与link只访问一次
+        length, previous = [ 1 ] * len(self.keys), [ -1 ] * len(self.keys)
+        queue = deque(n for n in { a for a, _ in edges } if not indegree[n])
+        while queue:
+            a = queue.popleft()
+            for b in successors[a]:
+                if length[a] + 1 > length[b]:
+                    length[b], previous[b] = length[a] + 1, a
+                indegree[b] -= 1
+                if not indegree[b]:
+                    queue.append(b)
+        ends = sorted((n for n in { b for _, b in edges } if not successors[n] and length[n] > 1), key=lambda n: -length[n])[:top]
+        chains = []
+        for n in ends:
+            chain = []
+            while n != -1:
+                chain.append(self.keys[n])
+                n = previous[n]
+            chains.append(chain[::-1])
+        return chains
+
+class ChangelogTable(object):
+    """Every changelog item flattened once into NumPy event columns: issue, time, author, field, from, to"""
+    fields = ('created', 'status')
+    categorical = ('author', 'field', 'value')                      # from/to共用'value'编码, 便于比较同一状态
+
+    def __init__(self, name_upper):
+        self.keys = []                                              # issue序号 -> issue key
+        self.created = []                                           # issue序号 -> created时间
+        self.categories = { name: [] for name in self.categorical }
+        self.codes = { name: {} for name in self.categorical }
+        self.normalize = { 'author': name_upper }
+        self.chunks = defaultdict(list)
+        self.columns = {}
+
+    @property
+    def size(self) -> int:
+        return len(self.column('issue'))
+
+    def encode(self, name, raw) -> int:
+        """Return the categorical code of RAW in column NAME"""
+        code = self.codes[name].get(raw)
+        if code is None:
+            code = self.codes[name][raw] = len(self.categories[name])
+            self.categories[name].append(self.normalize[name](raw) if raw is not None and name in self.normalize else raw)
+        return code
+
+    def code(self, name, value) -> int:
+        """Return the code of VALUE in column NAME, -1 if it never occurs"""
+        return self.codes[name].get(value, -1)
+
+    def extend(self, jql_issues):
+        """Append the changelog items of one page of raw json issues, one event per item (not per history)"""
+        encode = self.encode
+        rows = defaultdict(list)
+        for d in jql_issues:
+            issue = len(self.keys)
+            self.keys.append(d['key'])
+            self.created.append(d['fields']['created'][:19] if d['fields'].get('created') else 'NaT')
+            for x in (d.get('changelog') or {}).get('histories') or ():
+                author = encode('author', (x.get('author') or {}).get('name'))
+                created = x['created'][:19]                          # '2023-02-13T11:50:52.889+0800' -> '2023-02-13T11:50:52'
+                for item in x['items']:
+                    rows['issue'].append(issue)
+                    rows['time'].append(created)
+                    rows['author'].append(author)
+                    rows['field'].append(encode('field', item['field']))
+                    rows['from'].append(encode('value', item['fromString']))
+                    rows['to'].append(encode('value', item['toString']))
+        for name in ('issue', 'author', 'field', 'from', 'to'):
+            self.chunks[name].append(np.array(rows[name], dtype=np.int32))
+        self.chunks['time'].append(np.array(rows['time'], dtype='datetime64[s]'))
+        self.columns = {}
+
+    def column(self, name) -> 'np.ndarray':
+        """Return event column NAME, or 'created' of each issue"""
+        if name not in self.columns:
+            if name == 'created':
+                self.columns[name] = np.array(self.created, dtype='datetime64[s]')
+            else:
+                chunks = self.chunks[name] or [ np.array([], dtype=np.int32) ]
+                self.columns[name] = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+                self.chunks[name] = [ self.columns[name] ]
+        return self.columns[name]
+
+    def events(self, field) -> tuple:
+        """Return (issue, time, from, to) of the FIELD events, sorted by issue then time"""
+        mask = self.column('field') == self.code('field', field)
+        issue, when = self.column('issue')[mask], self.column('time')[mask]
+        order = np.lexsort((when, issue))                           # 同一时间的items保持原顺序(lexsort稳定)
+        return issue[order], when[order], self.column('from')[mask][order], self.column('to')[mask][order]
+
+    def transitions(self, field='status') -> Counter:
+        """Return Counter({ (from, to): count }) of FIELD"""
+        _, _, from_codes, to_codes = self.events(field)
+        width = len(self.categories['value'])
+        pairs, counts = np.unique(from_codes.astype(np.int64) * width + to_codes, return_counts=True)
+        values = self.categories['value']
+        return Counter({ (values[pair // width], values[pair % width]): int(n) for pair, n in zip(pairs.tolist(), counts.tolist()) })
+
+    @staticmethod
+    def distribution(days) -> dict:
+        """Return count/mean/p50/p90/max of DAYS"""
+        if not len(days):
+            return { 'count': 0, 'mean': None, 'p50': None, 'p90': None, 'max': None }
+        p50, p90 = np.percentile(days, [50, 90])
+        return { 'count': int(len(days)), 'mean': float(days.mean()), 'p50': float(p50), 'p90': float(p90), 'max': float(days.max()) }
+
+    def dwell(self, field='status') -> dict:
+        """Return { state: distribution of days } spent in each FIELD state, the current (unfinished) state is not counted
+
+        The state before the first change (from) starts at issue created, each later state (to) ends at the next change of the same issue.
+        """
+        issue, when, from_codes, to_codes = self.events(field)
+        if not len(issue):
+            return {}
+        first = np.r_[True, issue[1:] != issue[:-1]]
+        last = np.r_[issue[1:] != issue[:-1], True]
+        states = np.concatenate([ from_codes[first], to_codes[~last] ])
+        starts = np.concatenate([ self.column('created')[issue[first]], when[:-1][~last[:-1]] ])
+        ends = np.concatenate([ when[first], when[1:][~last[:-1]] ])
+        days = (ends - starts).astype(np.float64) / 86400
+        valid = ~np.isnat(starts) & (days >= 0)                     # 缺少created时初始状态无法计算; 导入/迁移的issue可能早于created变更, 时长为负
+        states, days = states[valid], days[valid]
+        order = np.lexsort((days, states))
+        states, days = states[order], days[order]
+        bounds = np.flatnonzero(np.r_[True, states[1:] != states[:-1], True])
+        return { self.categories['value'][states[s]]: self.distribution(days[s:e]) for s, e in zip(bounds[:-1], bounds[1:]) }
+
+    def time_to(self, state, field='status') -> dict:
+        """Return the distribution of days from issue created to the first change into STATE"""
+        issue, when, _, to_codes = self.events(field)
+        mask = to_codes == self.code('value', state)
+        issue, when = issue[mask], when[mask]
+        issue, first = np.unique(issue, return_index=True)          # 已按时间排序, 第一次出现即第一次进入STATE
+        created = self.column('created')[issue]
+        days = (when[first] - created).astype(np.float64) / 86400
+        return self.distribution(days[~np.isnat(created) & (days >= 0)])
+
+    def entries(self, state, field='status') -> dict:
+        """Return { 'issues': issues entering STATE, 'events': total entries, 'max': max entries of one issue }, ex: reopened"""
+        issue, _, _, to_codes = self.events(field)
+        counts = np.bincount(issue[to_codes == self.code('value', state)], minlength=len(self.keys))
+        return { 'issues': int(np.count_nonzero(counts)), 'events': int(counts.sum()), 'max': int(counts.max()) if len(counts) else 0 }
+
+class IssueCache(object):
+    """Local SQLite store of raw Jira issues, keyed by normalized query and issue key"""
+    sync_margin = timedelta(minutes=5)          # 增量同步提前的时间, 覆盖JQL的分钟精度与服务器写入延迟
+
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS queries (query_id TEXT PRIMARY KEY, jql TEXT, fields TEXT, expand TEXT, last_sync TEXT)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS issues (query_id TEXT, key TEXT, created TEXT, updated TEXT, payload BLOB, rank INTEGER, PRIMARY KEY (query_id, key))')
+        if 'rank' not in [ row[1] for row in self.conn.execute('PRAGMA table_info(issues)') ]:
+            self.conn.execute('ALTER TABLE issues ADD COLUMN rank INTEGER')         # 旧版本的缓存文件
+        self.conn.execute('CREATE INDEX IF NOT EXISTS issues_created ON issues (query_id, created)')
+
+    @staticmethod
+    def parse_time(value) -> datetime:
+        """Return the aware datetime of a Jira timestamp, ex: '2023-02-13T11:50:52.889+0800' or '2023-02-13T03:50:52.889+00:00'"""
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+    def query_id(self, jql, fields, expand) -> str:
+        """Return a stable id for the same normalized JQL, fields and expand"""
+        _jql = ' '.join(jql.split())           # 合并多余的空白字符
+        return hashlib.sha1(json.dumps([_jql, fields, expand]).encode('utf-8')).hexdigest()
+
+    def last_sync(self, query_id):
+        """Return the latest 'updated' timestamp stored for QUERY_ID, None if never synced"""
+        row = self.conn.execute('SELECT last_sync FROM queries WHERE query_id = ?', (query_id, )).fetchone()
+        return row[0] if row else None
+
+    def merge(self, query_id, issues) -> int:
+        """Insert or replace ISSUES of QUERY_ID, return the count of merged issues"""
+        rows = [ (query_id, d['key'], d['fields'].get('created'), d['fields'].get('updated'), zlib.compress(json.dumps(d).encode('utf-8'))) for d in issues ]
+        self.conn.executemany('INSERT OR REPLACE INTO issues (query_id, key, created, updated, payload) VALUES (?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def order(self, query_id, keys):
+        """Record KEYS (in the JQL order) as the output order of QUERY_ID"""
+        self.conn.executemany('UPDATE issues SET rank = ? WHERE query_id = ? AND key = ?', [ (rank, query_id, key) for rank, key in enumerate(keys) ])
+
+    def prune(self, query_id, live_keys) -> int:
+        """Delete issues of QUERY_ID which are not in LIVE_KEYS, return the count of deleted issues"""
+        stale = [ (query_id, key) for (key, ) in self.conn.execute('SELECT key FROM issues WHERE query_id = ?', (query_id, )) if key not in live_keys ]
+        self.conn.executemany('DELETE FROM issues WHERE query_id = ? AND key = ?', stale)
+        return len(stale)
+
+    def drop(self, query_id):
+        self.conn.execute('DELETE FROM issues WHERE query_id = ?', (query_id, ))
+        self.conn.execute('DELETE FROM queries WHERE query_id = ?', (query_id, ))
+        self.conn.commit()
+
+    def save(self, query_id, jql, fields, expand):
+        """Record the sync point of QUERY_ID, the latest 'updated' of its issues in UTC, and commit"""
+        #* 不同issue的updated可能带不同的时区偏移, 按时间而不是字符串比较
+        updated = [ self.parse_time(value) for (value, ) in self.conn.execute('SELECT updated FROM issues WHERE query_id = ? AND updated IS NOT NULL', (query_id, )) ]
+        last_sync = max(updated).astimezone(timezone.utc).isoformat(timespec='milliseconds') if updated else None
+        self.conn.execute('INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?)', (query_id, jql, json.dumps(fields), expand, last_sync))
+        self.conn.commit()
+
+    def iter_pages(self, query_id, max_results=1000):
+        """Yield stored issues of QUERY_ID as search_issues like json pages, in the order of the JQL at the last sync"""
+        cursor = self.conn.execute('SELECT payload FROM issues WHERE query_id = ? ORDER BY rank', (query_id, ))
+        while True:
+            rows = cursor.fetchmany(max_results)
+            if not rows:
+                break
+            yield {'issues': [ json.loads(zlib.decompress(payload)) for (payload, ) in rows ]}
+
+    def close(self):
+        self.conn.close()
+
+class TextIndex(object):
+    """Local SQLite FTS5 index of issue summary/description and comments, updated by issue key"""
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS issues (key TEXT PRIMARY KEY, updated TEXT, comments INTEGER)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, key TEXT, kind TEXT, author TEXT, created TEXT, body TEXT)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS docs_key ON docs (key)')
+        #* external content: 正文只在docs中存一份, 按issue key删除旧文档时无需扫描全文索引
+        self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(body, content='docs', content_rowid='id')")
+
+    @staticmethod
+    def comments(d) -> int:
+        """Return the count of comments returned in issue D, less than the total if the search truncated them"""
+        return len((d['fields'].get('comment') or {}).get('comments') or ())
+
+    @staticmethod
+    def truncated(d) -> bool:
+        comment = d['fields'].get('comment') or {}
+        return comment.get('total', 0) > len(comment.get('comments') or ())
+
+    @staticmethod
+    def documents(d) -> list:
+        """Return [ (kind, author, created, body) ] of issue D: summary + description, then one per comment"""
+        f = d['fields']
+        docs = [ ('description', (f.get('reporter') or {}).get('name'), f.get('created'), '\n'.join(x for x in (f.get('summary'), f.get('description')) if x)) ]
+        for comment in (f.get('comment') or {}).get('comments') or ():
+            docs.append(('comment', (comment.get('author') or {}).get('name'), comment.get('created'), comment.get('body') or ''))
+        return [ doc for doc in docs if doc[3] ]
+
+    def update(self, issues) -> int:
+        """Re-index ISSUES whose 'updated' changed or which carry more comments than indexed(ex: --hydrate), return the re-indexed count"""
+        keys = [ d['key'] for d in issues ]
+        indexed = { key: (updated, comments) for key, updated, comments in self.conn.execute(
+            'SELECT key, updated, comments FROM issues WHERE key IN ({})'.format(','.join('?' * len(keys))), keys) } if keys else {}
+        changed = [ d for d in issues if d['fields'].get('updated') is None or d['key'] not in indexed
+                    or indexed[d['key']][0] != d['fields'].get('updated') or self.comments(d) > (indexed[d['key']][1] or 0) ]
+        for d in changed:
+            old = self.conn.execute('SELECT id, body FROM docs WHERE key = ?', (d['key'], )).fetchall()
+            self.conn.executemany("INSERT INTO docs_fts (docs_fts, rowid, body) VALUES ('delete', ?, ?)", old)
+            self.conn.execute('DELETE FROM docs WHERE key = ?', (d['key'], ))
+            for kind, author, created, body in self.documents(d):
+                cursor = self.conn.execute('INSERT INTO docs (key, kind, author, created, body) VALUES (?, ?, ?, ?, ?)', (d['key'], kind, author, created, body))
+                self.conn.execute('INSERT INTO docs_fts (rowid, body) VALUES (?, ?)', (cursor.lastrowid, body))
+            self.conn.execute('INSERT OR REPLACE INTO issues VALUES (?, ?, ?)', (d['key'], d['fields'].get('updated'), self.comments(d)))
+        self.conn.commit()
+        return len(changed)
+
+    @staticmethod
+    def phrases(texts) -> str:
+        """Return the FTS5 query matching every TEXT as a phrase, ex: [ 'HDCP timeout', 'foo"bar' ] -> '"HDCP timeout" "foo""bar"'"""
+        return ' '.join('"{}"'.format(text.replace('"', '""')) for text in texts if text.strip())
+
+    def search(self, query, limit=30) -> list:
+        """Return [ (key, kind, author, created, snippet, score) ] of QUERY(FTS5 syntax) ranked by bm25, best first"""
+        return self.conn.execute('SELECT docs.key, docs.kind, docs.author, docs.created, snippet(docs_fts, 0, \'[\', \']\', \'...\', 16), bm25(docs_fts) '
+                                 'FROM docs_fts JOIN docs ON docs.id = docs_fts.rowid WHERE docs_fts MATCH ? ORDER BY bm25(docs_fts) LIMIT ?', (query, limit)).fetchall()
+
+    def size(self) -> tuple:
+        """Return (indexed issues, indexed documents)"""
+        return self.conn.execute('SELECT count(*) FROM issues').fetchone()[0], self.conn.execute('SELECT count(*) FROM docs').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+class QueryServer(object):
+    """Answer JQL queries over local HTTP as json, keeping the JIRA session, the analyzers and the parsed issues warm
+
+    Each query first scans only key/updated of its issues, then fetches and parses just the issues not seen before or updated since,
+    the analyzer events of every parsed issue are kept by (key, updated) and shared by all later queries.
+    The analyses are those enabled by the startup flags, a request may select a subset of them by "analyses".
+
+    GET  /query?jql=...&refresh=1&analyses=comments,di
+    POST /query  { "jql": "...", "refresh": false, "analyses": [ "verified" ] } or { "args": { "Project ID": [ "X32A0-T972" ] } }
+    GET  /status
+    """
+    analyses = { 'comments': ('commentor_all_count', ),
+                 'verified': ('verified_all_count', 'verified_QA_count'),
+                 'label': ('support_label_count', ),
+                 'di': ('severity_count', ),
+                 'testcase': ('testcase_count', 'addcase_count', 'othercase_count', 'nonecase_count') }
+    chunk_size = 200                                                    # 按key获取未缓存issues时每次的数量
+
+    def __init__(self, system, ttl=300):
+        self.system = system
+        self.system.show_progress = False                              # 不显示进度条, 不做projection估算
+        self.system.compile_analyzers()
+        self.enabled = [ name for name, flag in (('comments', ACTIVE_CHECK), ('verified', VERIFY_CHECK), ('label', LABEL_CHECK and DATERANGE),
+                                                 ('di', DI_COUNT), ('testcase', TESTCASE_CHECK)) if flag ]
+        self.ttl = ttl
+        self.results = {}                                               # (归一化JQL, analyses) -> (完成时间, 结果)
+        self.issue_events = {}                                          # issue key -> (updated, 分析插件的计数事件)
+        self.lock = threading.Lock()                                    # AmlJiraSystem的统计状态同一时间只服务一个JQL
+        self.results_lock = threading.Lock()                            # 结果缓存/统计, 只在读写时短暂持有, 缓存命中不等待正在获取的JQL
+        self.stats = Counter()
+        self.started = time.time()
+
+    def scan(self, jql) -> list:
+        """Return [ (key, updated) ] of JQL, only the updated field is fetched"""
+        pages = self.system.iter_search_pages(jql, PAGE_SIZE, fields=[ 'updated' ], expand=None)
+        return [ (d['key'], d['fields'].get('updated')) for jql_results in pages for d in jql_results.get('issues') or () ]
+
+    def warm(self, issues) -> int:
+        """Fetch and parse the ISSUES [ (key, updated) ] whose events are not cached at that updated, return the parsed count"""
+        updated = dict(issues)
+        misses = [ key for key, value in issues if (self.issue_events.get(key) or (None, ))[0] != value or value is None ]
+        recorder = EventRecorder()
+        for jql_results in self.system.search_keys(misses, self.chunk_size):
+            jql_issues = (jql_results or {}).get('issues') or []
+            if HYDRATE_FLAG:
+                self.system.hydrate_issues(jql_issues)
+            for _, field in self.system.iter_fields(jql_issues, recorder, release=True):
+                self.issue_events[field['issue_id']] = (updated.get(field['issue_id']), tuple(recorder.events))
+                recorder.events.clear()
+        return len(misses)
+
+    def query(self, jql, refresh=False, analyses=None) -> dict:
+        """Return the json result of ANALYSES(default: all enabled) over JQL, from the result cache if it is younger than ttl"""
+        jql = ' '.join(jql.split())
+        analyses = tuple(analyses or self.enabled)
+        counter_names = [ name for analysis in analyses for name in self.analyses[analysis] ]
+        with self.results_lock:
+            self.stats['queries'] += 1
+        cached = not refresh and self.cached((jql, analyses))
+        if cached:
+            return cached
+
+        with self.lock:
+            cached = not refresh and self.cached((jql, analyses))      # 等待期间相同的请求可能已完成
+            if cached:
+                return cached
+            _start = time.time()
+            issues = self.scan(jql)
+            parsed = self.warm(issues)
+            aggregate = FieldsAggregate(stream=True)
+            for key, _ in issues:
+                for name, value in (self.issue_events.get(key) or (None, ()))[1]:
+                    if name in counter_names:
+                        aggregate.add(name, value)
+            result = { 'jql': jql,
+                       'issues': len(issues),
+                       'parsed': parsed,                                # 本次实际获取并解析的issue数, 其余来自已解析issue的缓存
+                       'analyses': list(analyses),
+                       'totals': { name: aggregate.totals[name] for name in counter_names },
+                       'counters': { name: dict(getattr(aggregate, name)) for name in counter_names },
+                       'cost': round(time.time() - _start, 3) }
+            if 'di' in analyses:
+                result['di'] = self.system.calculate_severity(dict(aggregate.severity_count))
+        with self.results_lock:
+            self.stats['parsed'] += parsed
+            now = time.time()
+            self.results = { k: v for k, v in self.results.items() if now - v[0] < self.ttl }   # 顺带清理过期结果
+            if self.ttl:
+                self.results[(jql, analyses)] = (now, result)
+        return dict(result, cached=False)
+
+    def cached(self, key):
+        """Return the cached result of KEY (jql, analyses) if it is younger than ttl, else None"""
+        with self.results_lock:
+            cached = self.results.get(key)
+            if cached and time.time() - cached[0] < self.ttl:
+                self.stats['hits'] += 1
+                return dict(cached[1], cached=True)
+        return None
+
+    def status(self) -> dict:
+        with self.results_lock:
+            return { 'uptime': round(time.time() - self.started, 1), 'queries': self.stats['queries'], 'hits': self.stats['hits'],
+                     'cached': len(self.results), 'ttl': self.ttl, 'analyses': self.enabled, 'issues': len(self.issue_events),
+                     'parsed': self.stats['parsed'], 'scheduler': self.system.scheduler.summary() }
+
+    def handle(self, method, path, body) -> tuple:
+        """Return (http status, json object) of one request"""
+        url = urlparse(path)
+        if method == 'GET' and url.path == '/status':
+            return 200, self.status()
+        if url.path != '/query':
+            return 404, { 'error': 'Unknown path: {}, pls use /query or /status'.format(url.path) }
+        if method == 'GET':
+            params = { k: v[0] for k, v in parse_qs(url.query).items() }
         else:
-            logging.warning('There\'s no data to work with Termgraph!')
+            try:
+                params = json.loads(body or b'{}')
+            except ValueError as err:
+                return 400, { 'error': 'Illegal json: {}'.format(err) }
+        jql = params.get('jql')
+        if not jql and params.get('args'):
+            jql = self.system.packaging_filter_from(dict(ARGS_DICT, **params['args']))    # 与命令行参数相同的组合方式, ex: { "Status": [ "OPEN" ] }
+        if not jql:
+            return 400, { 'error': 'Missing jql or args' }
+        analyses = params.get('analyses')
+        if isinstance(analyses, str):
+            analyses = [ x.strip() for x in analyses.split(',') if x.strip() ]          # GET: analyses=comments,di
+        unknown = [ x for x in analyses or () if x not in self.enabled ]
+        if unknown:
+            return 400, { 'error': 'Analyses not enabled at startup: {}, available: {}'.format(unknown, self.enabled) }
+        try:
+            return 200, self.query(jql, refresh=params.get('refresh') not in (None, False, '', '0', 'false'), analyses=analyses)
+        except Exception as err:
+            logging.error('Query failed: {}, JQL: {}'.format(err, jql))
+            return 500, { 'error': str(err), 'jql': jql }
+
+    def serve(self, address):
+        """Serve on ADDRESS(host:port) until Ctrl+C"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def reply(self, method):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0)) if method == 'POST' else None
+                code, result = server.handle(method, self.path, body)
+                payload = json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.reply('GET')
+
+            def do_POST(self):
+                self.reply('POST')
+
+            def log_message(self, format, *args):
+                logging.debug('{} - {}'.format(self.address_string(), format % args))
+
+        host, _, port = address.rpartition(':')
+        httpd = ThreadingHTTPServer((host or '127.0.0.1', int(port)), Handler)
+        logging.info('Serving on http://{}:{}/query, ttl: {}s, Ctrl+C to quit'.format(host or '127.0.0.1', port, self.ttl))
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+            logging.info('>>> Served {} queries, {} from cache'.format(self.stats['queries'], self.stats['hits']))
+
+class BarChart(object):
+    """Horizontal bar chart of (name, value, ratio) rows, drawn straight into the rich console or saved as svg/png/json"""
+    width = 50                        # 最长bar的字符数(与termgraph默认宽度一致)
+    tick = '▇'
+
+    def __init__(self, title, rows, highlight=(), precision=0):
+        self.title = title
+        self.rows = rows                                                # ratio=None时label不显示占比, ex: 趋势图
+        self.highlight = frozenset(highlight)
+        self.precision = precision                                      # value显示的小数位数
+
+    def labels(self) -> list:
+        return [ '{}{}{}'.format('*' if name in self.highlight else '', name, '' if ratio is None else '({:.1%})'.format(ratio)) for name, _, ratio in self.rows ]
+
+    def value(self, value) -> str:
+        return '{:.{}f}'.format(value, self.precision)
+
+    def bars(self, width) -> list:
+        """Return the bar length of each row, the largest value fills WIDTH"""
+        peak = max([ value for _, value, _ in self.rows ] + [ 1 ])
+        return [ max(1, round(value * width / peak)) if value > 0 else 0 for _, value, _ in self.rows ]
+
+    def __rich_console__(self, console, options):
+        from rich.text import Text
+        labels = self.labels()
+        label_width = max(len(x) for x in labels)
+        yield Text('# {}'.format(self.title), style='bold')
+        yield Text('')
+        for label, bar, (name, value, _) in zip(labels, self.bars(self.width), self.rows):
+            line = Text('{}: '.format(label.ljust(label_width)))
+            line.append(self.tick * bar, style='cyan' if name in self.highlight else 'blue')
+            line.append(' {}'.format(self.value(value)))
+            yield line
+
+    def to_json(self) -> str:
+        return json.dumps({ 'title': self.title,
+                            'rows': [ { 'name': name, 'value': value, 'ratio': None if ratio is None else round(ratio, 4), 'team': name in self.highlight } for name, value, ratio in self.rows ] },
+                          indent=4, ensure_ascii=False)
+
+    def to_svg(self) -> str:
+        labels = self.labels()
+        label_width = 7 * max(len(x) for x in labels) + 10            # 按Arial 12px平均字宽估算label列宽度
+        bar_width, row_height = 400, 20
+        height = 40 + row_height * len(self.rows)
+        svg = [ '<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" font-family="Arial" font-size="12">'.format(label_width + bar_width + 60, height),
+                '<text x="10" y="20" font-weight="bold">{}</text>'.format(escape(self.title)) ]
+        for i, (label, bar, (name, value, _)) in enumerate(zip(labels, self.bars(bar_width), self.rows)):
+            y = 40 + row_height * i
+            svg.append('<text x="{}" y="{}" text-anchor="end">{}</text>'.format(label_width, y + 12, escape(label)))
+            svg.append('<rect x="{}" y="{}" width="{}" height="14" fill="{}"/>'.format(label_width + 6, y + 1, bar, '#00AAAA' if name in self.highlight else '#0066CC'))
+            svg.append('<text x="{}" y="{}">{}</text>'.format(label_width + bar + 10, y + 12, self.value(value)))
+        svg.append('</svg>')
+        return '\n'.join(svg)
+
+    def save(self, chart_file, chart_format) -> bool:
+        if chart_format == 'png':
+            try:
+                import matplotlib                                       # png依赖matplotlib, 仅在需要时导入
+            except ImportError:
+                logging.error('PNG chart needs matplotlib, pls run: pip install matplotlib')
+                return False
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            figure, axes = plt.subplots(figsize=(10, 0.3 * len(self.rows) + 1))
+            axes.barh(self.labels()[::-1], [ value for _, value, _ in self.rows ][::-1], color=[ '#00AAAA' if name in self.highlight else '#0066CC' for name, _, _ in self.rows ][::-1])
+            axes.set_title(self.title)
+            figure.tight_layout()
+            figure.savefig(chart_file)
+            plt.close(figure)
+            return True
+        with open(chart_file, 'w', encoding='utf-8') as f:
+            f.write(self.to_svg() if chart_format == 'svg' else self.to_json())
+        return True
 
 class TableObject():
-    def __init__(self):
-        self.workbook = xlwt.Workbook(encoding='utf-8')  # 初始化实例
-        self.worksheet = self.workbook.add_sheet('{}'.format(curr_time), cell_overwrite_ok=True)  # 新建sheet名为"curr_time"的页面，且覆盖写入=True
-        
+    def __init__(self, excel_file):
+        import xlsxwriter                         # 仅在输出xlsx时导入
+        self.workbook = xlsxwriter.Workbook(excel_file, {'constant_memory': True})   # constant_memory=逐行写入磁盘, 内存占用与行数无关(仅支持按行顺序写入)
+        self.worksheet = self.workbook.add_worksheet('{}'.format(curr_time))         # 新建sheet名为"curr_time"的页面
+
         #* style=正文内容格式
-        self.style = xlwt.XFStyle()               # 初始化样式
-        self.borders = xlwt.Borders()             # 初始化边框
-        self.alignment = xlwt.Alignment()         # 初始化对齐样式
-        self.font = xlwt.Font()                   # 初始化字体
-        self.font.name = 'Arial'                  # 设定字体为Arial
-        self.font.bold = True                     # 设定字体为粗体
-        self.style.font = self.font               # 设定字体样式(Arial, 粗体)
-        self.alignment.wrap = 1                   # 打开自动换行
-        self.alignment.horz = 0x02                # 0x02=水平居中
-        self.alignment.vert = 0x01                # 0x01=垂直居中
-        self.style.alignment = self.alignment     # 设置对齐格式(打开自动换行, 水平居中, 垂直居中)
-        self.borders.left = 6                     # 设置边框为6=双线
-        self.borders.right = 6
-        self.borders.top = 6
-        self.borders.bottom = 6
-        self.style.borders = self.borders
+        self.style = self.workbook.add_format({
+            'font_name': 'Arial',                 # 设定字体为Arial
+            'bold': True,                         # 设定字体为粗体
+            'text_wrap': True,                    # 打开自动换行
+            'align': 'center',                    # 水平居中
+            'valign': 'vcenter',                  # 垂直居中
+            'border': 6,                          # 设置边框为6=双线
+        })
 
         #* style1=定义首行标题栏格式
-        self.style1 = xlwt.XFStyle()
-        self.pattern = xlwt.Pattern()
-        self.font1 = xlwt.Font()
-        self.pattern.pattern = xlwt.Pattern.SOLID_PATTERN   # 设置背景颜色模式
-        self.pattern.pattern_fore_colour = 30               # 淡蓝色(Amlogic)
-        self.font1.name = 'Arial'                           # 字体Arial
-        self.font1.bold = True                              # 加粗
-        self.font1.underline = True                         # 下划线
-        self.font1.italic = True                            # 斜体
-        self.font1.colour_index = 1                         # 红色字体
-        self.style1.font = self.font1                       # 设定字体样式
-        self.style1.alignment.wrap = 1                      # 打开自动换行
-        self.style1.alignment.horz = 0x02                   # 0x02=水平居中
-        self.style1.alignment.vert = 0x01                   # 0x01=垂直居中
-        self.style1.borders = self.borders
-        self.style1.pattern = self.pattern
+        self.style1 = self.workbook.add_format({
+            'font_name': 'Arial',                 # 字体Arial
+            'bold': True,                         # 加粗
+            'underline': True,                    # 下划线
+            'italic': True,                       # 斜体
+            'font_color': 'white',                # 白色字体
+            'bg_color': '#0066CC',                # 淡蓝色(Amlogic)
+            'pattern': 1,                         # 设置背景颜色模式
+            'text_wrap': True,                    # 打开自动换行
+            'align': 'center',                    # 水平居中
+            'valign': 'vcenter',                  # 垂直居中
+            'border': 6,
+        })
 
         #* style2=定义第四列Summary靠左对齐
-        self.style2 = xlwt.XFStyle()
-        self.alignment2 = xlwt.Alignment()
-        self.style2.font = self.font             # 设定字体样式
-        self.alignment2.wrap = 1                 # 打开自动换行
-        self.alignment2.horz = 0x01              # 0x01=靠左对齐
-        self.alignment2.vert = 0x01              # 0x01=垂直居中
-        self.style2.alignment = self.alignment2  # 设置对齐格式
-        self.style2.borders = self.borders
-        
+        self.style2 = self.workbook.add_format({
+            'font_name': 'Arial',
+            'bold': True,
+            'text_wrap': True,                    # 打开自动换行
+            'align': 'left',                      # 靠左对齐
+            'valign': 'vcenter',                  # 垂直居中
+            'border': 6,
+        })
+
         #* style3=定义正文红色字体
-        self.style3 = xlwt.XFStyle()
-        self.font3 = xlwt.Font()                 # 初始化字体
-        self.font3.name = 'Arial'                # 设定字体为Arial
-        self.font3.bold = True                   # 设定字体为粗体
-        self.font3.colour_index = 0x0A           # 设定字体颜色为red
-        self.style3.font = self.font3            # 设定字体样式
-        self.style3.alignment = self.alignment   # 设置对齐格式
-        self.style3.borders = self.borders
+        self.style3 = self.workbook.add_format({
+            'font_name': 'Arial',
+            'bold': True,
+            'font_color': 'red',                  # 设定字体颜色为red
+            'text_wrap': True,
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 6,
+        })
 
         #* 调整列宽
-        self.worksheet.col(0).width = 6 * 256    # 第01列：Index，设置宽度
-        self.worksheet.col(1).width = 20 * 256   # 第02列：Produect Line，设置宽度
-        self.worksheet.col(2).width = 20 * 256   # 第03列：Project ID，设置宽度
-        self.worksheet.col(3).width = 16 * 256   # 第04列：Issue Key，设置宽度
-        self.worksheet.col(4).width = 24 * 256   # 第05列：Component，设置宽度
-        self.worksheet.col(5).width = 16 * 256   # 第06列：Status，设置宽度
-        self.worksheet.col(6).width = 12 * 256   # 第07列：Priority，设置宽度
-        self.worksheet.col(7).width = 18 * 256   # 第08列：Assignee，设置宽度
-        self.worksheet.col(8).width = 18 * 256   # 第09列：RD Manager，设置宽度
-        self.worksheet.col(9).width = 16 * 256   # 第10列：Created，设置宽度
-        self.worksheet.col(10).width = 16 * 256  # 第11列：Updated，设置宽度
-        self.worksheet.col(11).width = 16 * 256  # 第12列：Finish Date，设置宽度
-        self.worksheet.col(12).width = 12 * 256  # 第13列：Cost，设置宽度
+        self.worksheet.set_column(0, 0, 6)       # 第01列：Index，设置宽度
+        self.worksheet.set_column(1, 1, 20)      # 第02列：Produect Line，设置宽度
+        self.worksheet.set_column(2, 2, 20)      # 第03列：Project ID，设置宽度
+        self.worksheet.set_column(3, 3, 16)      # 第04列：Issue Key，设置宽度
+        self.worksheet.set_column(4, 4, 24)      # 第05列：Component，设置宽度
+        self.worksheet.set_column(5, 5, 16)      # 第06列：Status，设置宽度
+        self.worksheet.set_column(6, 6, 12)      # 第07列：Priority，设置宽度
+        self.worksheet.set_column(7, 7, 18)      # 第08列：Assignee，设置宽度
+        self.worksheet.set_column(8, 8, 18)      # 第09列：RD Manager，设置宽度
+        self.worksheet.set_column(9, 9, 16)      # 第10列：Created，设置宽度
+        self.worksheet.set_column(10, 10, 16)    # 第11列：Updated，设置宽度
+        self.worksheet.set_column(11, 11, 16)    # 第12列：Finish Date，设置宽度
+        self.worksheet.set_column(12, 12, 12)    # 第13列：Cost，设置宽度
 
         #* 调整首行格式
-        self.first_style = xlwt.easyxf('font:height 720;')  # 设置行高
-        self.tall_style = xlwt.easyxf('font:height 540;')   # 设置行高
-        first_row = self.worksheet.row(0)                   # 第一行标题
-        first_row.set_style(self.first_style)               # 第一行设置格式
+        self.worksheet.set_row(0, 36)            # 第一行标题设置行高
 
     def write2excel(self, row=None, col=None, input=None, style=None) -> object:
         self.worksheet.write(row, col, input, style)    # 写入数据格式: (行, 列, 具体内容, 字体格式样式)
 
-def write2file(iteration=None, limit=None):
-    '''写入Fields数据到excel表格中'''
-
-    #* 新建excel表格
-    excel_file =  creat_local_file(filename="Output_Result")
+    def save(self) -> None:
+        self.workbook.close()                           # 只在最后保存一次
 
-    #* xlwt excel样式定义初始化
-    LoExcel = TableObject()
+class ResultWriter(object):
+    """Write the -o rows as they come, to a streaming .xlsx or a .csv/.tsv file, and save once on close()"""
 
-    #* Excel Style定义
-    title_style = LoExcel.style1      # 表格标题样式(蓝底,白字,斜体,加粗,居中对齐)
-    content_style = LoExcel.style     # 正文内容样式(Arial字体,加粗,居中对齐)
-    left_style = LoExcel.style2       # 正文内容样式(Arial字体,加粗,靠左对齐)
-    red_style = LoExcel.style3        # 正文内容样式(Arial字体,加粗,红色,居中对齐)
-    
     #* Excel表格标题
     title = [   'Index',              # 01
                 'Product Line',       # 02
@@ -953,33 +3094,82 @@ def write2file(iteration=None, limit=None):
                 'Updated',            # 11
                 'Finish date',        # 12
                 'Cost Time'           # 13
-            ] 
-
-    #* Excel表格中写入首行标题栏
-    for i in range(len(title)):
-        LoExcel.worksheet.write(0, i, title[i], title_style)  # style1=标题栏格式（蓝底白字)
-        LoExcel.workbook.save(excel_file) 
-
-    for i,(k, v) in track(enumerate(iteration.items(),1),  description="[green]Processing[/green]", total=(len(fields))):
-        LoExcel.write2excel(row=i, col=0, input=i, style=content_style)
-        LoExcel.write2excel(row=i, col=1, input=v[0]['product'], style=left_style)
-        LoExcel.write2excel(row=i, col=2, input=v[0]['project_id'], style=left_style)
-        LoExcel.write2excel(row=i, col=3, input=v[0]['issue_id'], style=content_style)
-        LoExcel.write2excel(row=i, col=4, input=v[0]['component'], style=left_style)
-        LoExcel.write2excel(row=i, col=5, input=v[0]['status'], style=left_style)
-        LoExcel.write2excel(row=i, col=6, input=v[0]['priority'], style=content_style)
-        LoExcel.write2excel(row=i, col=7, input=v[0]['assignee'], style=left_style)
-        LoExcel.write2excel(row=i, col=8, input=v[0]['rd_manager'], style=left_style)
-        LoExcel.write2excel(row=i, col=9, input=str(v[0]['created']).split(' ')[0], style=content_style)
-        LoExcel.write2excel(row=i, col=10, input=str(v[0]['updated']).split(' ')[0], style=content_style)
-        LoExcel.write2excel(row=i, col=11, input=str(v[0].get('finish_date')).split(' ')[0], style=content_style)
-        if v[0]['cost'] >= limit:
-            LoExcel.write2excel(row=i, col=12, input=v[0]['cost'], style=red_style)
+            ]
+    left_cols = (1, 2, 4, 5, 7, 8)    # 靠左对齐的列, 其余列居中
+    keys = ('issue_id', 'product', 'project_id', 'component', 'status', 'priority', 'assignee', 'rd_manager', 'created', 'updated', 'finish_date', 'cost')
+
+    def __init__(self, limit=30, output_format='xlsx'):
+        self.limit = limit                                                     # 红色Highlight字体时间限制(天)
+        self.rows = 0
+        self.output_file = creat_local_file(filename="Output_Result", ext=output_format)
+        if output_format == 'xlsx':
+            self.excel = TableObject(self.output_file)
+            for i in range(len(self.title)):
+                self.excel.write2excel(row=0, col=i, input=self.title[i], style=self.excel.style1)  # style1=标题栏格式（蓝底白字)
         else:
-            LoExcel.write2excel(row=i, col=12, input=v[0]['cost'], style=content_style)
-        LoExcel.workbook.save(excel_file) 
-    LoExcel.workbook.save(excel_file) 
-    logging.info('Saved to: {}'.format(os.path.join(os.getcwd(), excel_file))) 
+            self.excel = None
+            self.handle = open(self.output_file, 'w', newline='', encoding='utf-8-sig')           # utf-8-sig: Excel直接打开不会乱码
+            self.writer = csv.writer(self.handle, delimiter='\t' if output_format == 'tsv' else ',')
+            self.writer.writerow(self.title)
+
+    def write(self, field) -> None:
+        """Append one output FIELD as the next row"""
+        self.rows += 1
+        values = [  self.rows,
+                    field['product'],
+                    field['project_id'],
+                    field['issue_id'],
+                    field['component'],
+                    field['status'],
+                    field['priority'],
+                    field['assignee'],
+                    field['rd_manager'],
+                    str(field['created']).split(' ')[0],
+                    str(field['updated']).split(' ')[0],
+                    str(field.get('finish_date')).split(' ')[0],
+                    field['cost'] ]
+        if self.excel is None:
+            self.writer.writerow(values)
+            return
+        for col, value in enumerate(values):
+            if col == 12 and field['cost'] >= self.limit:
+                style = self.excel.style3                                      # 超出时间限制, 红色字体
+            elif col in self.left_cols:
+                style = self.excel.style2
+            else:
+                style = self.excel.style
+            self.excel.write2excel(row=self.rows, col=col, input=value, style=style)
+
+    def close(self) -> None:
+        if self.excel is None:
+            self.handle.close()
+        else:
+            self.excel.save()
+        logging.info('Saved to: {}, rows: {}'.format(os.path.join(os.getcwd(), self.output_file), self.rows))
+
+def write2file(iteration=None, limit=None):
+    '''写入Fields数据到excel表格中'''
+
+    writer = ResultWriter(limit=limit, output_format=OUTPUT_FORMAT)
+    for k, v in track(iteration.items(), description="[green]Processing[/green]", total=len(iteration)):
+        writer.write(v[0])
+    writer.close()
+
+def write2table(filename, title, rows):
+    '''写入汇总数据(TITLE标题栏 + ROWS)到OUTPUT_FORMAT格式的表格中, ex: Trend_Result_YYYYMMDD_HHMMSS.xlsx'''
+
+    output_file = creat_local_file(filename=filename, ext=OUTPUT_FORMAT)
+    if OUTPUT_FORMAT == 'xlsx':
+        excel = TableObject(output_file)
+        excel.worksheet.set_column(0, len(title) - 1, 16)
+        for row, values in enumerate([ title ] + rows):
+            for col, value in enumerate(values):
+                excel.write2excel(row=row, col=col, input=value, style=excel.style if row else excel.style1)
+        excel.save()
+    else:
+        with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
+            csv.writer(f, delimiter='\t' if OUTPUT_FORMAT == 'tsv' else ',').writerows([ title ] + rows)
+    logging.info('Saved to: {}, rows: {}'.format(os.path.join(os.getcwd(), output_file), len(rows)))
 
 def showLogo():
     console.print("""
@@ -1002,11 +3192,9 @@ if __name__ == '__main__':
 
     start_time = time.time()   # 计时起点
     logging_init()             # logging初始化
-    showLogo()                 # show logo
-    tv_product_team = [ 'Jianfan.Ai','Bo.Ren','Zhewu.Tao','Zanbo.Huang','Linguo.Bu','Maoguo.Xie','Cong.Zhang','Jianhui.Peng','Shuangxiao.Hu','Jie.Xiong','Xinying.Yang','Haolin.Li','Ying.Li','Will.Chen','Huinan.Liang','Jianhua.Huang','Binbin.Gao','Zhendong.Zhou',  # SZ
-                        'Meiling.Zhu','Xiaofeng.Li','Xuejiao.Li','Xiaoshuang.Ni','Qin.Zhang','Xinyue.Yu','Mingdong.Wang','Yunzhu.Zhang','Hongyu.Wang','Zonghao.Ma','Zihan.Wang',                                            # BJ
-                        'Tracy.Chen','Haiying.Liu','Yueming.Xu','Qianyi.Liu',                                                                                                                                               # SH
-                        'Changwen.Dai', 'Jinbo.Du', 'Chunyan.Liu', 'Menghui.Liu', 'Jiajia.Mu'  ]                                                                                                                                             
+    if LOGO_FLAG:
+        showLogo()             # show logo
+    roster = Roster.load(ROSTER_FILE)  # QA人员名单, 按SZ/BJ/SH分组
 
     #* Step1: 获取外部参数并格式化
     external_args_dict = args_init()
@@ -1014,8 +3202,20 @@ if __name__ == '__main__':
     #* Step2: AmlJiraSystem实例
     Viz = AmlJiraSystem('jianfan.ai', 'Amlogic1234!')
     
-    #* Step3: 返回myjira对象
-    Viz.login_jira() 
+    #* GREP: 只查询本地全文索引, 无需登录Jira
+    if GREP_TEXT:
+        Viz.grep(GREP_TEXT, INDEX_DB or 'VizProject_index.db', raw=GREP_RAW)
+        sys.exit(0)
+
+    #* Step3: 返回myjira对象(replay模式下数据来自本地录制文件, 无需登录)
+    if not REPLAY_DIR:
+        with Viz.profiler.stage('login'):
+            Viz.login_jira() 
+
+    #* 守护模式: 不再执行单次搜索, 保持session/分析插件/结果缓存并通过本地HTTP接口回答JQL查询, Ctrl+C退出
+    if SERVE_ADDR:
+        QueryServer(Viz, SERVE_TTL).serve(SERVE_ADDR)
+        sys.exit(0)
 
     #* Step4: 通过外部参数组合生成JQL搜索语句
     #* external_args_dict数据类型为dict, 由外部参数组合而成的dict, 返回的jql数据类型为str 
@@ -1023,39 +3223,66 @@ if __name__ == '__main__':
 
     #* Step5: 传入JQL字段,该数据来自外部参数传入,要么是自行定义的参数 or Raw command (注意: 这里有实际访问Jira)
     #* RAW_COMMAND数据类型为str, 即JQL搜索语句. ex: "project id"=AB30A8-T962X3Z AND status in (OPEN)
-    if RAW_COMMAND:
-        Viz.process_search(RAW_COMMAND[0])
+    #* BATCH_FILE: 批量模式, 多个JQL并发搜索, 重复的issue只获取与解析一次
+    #* TREND: 趋势模式, 一次获取--duration时间范围内的数据, 按周/月分桶统计Created/Resolved/Open Backlog/DI
+    if TREND:
+        with Viz.profiler.stage('trend'):
+            Viz.process_trend(external_args_dict, TREND)
     else:
-        Viz.process_search(jql)
+        if BATCH_FILE is not None:
+            with Viz.profiler.stage('batch'):
+                Viz.process_batch(Viz.load_batch_queries(BATCH_FILE, external_args_dict))
+        elif RAW_COMMAND:
+            Viz.process_search(RAW_COMMAND[0])
+        else:
+            Viz.process_search(jql)
  
-    #* Step6: 将filter_list传入Jira处理函数, 返回: fields为所有Jira数据, commentor_all_count为所有comment作者的记录
-    fields = Viz.fields
-    commentor_all_count = Viz.commentor_all_count
-    verified_all_count = Viz.verified_all_count
-    verified_QA_count = Viz.verified_QA_count
-    support_label_count = Viz.support_label_count
-    severity_count = Viz.severity_count
-
-    #* Step7: 如果ACTIVE_CHECK=True, 则将commentor_all_count转化为termgraph图形打印到stdout
-    if ACTIVE_CHECK and commentor_all_count:
-        Viz.show_chart(commentor_all_count, len(commentor_all_count), "Comments", "added comments")
+        #* Step6: 将filter_list传入Jira处理函数, 返回: fields为所有Jira数据, commentor_all_count为所有comment作者的记录
+        fields = Viz.fields
+        commentor_all_count = Viz.commentor_all_count
+        verified_all_count = Viz.verified_all_count
+        verified_QA_count = Viz.verified_QA_count
+        support_label_count = Viz.support_label_count
+        severity_count = Viz.severity_count
+
+        #* Step7: 如果ACTIVE_CHECK=True, 则将commentor_all_count转化为bar图形打印到stdout
+        with Viz.profiler.stage('charts'):
+            if ACTIVE_CHECK and commentor_all_count:
+                Viz.show_chart(commentor_all_count, Viz.totals['commentor_all_count'], "Comments", "added comments")
     
-    if EXPAND_FLAG and VERIFY_CHECK and DATERANGE and verified_all_count:
-        Viz.show_chart(dict(verified_all_count), sum([x for x in dict(verified_all_count).values()]), "Verified", "changed status to verified")
+            if EXPAND_FLAG and VERIFY_CHECK and DATERANGE and verified_all_count:
+                Viz.show_chart(dict(verified_all_count), sum([x for x in dict(verified_all_count).values()]), "Verified", "changed status to verified")
 
-    if EXPAND_FLAG and VERIFY_CHECK and DATERANGE and verified_QA_count:
-        Viz.show_chart(dict(verified_QA_count), sum([x for x in dict(verified_QA_count).values()]), "QA Verified", "changed status to verified")      # verified_QA_count为Counter()数据类型, 需要转化成dict()
+            if EXPAND_FLAG and VERIFY_CHECK and DATERANGE and verified_QA_count:
+                Viz.show_chart(dict(verified_QA_count), sum([x for x in dict(verified_QA_count).values()]), "QA Verified", "changed status to verified")      # verified_QA_count为Counter()数据类型, 需要转化成dict()
     
-    if EXPAND_FLAG and LABEL_CHECK and DATERANGE:
-        Viz.show_chart(dict(support_label_count), sum([x for x in dict(support_label_count).values()]), "Label", "added label < {} >".format(LABEL_CHECK[0]))
+            if EXPAND_FLAG and LABEL_CHECK and DATERANGE:
+                Viz.show_chart(dict(support_label_count), sum([x for x in dict(support_label_count).values()]), "Label", "added label < {} >".format(LABEL_CHECK[0]))
     
-    if DI_COUNT:
-        Viz.show_chart(dict(severity_count), sum([x for x in dict(severity_count).values()]), "Severity", "changed severity")
+            if roster and any([ ACTIVE_CHECK, VERIFY_CHECK, LABEL_CHECK and DATERANGE ]):
+                Viz.show_sites()
+
+            if DI_COUNT:
+                Viz.show_chart(dict(severity_count), sum([x for x in dict(severity_count).values()]), "Severity", "changed severity")
+
+        if EPIC_CHECK and BATCH_FILE is None:
+            with Viz.profiler.stage('epics'):
+                Viz.show_epics()
+
+        if LINK_DEPTH is not None and BATCH_FILE is None:
+            with Viz.profiler.stage('links'):
+                Viz.show_links()
+
+        if TRANSITIONS and BATCH_FILE is None:
+            with Viz.profiler.stage('transitions'):
+                Viz.show_transitions()
 
-    if OUTPUT_FLAG:
-        write2file(iteration=fields, limit=30)       # 迭代对象=fields, 红色Highlight字体时间限制>=30天
+        if OUTPUT_FLAG and BATCH_FILE is None and (COLUMNAR_FLAG or not STREAM_FLAG):
+            with Viz.profiler.stage('export'):
+                write2file(iteration=fields, limit=30)       # 迭代对象=fields, 红色Highlight字体时间限制>=30天
         
     #* 计时终点
     end_time = time.time()
     cost = end_time - start_time
+    Viz.profiler.report(cost)
     logging.info('>>> Cost: {:.1f}s'.format(cost)) 
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+##################################################
+# __python__: 3.9.x
+# __Author__: AJF
+# __Purpose__: pytest of the ChangelogTable dwell/time_to, LinkGraph chains, IssueCache sync and --procs parsing
+##################################################
+
+import os, sys, copy, sqlite3
+from collections import Counter
+from datetime import timedelta, timezone
+
+#* VizProject在import时解析命令行参数, --transitions同时导入numpy
+sys.argv = [ 'VizProject.py', '--transitions' ]
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import VizProject
+from VizProject import ChangelogTable, LinkGraph, IssueCache, FieldsAggregate
+from VizBench import JiraPayloadGenerator, TEAM
+
+def history(created, *items):
+    return { 'author': { 'name': 'jianfan.ai' }, 'created': created + 'T10:00:00.000+0800',
+             'items': [ { 'field': field, 'fromString': before, 'toString': after } for field, before, after in items ] }
+
+def issue(key, created, histories=(), links=()):
+    return { 'key': key, 'fields': { 'created': created + 'T10:00:00.000+0800' if created else None, 'issuelinks': list(links) },
+             'changelog': { 'histories': list(histories) } }
+
+def link(link_id, outward=None, inward=None, kind='blocks'):
+    x = { 'id': link_id, 'type': { 'outward': kind } }
+    if outward:
+        x['outwardIssue'] = { 'key': outward }
+    if inward:
+        x['inwardIssue'] = { 'key': inward }
+    return x
+
+class StubJira(object):
+    """search_issues over fixed json ISSUES in their order, a JQL with 'updated >=' only returns the CHANGED keys"""
+    def __init__(self, issues, changed=()):
+        self.issues = issues
+        self.changed = set(changed)
+        self.jqls = []
+
+    def search_issues(self, jql_str, startAt=0, maxResults=50, json_result=True, **kwargs):
+        self.jqls.append(jql_str)
+        issues = [ d for d in self.issues if 'updated >=' not in jql_str or d['key'] in self.changed ]
+        return { 'startAt': startAt, 'maxResults': maxResults, 'total': len(issues), 'issues': copy.deepcopy(issues[startAt:startAt + maxResults]) }
+
+def cached_issue(key, updated, summary=''):
+    return { 'key': key, 'fields': { 'created': '2023-01-01T10:00:00.000+0800', 'updated': updated, 'summary': summary } }
+
+def changelog_table():
+    table = ChangelogTable(str)
+    table.extend([
+        #* 重新打开: OPEN 2天, In Progress 1天, Resolved 2天+1天, Reopened 4天, 当前Closed不计; histories乱序
+        issue('TV-1', '2023-01-01', [ history('2023-01-10', ('status', 'Reopened', 'Resolved')),
+                                      history('2023-01-03', ('assignee', None, 'bo.ren'), ('status', 'OPEN', 'In Progress')),
+                                      history('2023-01-06', ('status', 'Resolved', 'Reopened')),
+                                      history('2023-01-04', ('status', 'In Progress', 'Resolved')),
+                                      history('2023-01-11', ('status', 'Resolved', 'Closed')) ]),
+        #* 缺少created: 初始OPEN无法计算, Resolved 2天
+        issue('TV-2', None, [ history('2023-01-05', ('status', 'OPEN', 'Resolved')),
+                              history('2023-01-07', ('status', 'Resolved', 'Closed')) ]),
+    ])
+    table.extend([
+        #* 迁移的issue: 变更早于created, 初始OPEN为负数被丢弃, Resolved 5天
+        issue('TV-3', '2023-02-01', [ history('2023-01-20', ('status', 'OPEN', 'Resolved')),
+                                      history('2023-01-25', ('status', 'Resolved', 'Closed')) ]),
+    ])
+    return table
+
+def test_changelog_one_event_per_item():
+    table = changelog_table()
+    assert table.size == 10
+    assert table.transitions()[('Resolved', 'Closed')] == 3
+    assert table.entries('Reopened') == { 'issues': 1, 'events': 1, 'max': 1 }
+
+def test_dwell_reopen_missing_created_and_negative():
+    dwell = changelog_table().dwell()
+    assert set(dwell) == { 'OPEN', 'In Progress', 'Resolved', 'Reopened' }
+    assert dwell['OPEN'] == { 'count': 1, 'mean': 2.0, 'p50': 2.0, 'p90': 2.0, 'max': 2.0 }
+    assert dwell['In Progress']['count'] == 1 and dwell['In Progress']['max'] == 1.0
+    assert dwell['Resolved']['count'] == 4 and dwell['Resolved']['mean'] == 2.5 and dwell['Resolved']['max'] == 5.0
+    assert dwell['Reopened']['mean'] == 4.0
+    assert all(stat['count'] and stat['max'] >= 0 for stat in dwell.values())
+
+def test_time_to_skips_missing_created_and_negative():
+    assert changelog_table().time_to('Resolved') == { 'count': 1, 'mean': 3.0, 'p50': 3.0, 'p90': 3.0, 'max': 3.0 }
+    assert changelog_table().time_to('Verified')['count'] == 0
+
+def test_link_chains_skip_cycle():
+    graph = LinkGraph()
+    links = graph.add([
+        issue('TV-1', '2023-01-01', links=[ link('1', outward='TV-2') ]),
+        issue('TV-2', '2023-01-01', links=[ link('1', inward='TV-1'), link('2', outward='TV-3') ]),     # 两端返回同一个link
+        issue('TV-3', '2023-01-01', links=[ link('3', outward='TV-4'), link('4', outward='TV-9', kind='relates to') ]),
+        #* 环: TV-7 blocks TV-8 blocks TV-7, 环下游的TV-6也无法排序
+        issue('TV-7', '2023-01-01', links=[ link('5', outward='TV-8') ]),
+        issue('TV-8', '2023-01-01', links=[ link('6', outward='TV-7'), link('7', outward='TV-6') ]),
+    ])
+    assert links == 7 and graph.size == 7
+    assert graph.chains('blocks') == [ [ 'TV-1', 'TV-2', 'TV-3', 'TV-4' ] ]
+    assert graph.chains('relates to') == [ [ 'TV-3', 'TV-9' ] ]
+    assert sorted(graph.frontier()) == [ 'TV-4', 'TV-6', 'TV-9' ]
+    assert [ sorted(graph.keys[n] for n in component) for component in graph.components() ] == \
+           [ [ 'TV-1', 'TV-2', 'TV-3', 'TV-4', 'TV-9' ], [ 'TV-6', 'TV-7', 'TV-8' ] ]
+    assert [ len(component) for component in graph.components(kinds=('blocks', )) ] == [ 4, 3, 1 ]
+
+def test_cache_sync_point_compares_time_not_string(tmp_path):
+    cache = IssueCache(str(tmp_path / 'cache.db'))
+    query_id = cache.query_id('project = TV', [ 'updated' ], None)
+    #* 字符串比较时'11:50+0800'更大, 按时间则'05:00+0000'(13:00+0800)更晚
+    cache.merge(query_id, [ cached_issue('TV-1', '2023-02-13T11:50:00.000+0800'), cached_issue('TV-2', '2023-02-13T05:00:00.000+0000') ])
+    cache.save(query_id, 'project = TV', [ 'updated' ], None)
+    assert cache.last_sync(query_id) == '2023-02-13T05:00:00.000+00:00'
+    assert IssueCache.parse_time(cache.last_sync(query_id)) == IssueCache.parse_time('2023-02-13T13:00:00.000+0800')
+
+def test_cache_opens_file_without_rank(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'cache.db'))
+    conn.execute('CREATE TABLE issues (query_id TEXT, key TEXT, created TEXT, updated TEXT, payload BLOB, PRIMARY KEY (query_id, key))')
+    conn.commit()
+    conn.close()
+    cache = IssueCache(str(tmp_path / 'cache.db'))
+    cache.merge('q', [ cached_issue('TV-2', None), cached_issue('TV-1', None) ])
+    cache.order('q', [ 'TV-1', 'TV-2' ])
+    assert [ d['key'] for page in cache.iter_pages('q') for d in page['issues'] ] == [ 'TV-1', 'TV-2' ]
+
+def test_incremental_jql_order_by_and_time_zone():
+    Viz = VizProject.AmlJiraSystem('', '')
+    Viz.timezone = timezone(timedelta(hours=8))                     # 账号时区与updated的偏移不同
+    assert Viz.incremental_jql('project = TV order by created DESC', '2023-02-13T05:00:00.000+00:00') == \
+           '(project = TV) AND updated >= "2023/02/13 12:55" order by created DESC'
+    assert Viz.incremental_jql('ORDER BY key', '2023-02-13T11:50:52.889+0800') == 'updated >= "2023/02/13 11:45" ORDER BY key'
+
+def test_sync_cache_updates_prunes_and_keeps_jql_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(VizProject, 'CACHE_DB', str(tmp_path / 'cache.db'))
+    Viz = VizProject.AmlJiraSystem('', '')
+    Viz.show_progress = False
+    Viz.timezone = timezone(timedelta(hours=8))
+    jql = 'project = TV ORDER BY priority DESC'
+    keys = lambda pages: [ d['key'] for page in pages for d in page['issues'] ]
+
+    Viz.myjira = StubJira([ cached_issue('TV-3', '2023-02-13T05:00:00.000+0000'), cached_issue('TV-1', '2023-02-13T11:50:00.000+0800'),
+                            cached_issue('TV-2', '2023-02-12T09:00:00.000+0800') ])
+    assert keys(Viz.sync_cache(jql)) == [ 'TV-3', 'TV-1', 'TV-2' ]
+
+    #* TV-1更新后排到最前, TV-2不再满足JQL
+    Viz.myjira = StubJira([ cached_issue('TV-1', '2023-02-14T09:00:00.000+0800', summary='updated'), cached_issue('TV-3', '2023-02-13T05:00:00.000+0000') ],
+                          changed=[ 'TV-1' ])
+    pages = list(Viz.sync_cache(jql))
+    assert Viz.myjira.jqls[0] == '(project = TV) AND updated >= "2023/02/13 12:55" ORDER BY priority DESC'
+    assert keys(pages) == [ 'TV-1', 'TV-3' ]
+    assert pages[0]['issues'][0]['fields']['summary'] == 'updated'
+
+class StubPages(object):
+    """search_issues of TOTAL synthetic issues generated by VizBench, the same for every JQL"""
+    def __init__(self, total):
+        self.generator = JiraPayloadGenerator(seed=1)
+        self.total = total
+
+    def search_issues(self, jql_str, startAt=0, maxResults=50, json_result=True, **kwargs):
+        return self.generator.page(startAt, min(maxResults, 500), self.total)
+
+def test_procs_match_sequential(monkeypatch):
+    for flag in ('EXPAND_FLAG', 'ACTIVE_CHECK', 'VERIFY_CHECK', 'DI_COUNT', 'TESTCASE_CHECK'):
+        monkeypatch.setattr(VizProject, flag, True)
+    monkeypatch.setattr(VizProject, 'LABEL_CHECK', [ 'SH-Support-2023' ])
+    monkeypatch.setattr(VizProject, 'DATERANGE', [ '2022-11', '2023-02' ])
+    monkeypatch.setattr(VizProject, 'roster', VizProject.Roster({ 'QA': [ '.'.join(part.capitalize() for part in x.split('.')) for x in TEAM ] }))
+    results = {}
+    for procs in (1, 2):
+        monkeypatch.setattr(VizProject, 'PROCS', procs)
+        Viz = VizProject.AmlJiraSystem('', '')
+        Viz.show_progress = False
+        Viz.myjira = StubPages(1200)
+        Viz.process_search('project = FAKE')
+        #* 多进程解析的计数器均为Counter, 单进程的comments作者为list
+        results[procs] = Viz.jql_total, { name: Counter(getattr(Viz.aggregate, name)) for name in FieldsAggregate.counter_names }
+    assert results[1] == results[2]
+    assert results[1][0] == 1200
+    assert all(results[1][1][name] for name in FieldsAggregate.counter_names[:6])